@@ -0,0 +1,188 @@
+"""
+Benchmark suite of the Earth stencils and of a full Universe step, across GT4Py CPU backends and grid shapes.
+
+For every backend and grid shape it reports, per stencil, the build time (compilation or load from the GT4Py cache),
+the time of the first call and the steady state time of a call, plus the throughput in cell updates per second. The
+sweep of the reduction engine computing the global diagnostics is reported like a stencil.
+The full `Universe.update_all` step is reported the same way with the peak memory allocated during a step.
+Results are written as JSON to track regressions between releases.
+
+Run with `python3.11 src/benchmarks/benchmark_suite.py --output benchmark.json`
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import resource
+import statistics
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import gt4py
+from gt4py.cartesian import gtscript
+from gt4py.cartesian.gtscript import PARALLEL, computation, interval
+
+from models.ABC.celestial_body import CelestialBody
+from models.stencil_registry import STENCIL_REGISTRY
+from models.ticking_class.ticking_earth import TickingEarth
+from models.ticking_class.ticking_sun import TickingSun
+
+CPU_BACKENDS = ("numpy", "gt:cpu_ifirst", "gt:cpu_kfirst", "dace:cpu")
+GRID_SHAPES = ((16, 16, 20), (32, 32, 40), (50, 50, 80))
+
+
+def probe(in_field: gtscript.Field[float], out_field: gtscript.Field[float]):
+    with computation(PARALLEL), interval(...):
+        out_field = in_field
+
+
+def backend_available(backend: str) -> bool:
+    """
+    Checks that a backend can build and run a trivial stencil on this machine (compiler, optional packages, etc ...)
+    """
+    try:
+        stencil = gtscript.stencil(definition=probe, backend=backend)
+        field = np.zeros((2, 2, 2))
+        stencil(field, field.copy())
+        return True
+    except Exception as e:
+        print(f"Skipping backend {backend}: {type(e).__name__}: {e}")
+        return False
+
+
+def stencil_calls(earth: TickingEarth, scratch: list) -> dict:
+    """
+    The arguments of every stencil of Earth and TickingEarth, called on the compute domain of the Earth
+    :param earth: a filled Earth
+    :param scratch: four scratch fields of the storage shape
+    :return: stencil attribute name -> (args, kwargs)
+    """
+    domain = dict(origin=earth.origin, domain=earth.domain)
+    components = (earth.water_energy, earth.water_mass, earth.air_energy, earth.air_mass, earth.land_energy, earth.land_mass)
+    masses = (earth.water_mass, earth.air_mass, earth.land_mass)
+    full_k = dict(origin=(earth.origin[0], earth.origin[1], 0), domain=(earth.domain[0], earth.domain[1], earth.storage_shape[2]))
+    return {
+        "_add_energy": ((scratch[0],) + components, domain),
+        "_add_uniform_energy": (components + (0.0,), domain),
+        "_compute_chunk_temperature": (components + (earth.chunk_temp,), domain),
+        "_temperature_to_energy_field": ((earth.chunk_temp, earth.water_mass, scratch[1]), domain),
+        "_compute_energy_transfer": ((earth.chunk_temp, scratch[1], earth.heat_transfer_coefficient, earth.specific_heat_capacity, earth.dt), domain),
+        "_fused_heat_diffusion": (components + (earth.heat_transfer_coefficient, earth.specific_heat_capacity, earth.chunk_temp,
+                                                scratch[1], scratch[2], scratch[3], earth.dt), full_k),
+        "_implicit_k_heat_diffusion": (components + (earth.chunk_temp, earth.dt), domain),
+        "_compute_derived_properties": (masses + (earth.chunk_mass, earth.heat_transfer_coefficient, earth.specific_heat_capacity), domain),
+        "_water_evaporation": (masses + (earth.chunk_mass, earth.heat_transfer_coefficient, earth.specific_heat_capacity, earth.dt), domain),
+        "_carbon_cycle": ((earth.carbon_ppm, 0.0), domain),
+    }
+
+
+def time_calls(function, nb_calls: int) -> tuple[float, float]:
+    """
+    :return: the time of the first call and the median time of the following calls
+    """
+    start = time.perf_counter()
+    function()
+    first_call = time.perf_counter() - start
+    timings = []
+    for _ in range(nb_calls):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return first_call, statistics.median(timings)
+
+
+def benchmark(backend: str, grid_shape: tuple, nb_calls: int) -> dict:
+    STENCIL_REGISTRY.clear()
+    np.random.seed(0)
+    universe = CelestialBody.default_universe()
+    universe.sun = TickingSun()
+    start = time.perf_counter()
+    universe.earth = TickingEarth(shape=grid_shape, backend=backend)
+    universe.earth.warm_up_stencils(names=list(universe.earth.stencil_handles), workers=1)
+    construction_time = time.perf_counter() - start
+    universe.discover_everything()
+    universe.earth.fill_with_water()
+    earth = universe.earth
+    cells = int(np.prod(grid_shape))
+    build_times = STENCIL_REGISTRY.build_times()
+
+    stencils = []
+    with earth.workspace.scratch(count=4, fill_value=0) as scratch:
+        for name, (args, kwargs) in stencil_calls(earth, scratch).items():
+            stencil = getattr(earth, name)
+            first_call, steady_state = time_calls(lambda: stencil(*args, **kwargs), nb_calls)
+            definition_name = name.lstrip("_")
+            stencils.append({"stencil": definition_name,
+                             "build_time_s": build_times.get(f"{definition_name}@{backend}"),
+                             "first_call_s": first_call,
+                             "steady_state_s": steady_state,
+                             "cell_updates_per_s": cells / steady_state})
+    # The global diagnostics (composition, energies, temperatures) come from a single sweep of the reduction engine
+    first_call, steady_state = time_calls(earth.partial_diagnostics, nb_calls)
+    stencils.append({"stencil": "partial_diagnostics", "build_time_s": None, "first_call_s": first_call,
+                     "steady_state_s": steady_state, "cell_updates_per_s": cells / steady_state})
+
+    np.random.seed(0)
+    earth.fill_with_water()
+    first_call, steady_state = time_calls(universe.update_all, nb_calls)
+    tracemalloc.start()
+    universe.update_all()
+    _, peak_memory = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    step = {"construction_time_s": construction_time,
+            "first_call_s": first_call,
+            "steady_state_s": steady_state,
+            "cell_updates_per_s": cells / steady_state,
+            "peak_step_memory_bytes": peak_memory,
+            "fields_memory_bytes": sum(getattr(earth, name).nbytes for name in vars(earth)
+                                       if isinstance(getattr(earth, name), np.ndarray))}
+    return {"backend": backend, "grid_shape": list(grid_shape), "cells": cells, "stencils": stencils, "step": step}
+
+
+def print_summary(result: dict):
+    print(f"{result['backend']} {tuple(result['grid_shape'])}:")
+    for stencil in result["stencils"]:
+        build = f"{stencil['build_time_s']:.2f} s" if stencil["build_time_s"] is not None else "-"
+        print(f"  {stencil['stencil']:36s} build {build:>9s} | first {1000 * stencil['first_call_s']:8.2f} ms"
+              f" | steady {1000 * stencil['steady_state_s']:8.3f} ms | {stencil['cell_updates_per_s']:.3e} cells/s")
+    step = result["step"]
+    print(f"  {'Universe.update_all':36s} build {step['construction_time_s']:7.2f} s | first {1000 * step['first_call_s']:8.2f} ms"
+          f" | steady {1000 * step['steady_state_s']:8.3f} ms | {step['cell_updates_per_s']:.3e} cells/s"
+          f" | peak {step['peak_step_memory_bytes'] / 2 ** 20:.1f} MiB")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", nargs="+", default=CPU_BACKENDS)
+    parser.add_argument("--shapes", nargs="+", default=["x".join(map(str, shape)) for shape in GRID_SHAPES],
+                        help="grid shapes written as NIxNJxNK")
+    parser.add_argument("--calls", type=int, default=10, help="number of calls for the steady state timings")
+    parser.add_argument("--output", default="benchmark.json")
+    arguments = parser.parse_args()
+
+    report = {"metadata": {"date": datetime.datetime.now().isoformat(),
+                           "host": platform.node(),
+                           "platform": platform.platform(),
+                           "cpu_count": os.cpu_count(),
+                           "python": platform.python_version(),
+                           "numpy": np.__version__,
+                           "gt4py": gt4py.__version__},
+              "results": []}
+    for backend in arguments.backends:
+        if not backend_available(backend):
+            continue
+        for shape in arguments.shapes:
+            result = benchmark(backend, tuple(int(n) for n in shape.split("x")), arguments.calls)
+            print_summary(result)
+            report["results"].append(result)
+    report["metadata"]["max_rss_bytes"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    with open(arguments.output, "w") as file:
+        json.dump(report, file, indent=2)
+    print(f"Results written to {arguments.output}")
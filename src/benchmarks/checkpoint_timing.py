@@ -0,0 +1,105 @@
+"""
+Timing of writing and restoring a checkpoint of the whole simulation.
+
+The default grid (300 x 300 x 300 grid chunks) makes a checkpoint of about 2.4 GB (11 fields with their halo).
+Restoring is timed with the memory-mapped (zero-copy) fields, then until every page has been read, and with a copy
+into the existing storages. Right after writing, the files are in the page cache of the OS : use --drop-caches (needs
+root) to measure the reads from the disk.
+
+Run with `python3.11 src/benchmarks/checkpoint_timing.py --shape 300x300x300 --directory /tmp/checkpoint`
+"""
+import argparse
+import shutil
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import gt4py.storage as gt_storage
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from models.ABC.celestial_body import CelestialBody
+from models.ticking_class.ticking_earth import TickingEarth
+from models.ticking_class.ticking_sun import TickingSun
+
+
+def checkpoint_bytes(directory: Path) -> int:
+    return sum(path.stat().st_size for path in directory.iterdir())
+
+
+def drop_caches(enabled: bool):
+    if not enabled:
+        return
+    try:
+        with open("/proc/sys/vm/drop_caches", "w") as file:
+            file.write("3\n")
+    except OSError as e:
+        print(f"Could not drop the page cache ({e}), the reads below come from memory")
+
+
+def read_everything(earth: TickingEarth) -> float:
+    """
+    Touches every page of every field
+    """
+    return sum(float(np.sum(getattr(earth, name))) for name in earth.STORAGE_FIELDS)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--shape", default="300x300x300", help="grid shape written as NIxNJxNK")
+    parser.add_argument("--backend", default="numpy")
+    parser.add_argument("--directory", default="checkpoint_timing")
+    parser.add_argument("--drop-caches", action="store_true", help="drop the page cache before reading (Linux, root)")
+    arguments = parser.parse_args()
+    shape = tuple(int(n) for n in arguments.shape.split("x"))
+    directory = Path(arguments.directory)
+
+    np.random.seed(0)
+    universe = CelestialBody.default_universe()
+    universe.sun = TickingSun()
+    universe.earth = TickingEarth(shape=shape, backend=arguments.backend)
+    universe.discover_everything()
+    universe.earth.fill_with_water()
+    universe.update_all()
+    reference = universe.earth.average_temperature
+
+    start = time.perf_counter()
+    universe.checkpoint(directory)
+    write_time = time.perf_counter() - start
+    size = checkpoint_bytes(directory)
+    print(f"Checkpoint of {shape} ({size / 2 ** 30:.2f} GiB) with backend {arguments.backend}")
+    print(f"- Write (flushed to the disk): {write_time:8.3f} s ({size / write_time / 2 ** 30:.2f} GiB/s)")
+
+    drop_caches(arguments.drop_caches)
+    start = time.perf_counter()
+    universe.restore(directory)
+    map_time = time.perf_counter() - start
+    start = time.perf_counter()
+    read_everything(universe.earth)
+    read_time = time.perf_counter() - start
+    print(f"- Restore, memory-mapped:      {map_time:8.3f} s")
+    print(f"- Then reading every page:     {read_time:8.3f} s ({size / read_time / 2 ** 30:.2f} GiB/s)")
+
+    # Back to regular storages so that the copy below does not write in mapped pages
+    for name in universe.earth.STORAGE_FIELDS:
+        setattr(universe.earth, name, gt_storage.from_array(getattr(universe.earth, name), backend=arguments.backend))
+    drop_caches(arguments.drop_caches)
+    start = time.perf_counter()
+    universe.restore(directory, zero_copy=False)
+    copy_time = time.perf_counter() - start
+    print(f"- Restore, copied:             {copy_time:8.3f} s ({size / copy_time / 2 ** 30:.2f} GiB/s)")
+
+    assert universe.earth.average_temperature == reference, "The restored state differs from the saved one"
+
+    # Restart and checkpoint again in the same directory, over the files the restored fields are mapped from
+    universe.restore(directory)
+    for _ in range(2):
+        universe.update_all()
+    reference = universe.earth.average_temperature, universe.earth.absorbed_energy
+    universe.checkpoint(directory)
+    universe.earth.absorbed_energy = 0.0
+    universe.restore(directory)
+    assert (universe.earth.average_temperature, universe.earth.absorbed_energy) == reference, \
+        "The checkpoint written over the restored one differs"
+    shutil.rmtree(directory)
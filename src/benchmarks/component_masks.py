@@ -0,0 +1,97 @@
+"""
+Time per tick with and without component masks on a layered Earth : land in the lowest levels, then water, then air,
+with a few levels where water and air mix. With the masks, the stencils branching on the components (chunk
+temperature, energy distribution) only read the fields of the components present in each K slab.
+Both runs start from the same initial conditions and must give the same fields.
+
+Run with `python3.11 src/benchmarks/component_masks.py [--shape 32 32 40] [--steps 50] [--land 0.2] [--water 0.3]`
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import constants
+from models.physical_class.universe import Universe
+from models.ticking_class.ticking_earth import TickingEarth
+from models.ticking_class.ticking_sun import TickingSun
+
+
+def layered_masses(shape: tuple, land: float, water: float) -> dict:
+    """
+    Masses of a grid whose lowest levels are land, the next ones water and the upper ones air. The two levels above the
+    water hold water and air, like a surface layer
+    :param land: fraction of the levels that are land
+    :param water: fraction of the levels that are water
+    """
+    nb_land, nb_water = round(land * shape[2]), round(water * shape[2])
+    masses = {name: np.zeros(shape) for name in ("water_mass", "air_mass", "land_mass")}
+    masses["land_mass"][:, :, :nb_land] = 2000
+    masses["water_mass"][:, :, nb_land:nb_land + nb_water + 2] = 1000
+    masses["air_mass"][:, :, nb_land + nb_water:] = 1
+    return masses
+
+
+def build(shape: tuple, masses: dict, component_masks: bool, backend: str) -> Universe:
+    universe = Universe()
+    universe.sun = TickingSun(universe=universe)
+    np.random.seed(0)
+    temperature = np.random.uniform(290, 310, shape)
+    fields = dict(masses)
+    for component, capacity in (("water", constants.WATER_HEAT_CAPACITY), ("air", constants.AIR_HEAT_CAPACITY),
+                                ("land", constants.LAND_HEAT_CAPACITY)):
+        fields[f"{component}_energy"] = temperature * masses[f"{component}_mass"] * capacity
+    universe.earth = TickingEarth(shape, backend=backend, universe=universe, component_masks=component_masks)
+    earth = universe.earth
+    for name, values in fields.items():
+        earth.interior(getattr(earth, name))[...] = values
+    earth.exchange_halos(*fields)
+    earth.touch(*fields)
+    earth.refresh_derived_fields()
+    return universe
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--shape", type=int, nargs=3, default=[32, 32, 40])
+    parser.add_argument("--steps", type=int, default=50)
+    parser.add_argument("--land", type=float, default=0.2)
+    parser.add_argument("--water", type=float, default=0.3)
+    parser.add_argument("--backend", default="numpy")
+    args = parser.parse_args()
+    shape = tuple(args.shape)
+    masses = layered_masses(shape, args.land, args.water)
+
+    elapsed, stencil_time, results = dict(), dict(), dict()
+    for component_masks in (False, True):
+        universe = build(shape, masses, component_masks, args.backend)
+        earth = universe.earth
+        universe.update_all()  # Warm up, builds the variants
+        start = time.perf_counter()
+        for _ in range(args.steps):
+            universe.update_all()
+        elapsed[component_masks] = (time.perf_counter() - start) / args.steps
+        start = time.perf_counter()
+        for _ in range(args.steps):
+            earth._compute_chunk_temperature(earth.water_energy, earth.water_mass, earth.air_energy, earth.air_mass,
+                                             earth.land_energy, earth.land_mass, earth.chunk_temp,
+                                             origin=earth.origin, domain=earth.domain)
+        stencil_time[component_masks] = (time.perf_counter() - start) / args.steps
+        results[component_masks] = {name: np.array(earth.interior(getattr(earth, name)))
+                                    for name in ("water_energy", "air_energy", "land_energy", "chunk_temp")}
+        if component_masks:
+            print(f"Tiles: {', '.join(f'K {first}-{last - 1}: {bits}' for first, last, bits in earth.component_tiles())}"
+                  f" (component bits, water 1, air 2, land 4), {earth.component_mask_updates} mask updates")
+
+    identical = all(np.array_equal(results[False][name], results[True][name], equal_nan=True) for name in results[False])
+    print(f"Grid {shape}, {args.steps} steps, backend {args.backend}, identical fields: {identical}")
+    print(f"{'component masks':>15s} | {'ms per tick':>11s} | {'chunk temperature ms':>20s}")
+    for component_masks in (False, True):
+        print(f"{str(component_masks):>15s} | {1000 * elapsed[component_masks]:11.2f} | "
+              f"{1000 * stencil_time[component_masks]:20.3f}")
+    print(f"Speedup: {elapsed[False] / elapsed[True]:.2f}x per tick, "
+          f"{stencil_time[False] / stencil_time[True]:.2f}x on the chunk temperature")
@@ -0,0 +1,65 @@
+"""
+Strong and weak scaling of DecomposedEarth on a single machine.
+Strong scaling keeps the grid fixed while adding workers, weak scaling grows the grid along I with the workers.
+
+Run with `python3.11 src/benchmarks/decomposition_scaling.py [max_workers]`
+"""
+import os
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from models.physical_class.universe import Universe
+from models.ticking_class.decomposed_earth import DecomposedEarth
+from models.ticking_class.ticking_earth import TickingEarth
+
+
+def time_per_tick(earth: TickingEarth, nb_steps: int) -> float:
+    earth.update()  # Warm up
+    start = time.perf_counter()
+    for _ in range(nb_steps):
+        earth.update()
+    return (time.perf_counter() - start) / nb_steps
+
+
+def measure(grid_shape: tuple, workers: int, nb_steps: int) -> float:
+    np.random.seed(0)
+    if workers == 0:
+        earth = TickingEarth(shape=grid_shape)
+    else:
+        earth = DecomposedEarth(shape=grid_shape, workers=workers)
+    earth.fill_with_water()
+    elapsed = time_per_tick(earth, nb_steps)
+    if workers:
+        earth.close()
+    return elapsed
+
+
+if __name__ == "__main__":
+    max_workers = int(sys.argv[1]) if len(sys.argv) > 1 else os.cpu_count()
+    grid_shape = (64, 64, 80)
+    weak_tile_shape = (32, 64, 80)
+    nb_steps = 10
+
+    universe = Universe()
+    print(f"{os.cpu_count()} CPU cores available")
+
+    reference = measure(grid_shape, 0, nb_steps)
+    print(f"Strong scaling on {grid_shape}, single process TickingEarth: {1000 * reference:.1f} ms per tick")
+    print("workers | ms per tick | speedup | efficiency")
+    for workers in range(1, max_workers + 1):
+        elapsed = measure(grid_shape, workers, nb_steps)
+        print(f"{workers:7d} | {1000 * elapsed:11.1f} | {reference / elapsed:7.2f} | {reference / elapsed / workers:10.2f}")
+
+    print(f"Weak scaling with {weak_tile_shape} per worker")
+    print("workers | grid | ms per tick | efficiency")
+    weak_reference = None
+    for workers in range(1, max_workers + 1):
+        shape = (weak_tile_shape[0] * workers, weak_tile_shape[1], weak_tile_shape[2])
+        elapsed = measure(shape, workers, nb_steps)
+        weak_reference = weak_reference or elapsed
+        print(f"{workers:7d} | {shape} | {1000 * elapsed:11.1f} | {weak_reference / elapsed:10.2f}")
@@ -0,0 +1,73 @@
+"""
+Cost and correctness of keeping the derived fields of the Earth (chunk mass, heat transfer coefficient, specific heat
+capacity) up to date while water evaporates :
+    - "fused" : the evaporation stencil recomputes them in the same pass (the default)
+    - "separate" : a separate stencil recomputes all of them after every tick
+The derived fields of both are compared with the ones recomputed from scratch at the end, and with the ones computed
+at the start (what the model used before they were tracked).
+
+Run with `python3.11 src/benchmarks/derived_fields.py [--shape 32 32 40] [--steps 100] [--evaporation-rate 0.05]`
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from models.physical_class.universe import Universe
+from models.ticking_class.ticking_earth import TickingEarth
+
+
+DERIVED = ("chunk_mass", "heat_transfer_coefficient", "specific_heat_capacity")
+
+
+def build(shape: tuple, evaporation_rate: float, backend: str) -> TickingEarth:
+    universe = Universe(evaporation_rate=evaporation_rate)
+    earth = TickingEarth(shape, backend=backend, universe=universe)
+    earth.enable_tick("water_evaporation")
+    np.random.seed(0)
+    earth.fill_with_water()
+    return earth
+
+
+def max_relative_difference(earth: TickingEarth, reference: dict) -> float:
+    return max(float(np.max(np.abs(earth.interior(getattr(earth, name)) - reference[name]) / np.abs(reference[name])))
+               for name in DERIVED)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--shape", type=int, nargs=3, default=[32, 32, 40])
+    parser.add_argument("--steps", type=int, default=100)
+    parser.add_argument("--evaporation-rate", type=float, default=0.05)
+    parser.add_argument("--backend", default="numpy")
+    args = parser.parse_args()
+    shape = tuple(args.shape)
+
+    print(f"Grid {shape}, {args.steps} steps, evaporation rate {args.evaporation_rate}, backend {args.backend}")
+    print(f"{'variant':>9s} | {'ms per tick':>11s} | {'derived vs recomputed':>21s} | {'initial vs recomputed':>21s} | "
+          f"{'recomputations':>14s}")
+    for variant in ("fused", "separate"):
+        earth = build(shape, args.evaporation_rate, args.backend)
+        initial = {name: np.array(earth.interior(getattr(earth, name))) for name in DERIVED}
+        earth.update()  # Warm up
+        start = time.perf_counter()
+        for _ in range(args.steps):
+            earth.update()
+            if variant == "separate":
+                earth.compute_derived_fields(list(DERIVED))
+        elapsed = (time.perf_counter() - start) / args.steps
+        current = {name: np.array(earth.interior(getattr(earth, name))) for name in DERIVED}
+        earth.compute_derived_fields(list(DERIVED))
+        recomputed = {name: np.array(earth.interior(getattr(earth, name))) for name in DERIVED}
+        for name in DERIVED:
+            getattr(earth, name)[earth.interior_slices] = current[name]
+        error = max_relative_difference(earth, recomputed)
+        for name in DERIVED:
+            getattr(earth, name)[earth.interior_slices] = initial[name]
+        stale = max_relative_difference(earth, recomputed)
+        print(f"{variant:>9s} | {1000 * elapsed:11.3f} | {error:21.2e} | {stale:21.2e} | "
+              f"{earth.derived_recomputations['heat_transfer_coefficient']:14d}")
@@ -0,0 +1,68 @@
+"""
+Time per tick of a TickingEarth without a diagnostics recorder, and with one sampling the default series every N ticks
+into its ring buffer and flushing them to a file. Every sample costs one sweep of global_diagnostics, whatever the
+number of series. The largest energy drift seen by the EnergyDriftAlarm of every run is printed too.
+
+Run with `python3.11 src/benchmarks/diagnostics_overhead.py [--shape 50 50 80] [--steps 100] [--every 1 10]`
+"""
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from models.physical_class.universe import Universe
+from models.ticking_class.ticking_earth import TickingEarth
+from models.ticking_class.ticking_sun import TickingSun
+from output.diagnostics_recorder import DiagnosticsRecorder, EnergyDriftAlarm, read_series
+
+
+def time_per_tick(shape: tuple, backend: str, steps: int, every: int, directory: str) -> tuple[float, dict]:
+    """
+    :param every: the cadence of the recorder, 0 for no recorder
+    :return: the time per tick and the recorder and the alarm of the run (None without a recorder)
+    """
+    universe = Universe()
+    universe.sun = TickingSun(universe=universe)
+    universe.earth = TickingEarth(shape, backend=backend, universe=universe)
+    np.random.seed(0)
+    universe.earth.fill_with_water()
+    universe.update_all()  # Builds the stencils
+    recorder = alarm = None
+    if every:
+        recorder = DiagnosticsRecorder(every=every, capacity=64, path=f"{directory}/every_{every}.bin")
+        alarm = EnergyDriftAlarm(tolerance=np.inf)
+        recorder.add_check(alarm)
+        recorder.attach(universe)
+    start = time.perf_counter()
+    for _ in range(steps):
+        universe.update_all()
+    if recorder is not None:
+        recorder.detach(universe)
+    return (time.perf_counter() - start) / steps, {"recorder": recorder, "alarm": alarm}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--shape", type=int, nargs=3, default=[50, 50, 80])
+    parser.add_argument("--steps", type=int, default=100)
+    parser.add_argument("--every", type=int, nargs="+", default=[1, 10])
+    parser.add_argument("--backend", default="numpy")
+    args = parser.parse_args()
+    shape = tuple(args.shape)
+
+    print(f"Grid {shape}, {args.steps} steps, backend {args.backend}")
+    print(f"{'recorder':>14s} | {'ms per tick':>11s} | {'overhead':>8s} | {'samples':>7s} | {'max energy drift':>16s}")
+    with tempfile.TemporaryDirectory() as directory:
+        reference, _ = time_per_tick(shape, args.backend, args.steps, 0, directory)
+        print(f"{'none':>14s} | {1000 * reference:11.2f} | {'':>8s} | {'':>7s} | {'':>16s}")
+        for every in args.every:
+            elapsed, run = time_per_tick(shape, args.backend, args.steps, every, directory)
+            samples = len(read_series(f"{directory}/every_{every}.bin")["tick"])
+            print(f"{f'every {every}':>14s} | {1000 * elapsed:11.2f} | {100 * (elapsed / reference - 1):7.1f}% | "
+                  f"{samples:7d} | {run['alarm'].max_drift:16.3e}")
+        print(run["recorder"].report())
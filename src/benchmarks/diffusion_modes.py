@@ -0,0 +1,53 @@
+"""
+Compare the time per tick of the staged and fused heat diffusion of TickingEarth.update_temperature.
+tests/test_diffusion_modes.py checks that both modes give the same energies.
+
+The fused mode saves two launches and the scratch field of the exchanged energy, but it has not been measured faster
+than the staged one (one core, 50 x 50 x 80 grid) : 0.7x on numpy and 0.93x on gt:cpu_kfirst. It recomputes the
+temperature over the halo and, on numpy, the backend allocates every temporary of a stencil as a new field at each
+launch : the fused stencil holds more than twice as many at once as any staged one, so their pages are new to the
+process at every tick instead of being reused.
+
+Run with `python3.11 src/benchmarks/diffusion_modes.py [backend]`
+"""
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from models.physical_class.universe import Universe
+from models.ticking_class.ticking_earth import TickingEarth
+
+
+def build_earth(grid_shape: tuple, backend: str, diffusion_mode: str) -> TickingEarth:
+    np.random.seed(0)
+    earth = TickingEarth(shape=grid_shape, backend=backend, diffusion_mode=diffusion_mode)
+    earth.fill_with_water()
+    return earth
+
+
+def time_per_tick(earth: TickingEarth, nb_steps: int) -> float:
+    earth.update_temperature()  # Warm up
+    start = time.perf_counter()
+    for _ in range(nb_steps):
+        earth.update_temperature()
+    return (time.perf_counter() - start) / nb_steps
+
+
+if __name__ == "__main__":
+    backend = sys.argv[1] if len(sys.argv) > 1 else "numpy"
+    grid_shape = (50, 50, 80)
+    nb_steps = 20
+
+    universe = Universe()
+    staged = build_earth(grid_shape, backend, "staged")
+    fused = build_earth(grid_shape, backend, "fused")
+
+    staged_time = time_per_tick(staged, nb_steps)
+    fused_time = time_per_tick(fused, nb_steps)
+    print(f"Grid {grid_shape} on {backend}:")
+    print(f"- staged: {1000 * staged_time:.2f} ms per tick")
+    print(f"- fused: {1000 * fused_time:.2f} ms per tick ({staged_time / fused_time:.2f}x)")
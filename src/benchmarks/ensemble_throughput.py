@@ -0,0 +1,85 @@
+"""
+Throughput of an EnsembleEarth advancing M members in one launch per stencil, against M TickingEarth advanced one after
+the other, in member-steps per second. Every member of the ensemble is also checked against an independent run started
+from the same initial conditions.
+
+Run with `python3.11 src/benchmarks/ensemble_throughput.py [--members 1 4 16] [--shape 16 16 16] [--steps 20]`
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from models.physical_class.universe import Universe
+from models.ticking_class.ensemble_earth import EnsembleEarth
+from models.ticking_class.ticking_earth import TickingEarth
+
+
+RADIATION = 1e20  # Energy received from the Sun at every step
+
+
+def step(earth: TickingEarth):
+    earth.update()
+    earth.receive_radiation(RADIATION)
+
+
+def time_steps(earths: list, nb_steps: int) -> float:
+    for earth in earths:  # Warm up
+        step(earth)
+    start = time.perf_counter()
+    for _ in range(nb_steps):
+        for earth in earths:
+            step(earth)
+    return time.perf_counter() - start
+
+
+def measure(members: int, shape: tuple, nb_steps: int, backend: str, diffusion_mode: str) -> tuple[float, float, float]:
+    """
+    :return: member-steps per second of the ensemble, of the independent runs, and the largest relative difference of
+    the chunk temperatures between a member and its independent run
+    """
+    np.random.seed(0)
+    ensemble = EnsembleEarth(shape, members, backend=backend, diffusion_mode=diffusion_mode)
+    ensemble.fill_with_water()
+    independents = []
+    for member in range(members):
+        earth = TickingEarth(shape, backend=backend, diffusion_mode=diffusion_mode)
+        earth.fill_with_water()
+        earth.interior(earth.water_energy)[...] = ensemble.member(ensemble.water_energy, member)
+        earth.exchange_halos("water_energy")
+        earth.touch("water_energy")
+        independents.append(earth)
+
+    ensemble_rate = members * nb_steps / time_steps([ensemble], nb_steps)
+    independent_rate = members * nb_steps / time_steps(independents, nb_steps)
+
+    ensemble.member_diagnostics()
+    error = 0.0
+    for member, earth in enumerate(independents):
+        earth.global_diagnostics()
+        reference = earth.interior(earth.chunk_temp)
+        error = max(error, float(np.max(np.abs(ensemble.member(ensemble.chunk_temp, member) - reference) / np.abs(reference))))
+    return ensemble_rate, independent_rate, error
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--members", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--shape", type=int, nargs=3, default=[16, 16, 16])
+    parser.add_argument("--steps", type=int, default=20)
+    parser.add_argument("--backend", default="numpy")
+    parser.add_argument("--diffusion-mode", default="staged", choices=TickingEarth.DIFFUSION_MODES)
+    args = parser.parse_args()
+
+    universe = Universe()
+    print(f"Member shape {tuple(args.shape)}, {args.steps} steps, backend {args.backend}, {args.diffusion_mode} diffusion")
+    print("members | ensemble (member-steps/s) | independent (member-steps/s) | speedup | max relative difference")
+    for members in args.members:
+        ensemble_rate, independent_rate, error = measure(members, tuple(args.shape), args.steps, args.backend,
+                                                         args.diffusion_mode)
+        print(f"{members:7d} | {ensemble_rate:25.1f} | {independent_rate:28.1f} | {ensemble_rate / independent_rate:7.2f} | "
+              f"{error:.2e}")
@@ -0,0 +1,66 @@
+"""
+Accuracy and cost of the heat diffusion modes against the time step. Every run integrates the same initial conditions
+over the same simulated time, the error is the RMS difference of the chunk temperature with a staged run using a time
+step 10 times smaller than the smallest one tried, relative to the spread of the initial temperature.
+The stable time step estimated by TickingEarth.stable_time_delta is printed for every mode.
+
+Run with `python3.11 src/benchmarks/implicit_diffusion.py [--shape 16 16 80] [--time 2.0] [--dts 0.01 0.05 0.1 0.2 0.3]`
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from models.physical_class.universe import Universe
+from models.ticking_class.ticking_earth import TickingEarth
+
+
+def run(shape: tuple, diffusion_mode: str, dt: float, simulated_time: float, backend: str) -> tuple[np.ndarray, float, TickingEarth]:
+    """
+    :return: the final chunk temperature, the wall time per simulated time unit and the Earth
+    """
+    universe = Universe(time_delta=dt)
+    earth = TickingEarth(shape, backend=backend, diffusion_mode=diffusion_mode, universe=universe)
+    np.random.seed(0)
+    earth.fill_with_water()
+    nb_steps = round(simulated_time / dt)
+    start = time.perf_counter()
+    for _ in range(nb_steps):
+        earth.update()
+    elapsed = time.perf_counter() - start
+    earth.global_diagnostics()  # Brings the chunk temperature up to date
+    return np.array(earth.interior(earth.chunk_temp)), elapsed / simulated_time, earth
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--shape", type=int, nargs=3, default=[16, 16, 80])
+    parser.add_argument("--time", type=float, default=2.0, help="simulated time of every run")
+    parser.add_argument("--dts", type=float, nargs="+", default=[0.01, 0.05, 0.1, 0.2, 0.3])
+    parser.add_argument("--modes", nargs="+", default=["staged", "implicit_k"], choices=TickingEarth.DIFFUSION_MODES)
+    parser.add_argument("--backend", default="numpy")
+    args = parser.parse_args()
+    shape = tuple(args.shape)
+
+    reference, _, earth = run(shape, "staged", min(args.dts) / 10, args.time, args.backend)
+    universe = Universe()
+    np.random.seed(0)
+    initial = TickingEarth(shape, backend=args.backend, universe=universe)
+    initial.fill_with_water()
+    initial.global_diagnostics()
+    spread = float(np.std(initial.interior(initial.chunk_temp)))
+    for mode in args.modes:
+        initial.diffusion_mode = mode
+        print(f"{mode}: stable time step {initial.stable_time_delta():.4f}")
+
+    print(f"Grid {shape}, {args.time} time units, error relative to the initial spread of {spread:.3f} K")
+    print(f"{'mode':>10s} | {'dt':>6s} | {'steps':>5s} | {'s per time unit':>15s} | {'relative RMS error':>18s}")
+    for mode in args.modes:
+        for dt in args.dts:
+            temperature, cost, _ = run(shape, mode, dt, args.time, args.backend)
+            error = float(np.sqrt(np.mean((temperature - reference) ** 2))) / spread
+            print(f"{mode:>10s} | {dt:6.3f} | {round(args.time / dt):5d} | {cost:15.4f} | {error:18.3e}")
@@ -0,0 +1,76 @@
+"""
+Time to set the initial conditions of a large Earth :
+    - "global" : fill_with_water from the global numpy random state (one thread, scratch field and stencil)
+    - "tiles xN" : fill_with_water(seed=...) with counter-based streams on N threads, checked identical for every N
+    - "np.load" : the fields of the .npy files read in memory then copied into the storages
+    - "mmap xN" : load_initial_fields, the memory-mapped files copied plane by plane into the storages on N threads
+The files are written once by save_initial_fields and read warm from the page cache.
+
+Run with `python3.11 src/benchmarks/initial_conditions.py [--shape 200 200 80] [--workers 1 2 4] [--repeat 3]`
+"""
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from models import initial_conditions
+from models.physical_class.universe import Universe
+from models.ticking_class.ticking_earth import TickingEarth
+
+
+def best_time(function, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--shape", type=int, nargs=3, default=[200, 200, 80])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--backend", default="numpy")
+    args = parser.parse_args()
+    shape = tuple(args.shape)
+
+    earth = TickingEarth(shape, backend=args.backend, universe=Universe())
+    timings = {"global": best_time(earth.fill_with_water, args.repeat)}
+    reference = None
+    for workers in args.workers:
+        timings[f"tiles x{workers}"] = best_time(lambda: earth.fill_with_water(seed=0, workers=workers), args.repeat)
+        energy = np.array(earth.interior(earth.water_energy))
+        if reference is None:
+            reference = energy
+        elif not np.array_equal(energy, reference):
+            raise RuntimeError(f"The initial conditions generated with {workers} threads differ")
+
+    with tempfile.TemporaryDirectory() as directory:
+        initial_conditions.save_initial_fields(earth, directory)
+
+        def load_in_memory():
+            for name in ("water_energy", "water_mass", "air_energy", "air_mass", "land_energy", "land_mass"):
+                earth.interior(getattr(earth, name))[...] = np.load(Path(directory) / f"{name}.npy")
+            earth.exchange_halos("water_energy", "water_mass", "air_energy", "air_mass", "land_energy", "land_mass")
+            earth.touch("water_energy", "water_mass", "air_energy", "air_mass", "land_energy", "land_mass")
+            earth.refresh_derived_fields()
+
+        timings["np.load"] = best_time(load_in_memory, args.repeat)
+        for workers in args.workers:
+            timings[f"mmap x{workers}"] = best_time(
+                lambda: initial_conditions.load_initial_fields(earth, directory, workers=workers), args.repeat)
+        if not np.array_equal(earth.interior(earth.water_energy), reference):
+            raise RuntimeError("The loaded fields differ from the saved ones")
+
+    print(f"Grid {shape}, backend {args.backend}, best of {args.repeat}, "
+          f"{initial_conditions.default_workers()} CPUs available")
+    print(f"{'method':>10s} | {'time (s)':>8s} | {'vs global':>9s}")
+    for method, elapsed in timings.items():
+        print(f"{method:>10s} | {elapsed:8.3f} | {timings['global'] / elapsed:8.2f}x")
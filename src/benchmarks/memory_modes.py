@@ -0,0 +1,77 @@
+"""
+Memory per grid chunk of the full and lean memory modes of the Earth, for every diffusion mode they support, with the
+time per tick and the difference of the lean runs with the full ones started from the same initial conditions.
+The memory is the one held by the Earth after the run (fields, workspace and double buffers, halo included) and the
+peak of the temporary allocations during a tick measured with tracemalloc (the temporaries of the numpy backend).
+The last column is the number of grid chunks fitting in the given memory budget, counting both the memory held by
+the Earth and the peak of the temporaries of a tick.
+
+Run with `python3.11 src/benchmarks/memory_modes.py [--shape 32 32 40] [--steps 50] [--budget-gib 16]`
+"""
+import argparse
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from models.physical_class.universe import Universe
+from models.ticking_class.ticking_earth import TickingEarth
+from models.ticking_class.ticking_sun import TickingSun
+
+
+def build(shape: tuple, memory_mode: str, diffusion_mode: str, backend: str) -> Universe:
+    universe = Universe()
+    universe.sun = TickingSun(universe=universe)
+    universe.earth = TickingEarth(shape, backend=backend, diffusion_mode=diffusion_mode, universe=universe,
+                                  memory_mode=memory_mode)
+    for name in ("water_evaporation", "carbon_cycle"):
+        universe.earth.enable_tick(name)
+    np.random.seed(0)
+    universe.earth.fill_with_water()
+    return universe
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--shape", type=int, nargs=3, default=[32, 32, 40])
+    parser.add_argument("--steps", type=int, default=50)
+    parser.add_argument("--budget-gib", type=float, default=16.0)
+    parser.add_argument("--backend", default="numpy")
+    args = parser.parse_args()
+    shape = tuple(args.shape)
+    cells = int(np.prod(shape))
+
+    print(f"Grid {shape}, {args.steps} steps, backend {args.backend}")
+    print(f"{'memory':>6s} | {'diffusion':>10s} | {'fields B/cell':>13s} | {'scratch B/cell':>14s} | "
+          f"{'extra B/cell':>12s} | {'total B/cell':>12s} | {'peak tick B/cell':>16s} | {'ms per tick':>11s} | "
+          f"{'temperature diff':>16s} | {'cells in budget':>15s}")
+    for diffusion_mode in TickingEarth.DIFFUSION_MODES:
+        temperatures = dict()
+        for memory_mode in TickingEarth.MEMORY_MODES:
+            if memory_mode == "lean" and diffusion_mode == "fused":
+                continue
+            universe = build(shape, memory_mode, diffusion_mode, args.backend)
+            earth = universe.earth
+            universe.update_all()  # Warm up
+            tracemalloc.start()
+            tracemalloc.reset_peak()
+            universe.update_all()
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            start = time.perf_counter()
+            for _ in range(args.steps):
+                universe.update_all()
+            elapsed = (time.perf_counter() - start) / args.steps
+            earth.global_diagnostics()  # Brings the chunk temperature up to date
+            temperatures[memory_mode] = np.array(earth.interior(earth.chunk_temp))
+            difference = float(np.max(np.abs(temperatures[memory_mode] - temperatures["full"]) / temperatures["full"]))
+            usage = earth.memory_usage()
+            budget_cells = int(args.budget_gib * 2 ** 30 / (usage["bytes_per_cell"] + peak / cells))
+            print(f"{memory_mode:>6s} | {diffusion_mode:>10s} | {usage['fields'] / cells:13.1f} | "
+                  f"{usage['scratch'] / cells:14.1f} | {usage['extra'] / cells:12.1f} | {usage['bytes_per_cell']:12.1f} | "
+                  f"{peak / cells:16.1f} | {1000 * elapsed:11.2f} | {difference:16.2e} | {budget_cells:15.3e}")
+    print("(B/cell : bytes per grid chunk, halo included ; temperature diff : max relative difference with the full run)")
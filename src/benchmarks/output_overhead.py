@@ -0,0 +1,69 @@
+"""
+Throughput of the simulation with and without the asynchronous snapshot output.
+
+Outputs : the full chunk temperature every 10 ticks, its level K = 20 every tick and the water mass every 5 ticks.
+Run with `python3.11 src/benchmarks/output_overhead.py [backend] [nb_steps]`
+"""
+import sys
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from models.ABC.celestial_body import CelestialBody
+from models.ticking_class.ticking_earth import TickingEarth
+from models.ticking_class.ticking_sun import TickingSun
+from output.snapshot_writer import SnapshotWriter, read_snapshot
+
+
+def build_universe(backend: str, grid_shape: tuple):
+    np.random.seed(0)
+    universe = CelestialBody.default_universe()
+    universe.sun = TickingSun()
+    universe.earth = TickingEarth(shape=grid_shape, backend=backend)
+    universe.discover_everything()
+    universe.earth.fill_with_water()
+    return universe
+
+
+def run(universe, nb_steps: int) -> float:
+    universe.update_all()  # Warm up
+    start = time.perf_counter()
+    for _ in range(nb_steps):
+        universe.update_all()
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    backend = sys.argv[1] if len(sys.argv) > 1 else "numpy"
+    nb_steps = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    grid_shape = (50, 50, 80)
+
+    universe = build_universe(backend, grid_shape)
+    without_output = run(universe, nb_steps)
+
+    directory = Path(tempfile.mkdtemp(prefix="snapshots_"))
+    universe = build_universe(backend, grid_shape)
+    writer = SnapshotWriter(directory)
+    writer.register("chunk_temp", universe.earth, "chunk_temp", every=10)
+    writer.register("chunk_temp_k20", universe.earth, "chunk_temp", (slice(None), slice(None), 20), every=1)
+    writer.register("water_mass", universe.earth, "water_mass", every=5)
+    writer.attach(universe)
+    with_output = run(universe, nb_steps)
+    start = time.perf_counter()
+    writer.detach(universe)
+    drain = time.perf_counter() - start
+
+    last = max(writer.outputs["chunk_temp"].ticks)
+    written = read_snapshot(directory / "chunk_temp" / f"chunk_temp_t{last:08d}.npz")
+    assert written.shape == grid_shape
+    print(f"Grid {grid_shape}, backend {backend}, {nb_steps} steps")
+    print(f"- Without output: {nb_steps / without_output:8.2f} steps/s")
+    print(f"- With output:    {nb_steps / with_output:8.2f} steps/s ({100 * (with_output / without_output - 1):+.1f} %), "
+          f"then {drain:.3f} s to write the last snapshots")
+    print(writer.report())
+    shutil.rmtree(directory)
@@ -0,0 +1,76 @@
+"""
+Drift of a float32 Earth against a float64 Earth started from the same initial conditions, with the memory and time per
+tick of both. The drift is sampled along the run on the global diagnostics (accumulated in float64 in both cases) and
+on the chunk temperature field.
+
+Run with `python3.11 src/benchmarks/precision_drift.py [--shape 32 32 40] [--steps 200] [--sample-every 20]`
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from models.physical_class.universe import Universe
+from models.ticking_class.ticking_earth import TickingEarth
+from models.ticking_class.ticking_sun import TickingSun
+
+
+def build(shape: tuple, dtype, backend: str, diffusion_mode: str) -> Universe:
+    universe = Universe()
+    universe.sun = TickingSun(universe=universe)
+    universe.earth = TickingEarth(shape, backend=backend, diffusion_mode=diffusion_mode, universe=universe, dtype=dtype)
+    np.random.seed(0)
+    universe.earth.fill_with_water()
+    return universe
+
+
+def field_bytes(earth: TickingEarth) -> int:
+    return sum(getattr(earth, name).nbytes for name in earth.STORAGE_FIELDS)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--shape", type=int, nargs=3, default=[32, 32, 40])
+    parser.add_argument("--steps", type=int, default=200)
+    parser.add_argument("--sample-every", type=int, default=20)
+    parser.add_argument("--backend", default="numpy")
+    parser.add_argument("--diffusion-mode", default="staged", choices=TickingEarth.DIFFUSION_MODES)
+    args = parser.parse_args()
+    shape = tuple(args.shape)
+
+    universes = {dtype: build(shape, dtype, args.backend, args.diffusion_mode) for dtype in (np.float64, np.float32)}
+    for universe in universes.values():
+        universe.update_all()  # Warm up
+    elapsed = dict.fromkeys(universes, 0.0)
+
+    print(f"Grid {shape}, {args.steps} steps, backend {args.backend}, {args.diffusion_mode} diffusion")
+    print(f"{'tick':>6s} | {'average temperature':>19s} | {'total energy':>12s} | {'max temperature':>15s} | "
+          f"{'chunk temperature max':>21s} | {'chunk temperature RMS':>21s}")
+    for step in range(1, args.steps + 1):
+        for dtype, universe in universes.items():
+            start = time.perf_counter()
+            universe.update_all()
+            elapsed[dtype] += time.perf_counter() - start
+        if step % args.sample_every == 0 or step == args.steps:
+            reference, low = (universes[dtype].earth for dtype in (np.float64, np.float32))
+            drift = {name: abs(low.global_diagnostics()[name] - reference.global_diagnostics()[name]) /
+                     abs(reference.global_diagnostics()[name])
+                     for name in ("average_temperature", "total_energy", "max_temperature")}
+            difference = (reference.interior(reference.chunk_temp) - low.interior(low.chunk_temp)) / \
+                reference.interior(reference.chunk_temp)
+            print(f"{reference.get_time():6d} | {drift['average_temperature']:19.2e} | {drift['total_energy']:12.2e} | "
+                  f"{drift['max_temperature']:15.2e} | {np.max(np.abs(difference)):21.2e} | "
+                  f"{np.sqrt(np.mean(difference ** 2)):21.2e}")
+    print("(relative differences of the float32 run with the float64 run)")
+
+    cells = int(np.prod(shape))
+    print(f"{'dtype':>7s} | {'field memory (MiB)':>18s} | {'bytes per cell':>14s} | {'ms per tick':>11s}")
+    for dtype, universe in universes.items():
+        memory = field_bytes(universe.earth)
+        print(f"{np.dtype(dtype).name:>7s} | {memory / 2 ** 20:18.2f} | {memory / cells:14.1f} | "
+              f"{1000 * elapsed[dtype] / args.steps:11.2f}")
+    print(f"float32 speedup: {elapsed[np.float64] / elapsed[np.float32]:.2f}x")
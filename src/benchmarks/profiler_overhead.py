@@ -0,0 +1,64 @@
+"""
+Cost of the profiling hooks : throughput of the model with the profiler disabled and enabled, and the profile itself.
+
+Run with `python3.11 src/benchmarks/profiler_overhead.py [backend] [nb_steps]`, the profile is written in
+profile.json and profile_trace.json (open it with chrome://tracing or https://ui.perfetto.dev)
+"""
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from models.ABC.celestial_body import CelestialBody
+from models.profiler import PROFILER, ProfiledStencil
+from models.ticking_class.ticking_earth import TickingEarth
+from models.ticking_class.ticking_sun import TickingSun
+
+
+def steps_per_second(universe, nb_steps: int) -> float:
+    start = time.perf_counter()
+    for _ in range(nb_steps):
+        universe.update_all()
+        universe.earth.average_temperature
+    return nb_steps / (time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    backend = sys.argv[1] if len(sys.argv) > 1 else "numpy"
+    nb_steps = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    grid_shape = (50, 50, 80)
+
+    np.random.seed(0)
+    universe = CelestialBody.default_universe()
+    universe.sun = TickingSun()
+    universe.earth = TickingEarth(shape=grid_shape, backend=backend)
+    universe.discover_everything()
+    universe.earth.fill_with_water()
+    universe.earth.enable_tick("water_evaporation")
+    universe.earth.enable_tick("carbon_cycle")
+    universe.update_all()
+
+    # Alternate the runs so that both see the same state of the machine
+    disabled, enabled = [], []
+    for _ in range(3):
+        disabled.append(steps_per_second(universe, nb_steps))
+        PROFILER.reset()
+        with PROFILER.profiling():
+            enabled.append(steps_per_second(universe, nb_steps))
+
+    handle = ProfiledStencil("noop", lambda: None)
+    start = time.perf_counter()
+    for _ in range(1_000_000):
+        handle()
+    disabled_call = (time.perf_counter() - start) / 1_000_000
+
+    print(f"Grid {grid_shape}, backend {backend}, {nb_steps} steps, best of 3")
+    print(f"- Profiler disabled: {max(disabled):8.2f} steps/s")
+    print(f"- Profiler enabled:  {max(enabled):8.2f} steps/s ({100 * (max(disabled) / max(enabled) - 1):+.1f} % time)")
+    print(f"- Disabled stencil handle: {1e9 * disabled_call:.0f} ns per call")
+    print(PROFILER.report())
+    PROFILER.to_json("profile.json")
+    PROFILER.to_chrome_trace("profile_trace.json")
@@ -0,0 +1,70 @@
+"""
+Time to the end of the first step of a TickingEarth, from a cold GT4Py cache, for the ways of building the stencils :
+    - "eager" : every stencil of the Earth built one after the other at construction (what the Earth used to do)
+    - "lazy" : every stencil built at its first launch, the ones the run never launches are never built
+    - "warm-up xN" : the stencils the run needs compiled at construction in a pool of N processes
+Every mode starts from an empty GT4Py cache (in a temporary directory) and an empty stencil registry. The startup
+report of the Earth of the last mode is printed at the end.
+
+Run with `python3.11 src/benchmarks/startup_time.py [--backend gt:cpu_kfirst] [--workers 2 4] [--shape 16 16 20]`
+"""
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from gt4py.cartesian import config as gt_config
+
+from models.physical_class.universe import Universe
+from models.stencil_registry import STENCIL_REGISTRY
+from models.ticking_class.ticking_earth import TickingEarth
+from models.ticking_class.ticking_sun import TickingSun
+
+
+def time_to_first_step(shape: tuple, backend: str, mode: str, workers: int) -> tuple[float, float, TickingEarth]:
+    """
+    :return: the construction time, the time to the end of the first step and the Earth
+    """
+    STENCIL_REGISTRY.clear()
+    with tempfile.TemporaryDirectory() as cache:
+        gt_config.cache_settings["root_path"] = cache
+        start = time.perf_counter()
+        universe = Universe()
+        universe.sun = TickingSun(universe=universe)
+        universe.earth = TickingEarth(shape, backend=backend, universe=universe, warm_up=mode == "warm-up",
+                                      warm_up_workers=workers)
+        if mode == "eager":
+            universe.earth.warm_up_stencils(names=list(universe.earth.stencil_handles), workers=1)
+        construction = time.perf_counter() - start
+        np.random.seed(0)
+        universe.earth.fill_with_water()
+        universe.update_all()
+        return construction, time.perf_counter() - start, universe.earth
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--shape", type=int, nargs=3, default=[16, 16, 20])
+    parser.add_argument("--backend", default="gt:cpu_kfirst")
+    parser.add_argument("--workers", type=int, nargs="+", default=[2, 4])
+    args = parser.parse_args()
+    shape = tuple(args.shape)
+    root_path = gt_config.cache_settings["root_path"]
+
+    modes = [("eager", 1), ("lazy", 1)] + [("warm-up", workers) for workers in args.workers]
+    print(f"Grid {shape}, backend {args.backend}, cold GT4Py cache")
+    print(f"{'mode':>12s} | {'construction (s)':>16s} | {'first step done (s)':>19s} | {'stencils built':>14s}")
+    try:
+        for mode, workers in modes:
+            construction, first_step, earth = time_to_first_step(shape, args.backend, mode, workers)
+            label = f"{mode} x{workers}" if mode == "warm-up" else mode
+            built = sum(handle.built for handle in earth.stencil_handles.values())
+            print(f"{label:>12s} | {construction:16.2f} | {first_step:19.2f} | {built:8d} of {len(earth.stencil_handles):2d}")
+    finally:
+        gt_config.cache_settings["root_path"] = root_path
+    print(earth.startup_report())
@@ -0,0 +1,64 @@
+"""
+Python overhead of TickingModel.update on models with many no-op on_tick methods.
+
+The former dispatch walked one global list of every on_tick method of every model and filtered it by module at each
+tick, it is reproduced here as `legacy_update` for comparison. The per-class dispatch table only walks the enabled
+methods of the model being updated, whatever the number of other models.
+
+Run with `python3.11 src/benchmarks/tick_dispatch_overhead.py [nb_ticks]`
+"""
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from models.ABC.ticking_model import TickingModel
+
+LEGACY_METHODS = []
+
+
+def make_model(name: str, nb_methods: int, nb_disabled: int = 0) -> type:
+    """
+    Builds a TickingModel subclass in its own module with `nb_methods` no-op on_tick methods, the last `nb_disabled`
+    ones being disabled, and registers them in the legacy global list as well
+    """
+    namespace = {"__module__": f"tick_dispatch_{name}"}
+    for index in range(nb_methods):
+        def method(self):
+            pass
+        method.__module__ = namespace["__module__"]
+        enabled = index < nb_methods - nb_disabled
+        namespace[f"method_{index}"] = TickingModel.on_tick(enabled=enabled)(method)
+        method.enabled = enabled
+        LEGACY_METHODS.append(method)
+    return type(name, (TickingModel,), namespace)
+
+
+def legacy_update(model: TickingModel):
+    modules = {cls.__module__ for cls in type(model).__mro__}
+    for method in LEGACY_METHODS:
+        if method.enabled and method.__module__ in modules:
+            method(model)
+    model._t += 1
+
+
+def per_tick(update, model, nb_ticks: int) -> float:
+    update(model)  # Builds the dispatch table
+    start = time.perf_counter()
+    for _ in range(nb_ticks):
+        update(model)
+    return (time.perf_counter() - start) / nb_ticks
+
+
+if __name__ == "__main__":
+    nb_ticks = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    print(f"{'model':>40s} | {'legacy':>10s} | {'table':>10s}")
+    for nb_methods, nb_disabled, nb_other_models in ((10, 0, 0), (200, 0, 0), (200, 150, 0), (10, 0, 20), (200, 0, 20)):
+        LEGACY_METHODS.clear()
+        others = [make_model(f"Other{index}", 200) for index in range(nb_other_models)]
+        model = make_model("Model", nb_methods, nb_disabled)()
+        legacy = per_tick(legacy_update, model, nb_ticks)
+        table = per_tick(TickingModel.update, model, nb_ticks)
+        description = f"{nb_methods} methods ({nb_disabled} disabled), {nb_other_models * 200} others"
+        print(f"{description:>40s} | {1e6 * legacy:7.1f} us | {1e6 * table:7.1f} us")
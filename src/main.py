@@ -1,62 +1,110 @@
 import random
 import sys
 import matplotlib.pyplot as plt
-from matplotlib.colors import Normalize
 import numpy as np
 
 
 from tqdm import trange
 
+from models import initial_conditions
 from models.physical_class.universe import Universe
+from models.profiler import PROFILER
+from models.stencil_registry import STENCIL_REGISTRY
 from models.ticking_class.ticking_earth import TickingEarth
 from models.ticking_class.ticking_sun import TickingSun
+from output.diagnostics_recorder import DiagnosticsRecorder, EnergyDriftAlarm
+from output.live_viewer import LiveViewer
+from output.snapshot_writer import SnapshotWriter
 
 np.random.seed(0)
 
 
-def init_graph():
+def save_plot(filename: str):
     fig, ax = plt.subplots()
-    # Do not plot the borders
-    cax = ax.matshow(universe.earth.chunk_temp[1:-1,1:-1,20], cmap='coolwarm')
+    cax = ax.matshow(universe.earth.interior(universe.earth.chunk_temp)[:, :, 20], cmap='coolwarm')
     fig.colorbar(cax)
-    plt.savefig("initial_plot.png")
-    plt.ion()
-    return fig, ax, cax
-
-
-def update_graph(cax):
-    # Update the colorbar
-    cax.set_norm(Normalize(vmin=np.min(universe.earth.chunk_temp[1:-1,1:-1,20]), vmax=np.max(universe.earth.chunk_temp[1:-1,1:-1,20])))
-    # Update the data
-    cax.set_array(universe.earth.chunk_temp[1:-1,1:-1,20])
-    plt.draw()
-    plt.pause(0.1)
-
-
-def final_plot():
-    plt.ioff()
-    plt.savefig(f"final_plot_{nb_steps}_steps.png")
-    plt.show()
+    plt.savefig(filename)
+    plt.close(fig)
 
 if __name__ == "__main__":
     backend = "numpy"
     grid_shape = (50, 50, 80)
     nb_steps = 50
-
-    # Set to True to plot an interactive evolution of the temperature, False to compute at full speed
-    # Note that the plot will be updated every 0.1 seconds, slowing down the simulation in order to visualize it
+    # "staged" (3 stencils) or "fused" (1 stencil, not faster so far, see benchmarks/diffusion_modes.py) explicit heat
+    # diffusion, or "implicit_k" (implicit along K). The largest stable time step of a mode is given by
+    # universe.earth.stable_time_delta()
+    diffusion_mode = "staged"
+    # Precision of the fields and stencils, np.float32 halves the memory and the bandwidth (the global diagnostics are
+    # still accumulated in float64). See benchmarks/precision_drift.py for the drift against float64
+    dtype = np.float64
+    # "full" stores every field, "lean" computes the heat transfer coefficient, specific heat capacity and chunk mass on
+    # the fly in the stencils (about 40% less memory per chunk, not with the fused diffusion).
+    # See benchmarks/memory_modes.py
+    memory_mode = "full"
+    # Set to True to launch the stencils branching on the components per K slab, reading only the components present in
+    # the slab. Pays off on layered grids (land, ocean, atmosphere), see benchmarks/component_masks.py
+    component_masks = False
+    # The stencils are compiled at their first launch. Set to True to compile the ones the run needs while the Earth is
+    # built instead, concurrently in one process per CPU
+    warm_up = False
+    # Set to True to trial-run every stencil on the CPU backends sharing the storages of `backend` and keep the fastest.
+    # The choices are saved in .stencil_autotune.json and reused by the next runs on the same machine and grid shape
+    autotune = False
+    # Directory to restart from (None to start from new initial conditions), and interval in steps between the
+    # checkpoints written to `checkpoint_directory` (0 to never write one)
+    restart_from = None
+    # When not restarting : directory of .npy files of the initial fields to load (see models/initial_conditions.py),
+    # else the Earth is filled with water, with temperatures from the global random state if initial_seed is None or
+    # generated in parallel from counter-based streams of that seed (the same whatever the number of threads)
+    initial_fields_directory = None
+    initial_seed = None
+    checkpoint_directory = "checkpoint"
+    checkpoint_every = 0
+    # Set to True to time every on_tick method, stencil launch and diagnostic. The summary is printed at the end and the
+    # timeline written in profile_trace.json (open it with chrome://tracing or https://ui.perfetto.dev)
+    profile = False
+    # Directory where snapshots of the chunk temperature are written in the background (None for no output)
+    snapshot_directory = None
+    # Interval in steps between the samples of the global diagnostics (0 to record none). The last samples are kept in
+    # memory and, if diagnostics_path is not None, all of them are written to that file (read it with read_series).
+    # A warning is emitted when the total energy minus the absorbed radiation drifts by more than energy_drift_tolerance
+    diagnostics_every = 0
+    diagnostics_path = None
+    energy_drift_tolerance = 1e-6
+
+    # Set to True to plot an interactive evolution of the temperature. The plot is drawn by another process at 10 frames
+    # per second at most, skipping the steps it has no time to draw, so the simulation runs at nearly full speed
     visualisation = False
 
 
     universe = Universe()
-    universe.sun = TickingSun()  # Can be replaced with Sun()
+    universe.sun = TickingSun(universe=universe)  # Can be replaced with Sun(universe=universe)
     print("Running model with backend:", backend)
     print("Generating the earth...")
-    universe.earth = TickingEarth(shape=grid_shape, backend=backend)
-    universe.discover_everything()
-
-    # Fills the earth with random GridChunk of water
-    universe.earth.fill_with_water()
+    universe.earth = TickingEarth(shape=grid_shape, backend=backend, diffusion_mode=diffusion_mode,
+                                  autotune=autotune, universe=universe, dtype=dtype, memory_mode=memory_mode,
+                                  component_masks=component_masks, warm_up=warm_up)
+
+    if restart_from is None:
+        if initial_fields_directory is not None:
+            initial_conditions.load_initial_fields(universe.earth, initial_fields_directory)
+        else:
+            # Fills the earth with random GridChunk of water
+            universe.earth.fill_with_water(seed=initial_seed)
+    else:
+        universe.restore(restart_from)
+
+    if snapshot_directory is not None:
+        snapshot_writer = SnapshotWriter(snapshot_directory)
+        snapshot_writer.register("chunk_temp", universe.earth, "chunk_temp", every=10)
+        snapshot_writer.register("chunk_temp_k20", universe.earth, "chunk_temp", (slice(None), slice(None), 20))
+        snapshot_writer.attach(universe)
+
+    if diagnostics_every:
+        diagnostics_recorder = DiagnosticsRecorder(every=diagnostics_every, path=diagnostics_path)
+        energy_drift_alarm = EnergyDriftAlarm(tolerance=energy_drift_tolerance)
+        diagnostics_recorder.add_check(energy_drift_alarm)
+        diagnostics_recorder.attach(universe)
 
     print("Done.")
     print("Updating Universe 10 times...")
@@ -64,15 +112,39 @@ if __name__ == "__main__":
     
 
     if visualisation:
-        fig, ax, cax = init_graph() # Uncomment this line to plot the evolution of the temperature
+        save_plot("initial_plot.png")
+        viewer = LiveViewer(universe.earth, "chunk_temp", (slice(None), slice(None), 20), frame_rate=10,
+                            keep_open=True)
+        viewer.attach(universe)
 
+    if profile:
+        PROFILER.enable()
     for i in trange(nb_steps):
         universe.update_all()
-        if visualisation:
-            update_graph(cax) 
+        if checkpoint_every and (i + 1) % checkpoint_every == 0:
+            universe.checkpoint(checkpoint_directory)
 
+    if profile:
+        PROFILER.disable()
     print(universe)
+    if profile:
+        print(PROFILER.report())
+        PROFILER.to_json("profile.json")
+        PROFILER.to_chrome_trace("profile_trace.json")
+    if snapshot_directory is not None:
+        snapshot_writer.detach(universe)
+        print(snapshot_writer.report())
+    if diagnostics_every:
+        diagnostics_recorder.detach(universe)
+        print(diagnostics_recorder.report())
+        print(f"Largest energy drift: {energy_drift_alarm.max_drift:.3e}")
+    print(STENCIL_REGISTRY.report())
+    print(universe.earth.startup_report())
+    print(universe.earth.workspace.report())
+    if autotune:
+        print(universe.earth.autotuner.report())
     if visualisation:
-        final_plot() # Uncomment this line to plot the evolution of the temperature
+        save_plot(f"final_plot_{nb_steps}_steps.png")
+        viewer.detach(universe)  # Waits for the window to be closed
 
 
@@ -13,25 +13,47 @@ class CelestialBody:
     Abstract class for celestial bodies. This class must be inherited by any model that has a galactic scale, that is
     that interacts with the universe or other celestial bodies. Examples are the Sun, the Earth, an asteroid, a comet,
     satellites, etc
+
+    A body belongs to the universe it is given at construction, or to the default universe of the process if it is
+    given none. Bodies bound to different universes never see each other, so one process can host several independent
+    simulations
     """
     __universe: "Universe" = None
+    _universe: "Universe" = None
     radius: float
     objects_in_line_of_sight: list["CelestialBody"]
     objects_out_of_line_of_sight: list["CelestialBody"]
 
-    def __init__(self, radius: float):
+    def __init__(self, radius: float, universe: "Universe" = None):
+        """
+        :param radius: the radius of the body
+        :param universe: the universe the body belongs to, the default universe if None
+        """
         self.radius = radius
+        self._universe = universe
         self.objects_in_line_of_sight = []
         self.objects_out_of_line_of_sight = []
 
     @staticmethod
-    def get_universe() -> "Universe":
+    def default_universe() -> "Universe":
+        """
+        The universe of the bodies built without an explicit one, created the first time it is needed
+        :return:
+        """
         if CelestialBody.__universe is None:
             from models.physical_class import universe
             # Reimport exactly the same once at run time when the rest of the program has been built
             CelestialBody.__universe = universe.Universe()
         return CelestialBody.__universe
 
+    def get_universe(self) -> "Universe":
+        """
+        :return: the universe this body belongs to
+        """
+        if self._universe is None:
+            return CelestialBody.default_universe()
+        return self._universe
+
     @abstractmethod
     def receive_radiation(self, energy: float):
         """
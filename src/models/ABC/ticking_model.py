@@ -1,73 +1,169 @@
-from typing import final, Callable, Any
+from typing import final, Callable, Any, Optional
 
+from models.profiler import PROFILER
 
-def on_tick_builder(cls: type["TickingModel"]):
+
+class TickSettings:
+    """
+    The scheduling of an on_tick method : if it runs, how often and in how many sub-steps
     """
-    Returns a function that takes a function in parameters (this is usually called a decorator)
-    :param cls: the class that contains a list attribute called `on_tick_methods` to which
-    the method called will be appended to when a new method is added to the class.
-    This can be either at the class definition with the `def` keyword followed by a class method.
-    Or dynamically when adding a setting an attribute of the class to a function (with at least 1 parameters to catch the `self`)
+    __slots__ = ("enabled", "every", "phase", "substeps")
+
+    def __init__(self, enabled: bool = True, every: int = 1, phase: int = 0, substeps: int = 1):
+        self.enabled = enabled
+        self.every = every
+        self.phase = phase
+        self.substeps = substeps
+        self.validate()
+
+    def validate(self):
+        if self.every < 1 or self.substeps < 1:
+            raise ValueError(f"every and substeps must be at least 1, got every={self.every} and substeps={self.substeps}")
+        if not 0 <= self.phase < self.every:
+            raise ValueError(f"The phase must be between 0 and every - 1 = {self.every - 1}, got {self.phase}")
+
+
+class TickMethod(TickSettings):
+    """
+    An on_tick method of a model object, with its own copy of the settings so that it can be reconfigured at run time
+    """
+    __slots__ = ("name", "function")
+
+    def __init__(self, name: str, function: Callable, settings: TickSettings):
+        self.name = name
+        self.function = function
+        TickSettings.__init__(self, settings.enabled, settings.every, settings.phase, settings.substeps)
+
+
+def on_tick(enabled: bool = True, every: int = 1, phase: int = 0, substeps: int = 1):
+    """
+    Decorator marking a method of a TickingModel to be executed at every tick (this is usually called a decorator factory,
+    since it takes parameters)
+    :param enabled: if the on_tick method should be used on update
+    :param every: the method runs once every `every` ticks, with a time step of `every` ticks
+    :param phase: the method runs on the ticks t such that t % every == phase, to spread slow methods over ticks
+    :param substeps: the method runs `substeps` times in a row when it runs, each time with 1/substeps of its time step
     :return: the decorator
     """
+    settings = TickSettings(enabled, every, phase, substeps)
 
-    def decorator_factory(enabled: bool = True):
+    def on_tick_decorator(func: callable) -> callable:
         """
-        Allows for the decorator to take parameters
-        :param enabled: if the on_tick method should be used on update
-        :return:
+        Attaches the tick settings to the function, the classes defining it collect it when their dispatch table is built
+        :param func: the callable, a.k.a. the stuff that appears after the `def` in the class
+        :return: the callable given in parameter so the function can be properly called
         """
+        func.tick_settings = settings
+        return func
 
-        def on_tick_decorator(func: callable) -> callable:
-            """
-            Appends the method to a specific list that is a CLASS attribute (static) of the class given to the outside function
-            :param func: the callable, a.k.a. the stuff that appears after the `def` in the class. Either function or class method
-            :return: the callable given in parameter so the function can be properly called
-            """
-            func.enabled = enabled
-            cls.on_tick_methods.append(func)
-            return func
-
-        return on_tick_decorator
-
-    return decorator_factory
+    return on_tick_decorator
 
 
 class TickableModelMeta(type):
     """
-    This meta class must be meta inherited by TickingModel. It takes care of adding an "on_tick" method to the class
-    meta inheriting from it.
+    This meta class must be meta inherited by TickingModel. It keeps, for every class, the dispatch table of its on_tick
+    methods : the table is resolved once from the MRO of the class, the first time it is needed, and forgotten when a
+    method is added to or replaced in a ticking class afterwards.
+    """
+    _dispatch_tables: dict[type, tuple] = dict()
 
-    This method is built with the on_tick_builder function that take the variable x (which is a CLASS, not an object !!!)
-    and returns a decorator factory function. Therefore the variable x representing a class now has a new method called
-    "on_tick".
+    def __setattr__(cls, name: str, value: Any):
+        super().__setattr__(name, value)
+        if callable(value):
+            TickableModelMeta._dispatch_tables.clear()
 
-    The on_tick method, when used as a decorator, will at definition time add the "enabled" attribute to the function, and
-    append that function to a list of the class.
-    """
-    def __new__(mcs, name, bases, dct: dict[str, Any]):
-        x = super().__new__(mcs, name, bases, dct)
-        # Ignore the warning, it is due to the fact that super().__new__ returns a basic type
-        # and not a type of the class (type["BaseModel"] in this case)
-        x.on_tick = on_tick_builder(x)
-        return x
+    def __delattr__(cls, name: str):
+        super().__delattr__(name)
+        TickableModelMeta._dispatch_tables.clear()
+
+    def dispatch_table(cls) -> tuple:
+        """
+        The on_tick methods of the class, in the order they were declared from the base classes to the class.
+        A method overridden in a subclass is called through the override, which ticks with the settings of the base
+        class unless it is decorated again
+        :return: tuple of (name, function, settings)
+        """
+        table = TickableModelMeta._dispatch_tables.get(cls)
+        if table is None:
+            names = []
+            for klass in reversed(cls.__mro__):
+                for name, value in vars(klass).items():
+                    if hasattr(value, "tick_settings") and name not in names:
+                        names.append(name)
+            table = []
+            for name in names:
+                function = getattr(cls, name)
+                settings = next(vars(klass)[name].tick_settings for klass in cls.__mro__
+                                if hasattr(vars(klass).get(name), "tick_settings"))
+                table.append((name, function, settings))
+            table = tuple(table)
+            TickableModelMeta._dispatch_tables[cls] = table
+        return table
 
 
 class TickingModel(metaclass=TickableModelMeta):
     """
-    Base class for all models that need to be updated every tick. When a class inherits from this class, it will have
-    the on_tick method that can be used as a decorator to describe a method that must be executed every tick.
+    Base class for all models that need to be updated every tick. When a class inherits from this class, it can use
+    the on_tick decorator to describe a method that must be executed every tick.
+
+    The decorated methods of a class and of its parents are collected once in a dispatch table of the class, and every
+    object gets its own list of TickMethod from it. update only walks the enabled methods of that list, and the methods
+    can be enabled, disabled or rescheduled at run time with `configure_tick`.
 
-    This is done by adding the method itself, at definition time, to a list of the class. The list is therefore a class
-    attribute since there are no objects at that time of the program. This is why we check that the method's class is
-    the same as self
+    A method can run only every N ticks (`every`, `phase`) or be sub-cycled (`substeps`). The time step a method must
+    integrate over is given by `self.dt` while it runs : `time_delta * every / substeps`, so that a slow process run
+    every 10 ticks advances by 10 ticks worth of time
     """
-    on_tick_methods: list[Callable] = []
-    on_tick: Callable[[callable], callable]
+    on_tick = staticmethod(on_tick)
 
-    def __init__(self):
+    def __init__(self, time_delta: float = 1.0):
+        """
+        :param time_delta: the time step of one tick
+        """
         self._t = 0
         self.__running = False
+        self.time_delta = time_delta
+        self.dt = time_delta
+        self._tick_methods = None
+        self._schedule = None
+        self._schedule_key = None
+
+    @property
+    def tick_methods(self) -> dict[str, TickMethod]:
+        """
+        The on_tick methods of this object, by name
+        """
+        if self._tick_methods is None:
+            self._tick_methods = {name: TickMethod(name, function, settings)
+                                  for name, function, settings in type(self).dispatch_table()}
+        return self._tick_methods
+
+    def configure_tick(self, name: str, *, enabled: Optional[bool] = None, every: Optional[int] = None,
+                       phase: Optional[int] = None, substeps: Optional[int] = None):
+        """
+        Changes the scheduling of an on_tick method of this object, the settings not given are kept
+        :param name: name of the method
+        :return:
+        """
+        if name not in self.tick_methods:
+            raise KeyError(f"{type(self).__name__} has no on_tick method named {name}")
+        method = self.tick_methods[name]
+        previous = method.enabled, method.every, method.phase, method.substeps
+        for setting, value in (("enabled", enabled), ("every", every), ("phase", phase), ("substeps", substeps)):
+            if value is not None:
+                setattr(method, setting, value)
+        try:
+            method.validate()
+        except ValueError:
+            method.enabled, method.every, method.phase, method.substeps = previous
+            raise
+        self._schedule = None
+
+    def enable_tick(self, name: str):
+        self.configure_tick(name, enabled=True)
+
+    def disable_tick(self, name: str):
+        self.configure_tick(name, enabled=False)
 
     def update(self):
         """
@@ -75,11 +171,36 @@ class TickingModel(metaclass=TickableModelMeta):
         Else, it will only tick the on_tick method of the model updating
         :return:
         """
-        for method in self.on_tick_methods:
-            if method.enabled and method.__module__ == self.__module__:
-                method(self)
+        if self._schedule is None or self._schedule_key != (self.time_delta, PROFILER.generation):
+            self._build_schedule()
+        t = self._t
+        for function, every, phase, substeps, dt in self._schedule:
+            if every == 1 or t % every == phase:
+                self.dt = dt
+                if substeps == 1:
+                    function(self)
+                else:
+                    for _ in range(substeps):
+                        function(self)
+        self.dt = self.time_delta
         self._t += 1
 
+    def _build_schedule(self):
+        """
+        Flattens the enabled tick methods in tuples, with their time step computed once, for the loop of update.
+        The methods are wrapped to be timed only while the profiler is enabled
+        :return:
+        """
+        def function(method: TickMethod) -> Callable:
+            if PROFILER.enabled:
+                return PROFILER.wrap("on_tick", f"{type(self).__name__}.{method.name}", method.function)
+            return method.function
+
+        self._schedule = [(function(method), method.every, method.phase, method.substeps,
+                           self.time_delta * method.every / method.substeps)
+                          for method in self.tick_methods.values() if method.enabled]
+        self._schedule_key = (self.time_delta, PROFILER.generation)
+
     @final
     def get_time(self):
         return self._t
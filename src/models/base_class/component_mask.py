@@ -0,0 +1,88 @@
+from typing import Callable
+
+import numpy as np
+
+
+# Bit of every component in the component mask of a chunk
+COMPONENT_BITS = {"water": 1, "air": 2, "land": 4}
+ALL_COMPONENTS = 7
+
+
+def component_mask(water_mass: np.ndarray, air_mass: np.ndarray, land_mass: np.ndarray) -> np.ndarray:
+    """
+    One byte per chunk telling which components it contains
+    :return: the OR of the COMPONENT_BITS of the components whose mass is not zero
+    """
+    mask = (water_mass != 0).astype(np.uint8) * np.uint8(COMPONENT_BITS["water"])
+    mask |= (air_mass != 0).astype(np.uint8) * np.uint8(COMPONENT_BITS["air"])
+    mask |= (land_mass != 0).astype(np.uint8) * np.uint8(COMPONENT_BITS["land"])
+    return mask
+
+
+def k_slab_tiles(mask: np.ndarray) -> list[tuple[int, int, int]]:
+    """
+    Groups the consecutive K levels containing the same components (anywhere in their I/J plane) in tiles. Realistic
+    grids are layered along K (crust, ocean, atmosphere), so a few tiles cover the whole grid
+    :param mask: the component mask of the chunks, of the shape of the grid
+    :return: (first level, last level + 1, components of the tile) of every tile, in K order
+    """
+    levels = np.bitwise_or.reduce(mask.reshape(-1, mask.shape[2]), axis=0)
+    tiles = []
+    for k, bits in enumerate(levels.tolist()):
+        if tiles and tiles[-1][2] == bits:
+            tiles[-1] = (tiles[-1][0], k + 1, bits)
+        else:
+            tiles.append((k, k + 1, bits))
+    return tiles
+
+
+def component_externals(bits: int) -> dict:
+    """
+    The HAS_WATER, HAS_AIR and HAS_LAND externals of the stencil variant for the chunks containing the components `bits`
+    """
+    return {f"HAS_{name.upper()}": bool(bits & bit) for name, bit in COMPONENT_BITS.items()}
+
+
+def component_names(bits: int) -> str:
+    return "+".join(name for name, bit in COMPONENT_BITS.items() if bits & bit) or "empty"
+
+
+class ComponentStencil:
+    """
+    Stencil launched tile by tile, each tile with the variant built for the components present in it, so that the
+    fields of the absent components are not read at all. The variants are built on first use.
+    Called like the GT4Py stencil, only the K range of the origin and domain is split between the tiles
+    """
+
+    def __init__(self, name: str, build: Callable[[int], Callable], tiles: Callable[[], list], halo: int):
+        """
+        :param name: name of the stencil
+        :param build: builds the variant of the stencil for the components given as bits
+        :param tiles: returns the current tiles of the grid (see k_slab_tiles)
+        :param halo: the halo of the storages, the tiles are in grid chunk coordinates
+        """
+        self.name = name
+        self.build = build
+        self.tiles = tiles
+        self.halo = halo
+        self.variants = dict()
+
+    def variant(self, bits: int) -> Callable:
+        stencil = self.variants.get(bits)
+        if stencil is None:
+            stencil = self.variants[bits] = self.build(bits)
+        return stencil
+
+    def variant_names(self) -> set[str]:
+        """
+        :return: the names of the variants launched on the current tiles, their handles are created if needed
+        """
+        return {self.variant(bits).name for _, _, bits in self.tiles()}
+
+    def __call__(self, *args, origin: tuple, domain: tuple, **kwargs):
+        k_begin, k_end = origin[2], origin[2] + domain[2]
+        for first, last, bits in self.tiles():
+            start, stop = max(k_begin, self.halo + first), min(k_end, self.halo + last)
+            if start < stop:
+                self.variant(bits)(*args, origin=(origin[0], origin[1], start),
+                                   domain=(domain[0], domain[1], stop - start), **kwargs)
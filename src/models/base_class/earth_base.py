@@ -1,8 +1,59 @@
-from typing import Optional, Iterator
+import functools
+import os
+import time
+from pathlib import Path
+from typing import Optional, Iterator, Callable
 
 import numpy as np
 import gt4py.cartesian.gtscript as gtscript
 import gt4py.storage as gt_storage
+from gt4py.cartesian import backend as gt_backend
+
+from models.base_class.component_mask import component_mask, k_slab_tiles
+from models.base_class.workspace import Workspace
+from models.profiler import PROFILER
+
+
+DIAGNOSTIC_DEPENDENCIES: dict[str, tuple] = dict()
+
+
+def cached_diagnostic(*dependencies: str) -> Callable:
+    """
+    Memoizes a diagnostic of the Earth against the versions of the fields it reads. The diagnostic is only recomputed
+    when one of those fields has been modified (see EarthBase.touch) since the last time it was computed
+    :param dependencies: names of the prognostic fields the diagnostic depends on
+    :return: the decorator
+    """
+
+    def decorator(func: Callable) -> Callable:
+        name = func.__name__
+        DIAGNOSTIC_DEPENDENCIES[name] = dependencies
+
+        @functools.wraps(func)
+        def wrapper(self: "EarthBase"):
+            if PROFILER.enabled:
+                start = time.perf_counter()
+                try:
+                    return lookup(self)
+                finally:
+                    PROFILER.record("diagnostic", name, start, time.perf_counter() - start)
+            return lookup(self)
+
+        def lookup(self: "EarthBase"):
+            versions = tuple(self.field_versions[field_name] for field_name in dependencies)
+            stats = self.diagnostics_cache_stats.setdefault(name, {"hits": 0, "misses": 0})
+            cached = self._diagnostics_cache.get(name)
+            if cached is not None and cached[0] == versions:
+                stats["hits"] += 1
+                return cached[1]
+            stats["misses"] += 1
+            value = func(self)
+            self._diagnostics_cache[name] = (versions, value)
+            return value
+
+        return wrapper
+
+    return decorator
 
 
 class EarthBase():
@@ -10,7 +61,39 @@ class EarthBase():
     First layer of the earth model.
     The Python implementation of the Earth class to deal with the dunder method, index access, etc...
     There should be no reference to the physical properties of the Earth since it is taken care of in the second layer.
+
+    The fields are allocated with a halo of `halo` cells around the `shape` grid chunks. The stencils only run on the
+    compute domain (`origin`, `domain`) and the halo is filled by `apply_boundaries` according to the boundary
+    condition of each axis : periodic (the longitude by default) or closed (the poles, the ground and the top of the
+    atmosphere by default, where the halo mirrors the grid so that nothing flows through the boundary).
+
+    All the fields have the same dtype, float64 by default. In float32 they take half the memory and half the
+    bandwidth of the stencils, while the global diagnostics are still accumulated in float64 by the reduction engine.
+
+    Every prognostic field carries a version number that must be bumped with `touch` by anything writing it, so that
+    the diagnostics decorated with `cached_diagnostic` know when they have to be recomputed.
+
+    The derived fields (DERIVED_FIELDS, e.g. the chunk mass) are computed from prognostic fields and stored. They are
+    only recomputed by `refresh_derived_fields` when the versions of their inputs changed since they were computed, and
+    a stencil writing both the inputs and the derived fields marks them up to date with `mark_derived_fields`.
+
+    In the "lean" memory mode the derived fields that the stencils can compute on the fly from the masses
+    (INLINED_FIELDS) are not allocated, and the fields that are the same in every chunk (UNIFORM_FIELDS) are held as a
+    single value. `stored_fields` lists the storages of the current mode and `memory_usage` what they take per chunk.
+
+    `component_mask` tells which components every chunk contains (see models.base_class.component_mask). It is rebuilt
+    by `component_tiles` when a mass has been modified since, like the cached diagnostics.
     """
+    BOUNDARIES = ("periodic", "closed")
+    DTYPES = (np.float64, np.float32)
+    MEMORY_MODES = ("full", "lean")
+    INLINED_FIELDS = ("chunk_mass", "heat_transfer_coefficient", "specific_heat_capacity")  # Not stored in lean mode
+    UNIFORM_FIELDS = ("carbon_ppm",)  # A single value in lean mode
+    PROGNOSTIC_FIELDS = ("water_energy", "water_mass", "air_energy", "air_mass", "land_energy", "land_mass", "carbon_ppm")
+    DERIVED_FIELDS: dict[str, tuple] = dict()  # Derived field -> prognostic fields it is computed from
+    STORAGE_FIELDS = ("water_energy", "water_mass", "air_energy", "air_mass", "land_energy", "land_mass",
+                      "chunk_mass", "chunk_temp", "heat_transfer_coefficient", "specific_heat_capacity", "carbon_ppm")
+    CHECKPOINT_ATTRIBUTES: tuple = ()  # Scalar state saved in the manifest of a checkpoint, e.g. accumulators
     water_energy: gtscript.Field[float]
     water_mass: gtscript.Field[float]
     air_energy: gtscript.Field[float]
@@ -21,6 +104,7 @@ class EarthBase():
     heat_transfer_coefficient: gtscript.Field[float]
     specific_heat_capacity: gtscript.Field[float]
     carbon_ppm: gtscript.Field[float]
+    workspace: Workspace
     backend: str
 
 
@@ -32,8 +116,33 @@ class EarthBase():
                  land_energy: np.ndarray[float] = None, 
                  land_mass: np.ndarray[float] = None,
                  backend: str = "numpy", 
-                 parent=None):
+                 parent=None,
+                 halo: int = 1,
+                 boundaries: tuple = ("periodic", "closed", "closed"),
+                 dtype=np.float64,
+                 memory_mode: str = "full"):
+        """
+        :param shape: the number of grid chunks in I (longitude), J (latitude) and K (altitude), without the halo
+        :param halo: width of the halo added around the grid on every side, needed by the stencils reading neighbors
+        :param boundaries: boundary condition on the I, J and K axes, either "periodic" or "closed"
+        :param dtype: the dtype of all the fields, one of DTYPES
+        :param memory_mode: "full" to store every field, "lean" to store only the ones that cannot be computed on the fly
+        """
+        for boundary in boundaries:
+            if boundary not in self.BOUNDARIES:
+                raise ValueError(f"Unknown boundary {boundary}, expected one of {self.BOUNDARIES}")
+        if np.dtype(dtype) not in self.DTYPES:
+            raise ValueError(f"Unsupported dtype {np.dtype(dtype)}, expected one of {[np.dtype(d).name for d in self.DTYPES]}")
+        if memory_mode not in self.MEMORY_MODES:
+            raise ValueError(f"Unknown memory mode {memory_mode}, expected one of {self.MEMORY_MODES}")
+        self.dtype = np.dtype(dtype)
+        self.memory_mode = memory_mode
         self.shape = shape
+        self.halo = halo
+        self.boundaries = tuple(boundaries)
+        self.storage_shape = tuple(n + 2 * halo for n in shape)
+        self.origin = (halo, halo, halo)
+        self.domain = tuple(shape)
         self.parent = parent
         self._total_mass = 0
         self._average_temperature = 0
@@ -51,20 +160,303 @@ class EarthBase():
         if land_mass is None:
             land_mass = np.zeros(shape)
 
-        self.water_energy = gt_storage.from_array(water_energy, backend=backend)
-        self.water_mass = gt_storage.from_array(water_mass, backend=backend)
-        self.air_energy = gt_storage.from_array(air_energy, backend=backend)
-        self.air_mass = gt_storage.from_array(air_mass, backend=backend)
-        self.land_energy = gt_storage.from_array(land_energy, backend=backend)
-        self.land_mass = gt_storage.from_array(land_mass, backend=backend)
-        self.chunk_mass = gt_storage.empty(self.shape, dtype=float, backend=backend)
-        self.chunk_temp = gt_storage.empty(self.shape, dtype=float, backend=backend)
-        self.heat_transfer_coefficient = gt_storage.empty(self.shape, dtype=float, backend=backend)
-        self.specific_heat_capacity = gt_storage.empty(self.shape, dtype=float, backend=backend)
-        self.carbon_ppm = gt_storage.empty(self.shape, dtype=float, backend=backend)
+        self.water_energy = self.from_interior_array(water_energy, backend=backend)
+        self.water_mass = self.from_interior_array(water_mass, backend=backend)
+        self.air_energy = self.from_interior_array(air_energy, backend=backend)
+        self.air_mass = self.from_interior_array(air_mass, backend=backend)
+        self.land_energy = self.from_interior_array(land_energy, backend=backend)
+        self.land_mass = self.from_interior_array(land_mass, backend=backend)
+        self.chunk_temp = gt_storage.empty(self.storage_shape, dtype=self.dtype, backend=backend)
+        if self.memory_mode == "full":
+            self.chunk_mass = gt_storage.empty(self.storage_shape, dtype=self.dtype, backend=backend)
+            self.heat_transfer_coefficient = gt_storage.empty(self.storage_shape, dtype=self.dtype, backend=backend)
+            self.specific_heat_capacity = gt_storage.empty(self.storage_shape, dtype=self.dtype, backend=backend)
+            self.carbon_ppm = gt_storage.zeros(self.storage_shape, dtype=self.dtype, backend=backend)
+        else:
+            self.carbon_ppm = 0.0
         self.backend = backend
-        
-        
+        self.workspace = Workspace(self.storage_shape, dtype=self.dtype, backend=backend)
+        self.apply_boundaries(self.water_energy, self.water_mass, self.air_energy, self.air_mass, self.land_energy, self.land_mass)
+        self.field_versions = dict.fromkeys(self.PROGNOSTIC_FIELDS, 0)
+        self._derived_versions = dict()
+        self.derived_recomputations = dict.fromkeys(self.DERIVED_FIELDS, 0)
+        self.component_mask = None
+        self._component_tiles = None
+        self.component_mask_updates = 0
+        self.diagnostics_cache_stats = dict()
+        self._diagnostics_cache = dict()
+
+    @property
+    def lean(self) -> bool:
+        return self.memory_mode == "lean"
+
+    @property
+    def stored_fields(self) -> tuple:
+        """
+        The names of the fields allocated with the storage shape in the current memory mode
+        """
+        if not self.lean:
+            return self.STORAGE_FIELDS
+        return tuple(name for name in self.STORAGE_FIELDS if name not in self.INLINED_FIELDS + self.UNIFORM_FIELDS)
+
+    def extra_storages(self) -> list:
+        """
+        Storages owned by the model on top of the stored fields and the workspace (e.g. double buffers), counted by
+        `memory_usage`
+        """
+        return []
+
+    def memory_usage(self) -> dict:
+        """
+        Memory held by the storages of the Earth, halo included
+        :return: the bytes of the stored fields, of the scratch fields owned by the workspace and of the extra storages,
+        their total and the total per grid chunk
+        """
+        usage = {"fields": sum(getattr(self, name).nbytes for name in self.stored_fields),
+                 "scratch": self.workspace.allocated_bytes,
+                 "extra": sum(storage.nbytes for storage in self.extra_storages())}
+        usage["total"] = sum(usage.values())
+        usage["bytes_per_cell"] = usage["total"] / int(np.prod(self.shape))
+        return usage
+
+    @property
+    def interior_slices(self) -> tuple:
+        return tuple(slice(self.halo, self.halo + n) for n in self.shape)
+
+    @property
+    def compute_slices(self) -> tuple:
+        return tuple(slice(o, o + n) for o, n in zip(self.origin, self.domain))
+
+    def interior(self, field: np.ndarray) -> np.ndarray:
+        """
+        View on the compute domain of a field, without its halo
+        :param field: a field of the storage shape
+        :return: a view of the field of shape `shape`
+        """
+        return field[self.interior_slices]
+
+    def from_interior_array(self, array: np.ndarray, backend: str = None):
+        """
+        Builds a storage with a halo from an array of the shape of the compute domain, the halo is left to zero
+        :param array: the values of the grid chunks
+        :param backend: the backend of the storage, the one of the Earth by default
+        :return: the storage
+        """
+        storage = gt_storage.zeros(self.storage_shape, dtype=self.dtype, backend=backend or self.backend)
+        storage[self.interior_slices] = array
+        return storage
+
+    def apply_boundaries(self, *fields: np.ndarray):
+        """
+        Fills the halo of the fields according to the boundary conditions. Only the halo cells are written.
+        GT4Py forbids a stencil to write a field it reads with an offset, so this is done with slice copies
+        :param fields: fields of the storage shape
+        :return:
+        """
+        for field in fields:
+            self._apply_boundaries(field, self.shape)
+
+    def _apply_boundaries(self, field: np.ndarray, shape: tuple):
+        """
+        Fills the halo of one block of `shape` grid chunks surrounded by its halo
+        """
+        h = self.halo
+        if h == 0:
+            return
+        for axis, (n, boundary) in enumerate(zip(shape, self.boundaries)):
+            def index(start, stop, step=None):
+                return (slice(None),) * axis + (slice(start, stop, step),)
+            if boundary == "periodic":
+                field[index(0, h)] = field[index(n, n + h)]
+                field[index(n + h, n + 2 * h)] = field[index(h, 2 * h)]
+            else:
+                # Mirror the first and last cells, the neighbors through the boundary have the same value
+                field[index(0, h)] = field[index(2 * h - 1, h - 1, -1)]
+                field[index(n + h, n + 2 * h)] = field[index(n + h - 1, n - 1, -1)]
+
+    def exchange_halos(self, *field_names: str):
+        """
+        Makes the halo of the fields up to date before a stencil reads their neighbors.
+        On a single grid this only applies the boundary conditions
+        :param field_names: names of the fields
+        :return:
+        """
+        self.apply_boundaries(*(getattr(self, name) for name in field_names))
+
+    def touch(self, *field_names: str):
+        """
+        Marks prognostic fields as modified, invalidating the cached diagnostics that depend on them
+        :param field_names: names of the modified fields
+        :return:
+        """
+        for name in field_names:
+            self.field_versions[name] += 1
+
+    def _input_versions(self, derived_name: str) -> tuple:
+        return tuple(self.field_versions[name] for name in self.DERIVED_FIELDS[derived_name])
+
+    def stale_derived_fields(self, *names: str) -> list[str]:
+        """
+        :param names: names of derived fields, all of them by default
+        :return: the ones whose inputs have been modified since they were computed
+        """
+        return [name for name in names or self.DERIVED_FIELDS
+                if name in self.stored_fields and self._derived_versions.get(name) != self._input_versions(name)]
+
+    def mark_derived_fields(self, *names: str):
+        """
+        Records derived fields as up to date with the current version of their inputs, to call after a stencil
+        recomputed them together with the inputs it modified
+        :param names: names of derived fields
+        :return:
+        """
+        for name in names:
+            self._derived_versions[name] = self._input_versions(name)
+
+    def refresh_derived_fields(self, *names: str) -> list[str]:
+        """
+        Recomputes the derived fields whose inputs changed, to call before reading them. Costs a few dictionary lookups
+        when they are up to date
+        :param names: names of derived fields, all of them by default
+        :return: the names of the fields recomputed
+        """
+        stale = self.stale_derived_fields(*names)
+        if stale:
+            computed = self.compute_derived_fields(stale)
+            self.mark_derived_fields(*computed)
+            for name in computed:
+                self.derived_recomputations[name] += 1
+        return stale
+
+    def compute_derived_fields(self, names: list[str]) -> list[str]:
+        """
+        Computes derived fields on the compute domain, implemented by the model defining DERIVED_FIELDS
+        :param names: the derived fields needed
+        :return: the derived fields computed, which may be more than the ones asked when they are computed together
+        """
+        raise NotImplementedError(f"{type(self).__name__} does not know how to compute {names}")
+
+    def component_tiles(self) -> list[tuple[int, int, int]]:
+        """
+        The K slabs of the grid containing the same components, from the component mask, rebuilt first if a mass has
+        been modified since it was computed
+        :return: (first level, last level + 1, component bits) of every slab, see k_slab_tiles
+        """
+        versions = tuple(self.field_versions[name] for name in ("water_mass", "air_mass", "land_mass"))
+        if self._component_tiles is None or self._component_tiles[0] != versions:
+            self.component_mask = component_mask(*(self.interior(getattr(self, name))
+                                                   for name in ("water_mass", "air_mass", "land_mass")))
+            self._component_tiles = (versions, k_slab_tiles(self.component_mask))
+            self.component_mask_updates += 1
+        return self._component_tiles[1]
+
+    def store_diagnostics(self, values: dict):
+        """
+        Stores in the cache diagnostics that have been computed as a side product of another one, so that reading them
+        afterwards is a cache hit
+        :param values: diagnostic name -> value, names that are not cached diagnostics are ignored
+        :return:
+        """
+        for name, value in values.items():
+            if name in DIAGNOSTIC_DEPENDENCIES:
+                versions = tuple(self.field_versions[field_name] for field_name in DIAGNOSTIC_DEPENDENCIES[name])
+                self._diagnostics_cache[name] = (versions, value)
+
+    def checkpoint_state(self) -> dict:
+        """
+        :return: the scalar state of the Earth (CHECKPOINT_ATTRIBUTES), as a dictionary that can be written in JSON
+        """
+        return {name: getattr(self, name) for name in self.CHECKPOINT_ATTRIBUTES}
+
+    def restore_state(self, state: dict):
+        """
+        Sets back a state returned by `checkpoint_state`, the attributes missing from an older checkpoint are left as
+        they are
+        :param state:
+        :return:
+        """
+        for name in self.CHECKPOINT_ATTRIBUTES:
+            if name in state:
+                setattr(self, name, state[name])
+
+    def save_fields(self, directory: Path, sync: bool = True) -> dict:
+        """
+        Writes every stored field (halo included) in its own raw binary file of `directory`, in the memory order of the
+        backend so that it can be memory-mapped back without reordering. The uniform fields of the lean mode are written
+        in the manifest as their value.
+        Every file is written next to its final name then renamed over it, so a field memory-mapped from a previous
+        checkpoint of the same directory (see `load_fields`) keeps reading its own file while being saved
+        :param directory: an existing directory
+        :param sync: if True, the files are flushed to the disk before returning
+        :return: the description of the files, to store in the manifest of the checkpoint
+        """
+        res = dict()
+        if self.lean:
+            res.update({name: {"value": getattr(self, name)} for name in self.UNIFORM_FIELDS})
+        for name in self.stored_fields:
+            field = getattr(self, name)
+            axes = tuple(int(axis) for axis in np.argsort(field.strides, kind="stable")[::-1])  # Slowest axis first
+            path = Path(directory) / f"{name}.bin"
+            temporary_path = path.with_suffix(".tmp")
+            with open(temporary_path, "wb") as file:
+                np.ascontiguousarray(field.transpose(axes)).tofile(file)
+                if sync:
+                    file.flush()
+                    os.fsync(file.fileno())
+            os.replace(temporary_path, path)
+            res[name] = {"file": path.name, "dtype": field.dtype.str, "shape": list(field.shape), "axes": list(axes)}
+        return res
+
+    def load_fields(self, directory: Path, fields: dict, zero_copy: bool = True):
+        """
+        Reads back the storages written by `save_fields`. The files are memory-mapped copy-on-write : when their layout
+        and dtype suit the backend, the mapped arrays become the storages (nothing is read before it is used and the
+        checkpoint is never modified), else they are copied into the current storages.
+        A checkpoint of the other memory mode can be read : the fields this mode does not store are skipped, a uniform
+        field takes the value of its first grid chunk or fills the storage
+        :param directory: the directory of the checkpoint
+        :param fields: the description returned by `save_fields`
+        :param zero_copy: set to False to always copy into the current storages (e.g. when they are shared)
+        :return:
+        """
+        storage_info = gt_backend.from_name(self.backend).storage_info
+        for name, entry in fields.items():
+            if "value" in entry:
+                if name in self.stored_fields:
+                    getattr(self, name)[...] = entry["value"]
+                else:
+                    setattr(self, name, entry["value"])
+                continue
+            if name not in self.stored_fields and name not in self.UNIFORM_FIELDS:
+                continue
+            shape = tuple(entry["shape"])
+            if shape != self.storage_shape:
+                raise ValueError(f"The checkpoint of {name} has the shape {shape}, expected {self.storage_shape}")
+            axes = entry["axes"]
+            mapped = np.memmap(Path(directory) / entry["file"], dtype=entry["dtype"], mode="c",
+                               shape=tuple(shape[axis] for axis in axes))
+            array = np.asarray(mapped).transpose(np.argsort(axes))
+            if name not in self.stored_fields:
+                setattr(self, name, float(array[(self.halo,) * 3]))
+                continue
+            current = getattr(self, name)
+            if zero_copy and array.dtype == current.dtype and storage_info["is_optimal_layout"](array, ("I", "J", "K")) \
+                    and array.ctypes.data % (storage_info["alignment"] * array.itemsize) == 0:
+                setattr(self, name, array)
+            else:
+                current[...] = array
+        self._diagnostics_cache.clear()
+        self.touch(*self.PROGNOSTIC_FIELDS)
+        # The derived fields of the checkpoint were saved with the fields they are computed from
+        self.mark_derived_fields(*(name for name in self.DERIVED_FIELDS if name in fields and name in self.stored_fields))
+
+    @property
+    def diagnostics_hits(self) -> int:
+        return sum(stats["hits"] for stats in self.diagnostics_cache_stats.values())
+
+    @property
+    def diagnostics_misses(self) -> int:
+        return sum(stats["misses"] for stats in self.diagnostics_cache_stats.values())
 
 
     def __len__(self):
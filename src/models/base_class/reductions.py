@@ -0,0 +1,119 @@
+from typing import Callable, Optional
+
+import numpy as np
+
+
+class ReductionEngine:
+    """
+    Computes several global reductions over several quantities in a single sweep over the fields.
+    The fields are walked in slabs along their first axis, every quantity needed is computed once per slab and all the
+    reductions are accumulated in float64 scalar buffers, so that no full size temporary field is ever allocated, and
+    float32 fields lose no precision in the totals.
+
+    A quantity is either the name of a field or the name of a function of `quantities`. That function takes a getter
+    returning the slab of any field or other quantity by name and returns the quantity on that slab.
+
+    A reduction is described by a tuple (operation, quantity) or (operation, quantity, weight) for weighted means.
+    The partial results of a sweep can be combined with the ones of another part of the grid before being finalized,
+    which allows reductions over tiles or over members of an ensemble.
+    """
+    OPERATIONS = ("sum", "mean", "min", "max", "weighted_mean")
+
+    def __init__(self, quantities: Optional[dict[str, Callable]] = None, slab_cells: int = 2 ** 16):
+        """
+        :param quantities: functions computing derived quantities from the slabs of the fields
+        :param slab_cells: approximate number of cells handled at once, small enough to stay in cache
+        """
+        self.quantities = quantities or dict()
+        self.slab_cells = slab_cells
+        self.sweeps = 0
+
+    def _quantity(self, name: str, slabs: dict[str, np.ndarray]) -> np.ndarray:
+        if name not in slabs:
+            slabs[name] = self.quantities[name](lambda other: self._quantity(other, slabs))
+        return slabs[name]
+
+    def partial(self, fields: dict[str, np.ndarray], reductions: dict[str, tuple]) -> dict[str, tuple]:
+        """
+        Sweeps once over the fields and returns the partial (not yet finalized) value of each reduction
+        :param fields: the fields the quantities are computed from, all of the same shape
+        :param reductions: result name -> (operation, quantity[, weight])
+        :return: result name -> partial value, to give to `combine` or `finalize`
+        """
+        for name, reduction in reductions.items():
+            if reduction[0] not in self.OPERATIONS:
+                raise ValueError(f"Unknown reduction {reduction[0]} for {name}, expected one of {self.OPERATIONS}")
+        accumulators = {name: self._empty(reduction[0]) for name, reduction in reductions.items()}
+        shape = next(iter(fields.values())).shape
+        slab_size = max(1, self.slab_cells // max(1, int(np.prod(shape[1:]))))
+        with np.errstate(invalid="ignore", divide="ignore"):
+            for start in range(0, shape[0], slab_size):
+                # Fields in a lower precision are widened slab by slab, so that derived quantities are computed in float64
+                slabs = {name: np.asarray(field[start:start + slab_size], dtype=np.float64) for name, field in fields.items()}
+                for name, (operation, quantity, *weight) in reductions.items():
+                    values = self._quantity(quantity, slabs)
+                    accumulators[name] = self._accumulate(operation, accumulators[name], values,
+                                                          self._quantity(weight[0], slabs) if weight else None)
+        self.sweeps += 1
+        return {name: (reductions[name][0],) + accumulator for name, accumulator in accumulators.items()}
+
+    @staticmethod
+    def _empty(operation: str) -> tuple:
+        if operation == "min":
+            return np.inf, 0
+        if operation == "max":
+            return -np.inf, 0
+        return 0.0, 0.0
+
+    @staticmethod
+    def _accumulate(operation: str, accumulator: tuple, values: np.ndarray, weight: Optional[np.ndarray]) -> tuple:
+        if operation == "sum":
+            return accumulator[0] + np.sum(values, dtype=np.float64), 0.0
+        if operation == "mean":
+            return accumulator[0] + np.sum(values, dtype=np.float64), accumulator[1] + values.size
+        if operation == "min":
+            return min(accumulator[0], float(np.min(values))), 0
+        if operation == "max":
+            return max(accumulator[0], float(np.max(values))), 0
+        # weighted_mean
+        return accumulator[0] + np.sum(values * weight, dtype=np.float64), accumulator[1] + np.sum(weight, dtype=np.float64)
+
+    @staticmethod
+    def combine(first: dict[str, tuple], second: dict[str, tuple]) -> dict[str, tuple]:
+        """
+        Merges the partial results of two sweeps over disjoint parts of the grid
+        :return: the partial results over both parts
+        """
+        res = dict()
+        for name, (operation, a, b) in first.items():
+            _, other_a, other_b = second[name]
+            if operation == "min":
+                res[name] = (operation, min(a, other_a), 0)
+            elif operation == "max":
+                res[name] = (operation, max(a, other_a), 0)
+            else:
+                res[name] = (operation, a + other_a, b + other_b)
+        return res
+
+    @staticmethod
+    def finalize(partials: dict[str, tuple]) -> dict[str, float]:
+        """
+        Turns partial results into the final value of the reductions
+        :return: result name -> value
+        """
+        res = dict()
+        for name, (operation, a, b) in partials.items():
+            if operation in ("mean", "weighted_mean"):
+                res[name] = float(a / b) if b else np.nan
+            else:
+                res[name] = float(a)
+        return res
+
+    def reduce(self, fields: dict[str, np.ndarray], reductions: dict[str, tuple]) -> dict[str, float]:
+        """
+        Sweeps once over the fields and returns the value of every reduction
+        :param fields: the fields the quantities are computed from, all of the same shape
+        :param reductions: result name -> (operation, quantity[, weight])
+        :return: result name -> value
+        """
+        return self.finalize(self.partial(fields, reductions))
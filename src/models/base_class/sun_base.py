@@ -2,6 +2,21 @@ class SunBase:
     """
     First layer of the model for the Sun.
     There are no special required Python methods or variable necessary for this model, since it is not a big part of
-    the simulation.
+    the simulation, apart from saving and restoring its state in a checkpoint.
     """
-    pass
+    CHECKPOINT_ATTRIBUTES = ("total_energy", "energy_radiated_per_second", "radius")
+
+    def checkpoint_state(self) -> dict:
+        """
+        :return: the state of the Sun, as a dictionary that can be written in JSON
+        """
+        return {name: getattr(self, name) for name in self.CHECKPOINT_ATTRIBUTES}
+
+    def restore_state(self, state: dict):
+        """
+        Sets back a state returned by `checkpoint_state`
+        :param state:
+        :return:
+        """
+        for name in self.CHECKPOINT_ATTRIBUTES:
+            setattr(self, name, state[name])
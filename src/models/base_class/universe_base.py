@@ -1,5 +1,10 @@
+import json
+import os
+from pathlib import Path
 from typing import Optional
 
+import numpy as np
+
 from models.physical_class.earth import Earth
 from models.physical_class.sun import Sun
 
@@ -7,10 +12,90 @@ from models.physical_class.sun import Sun
 class UniverseBase:
     """
     First layer of the model Universe.
-    Allows iterating over all the objects in the universe.
+    Allows iterating over all the objects in the universe, and saving or restoring the whole simulation in a checkpoint.
+
+    A checkpoint is a directory holding one raw binary file per field of the Earth, that can be memory-mapped back,
+    and a small JSON manifest with everything else : the time of every model, the state of the Sun and of the numpy
+    random generator. The manifest is written last, so a checkpoint interrupted while being written is never read.
     """
+    CHECKPOINT_VERSION = 1
+    MANIFEST_NAME = "manifest.json"
     earth: Optional[Earth] = None
     sun: Optional[Sun] = None
 
     def __iter__(self):
         return (x for x in (self.earth, self.sun))
+
+    def checkpoint(self, directory: str, sync: bool = True) -> Path:
+        """
+        Saves the whole state of the simulation
+        :param directory: the directory of the checkpoint, created if needed. A previous checkpoint there is replaced
+        :param sync: if True, the files are flushed to the disk before returning, so that the checkpoint survives a crash
+        :return: the path of the manifest
+        """
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        name, keys, position, has_gauss, cached_gaussian = np.random.get_state()
+        manifest = {"version": self.CHECKPOINT_VERSION,
+                    "time": getattr(self, "_t", None),
+                    "rng_state": {"name": name, "keys": keys.tolist(), "position": int(position),
+                                  "has_gauss": int(has_gauss), "cached_gaussian": float(cached_gaussian)}}
+        if self.sun is not None:
+            manifest["sun"] = {"class": type(self.sun).__name__,
+                               "time": getattr(self.sun, "_t", None),
+                               "state": self.sun.checkpoint_state()}
+        if self.earth is not None:
+            manifest["earth"] = {"class": type(self.earth).__name__,
+                                 "time": getattr(self.earth, "_t", None),
+                                 "shape": list(self.earth.shape),
+                                 "halo": self.earth.halo,
+                                 "boundaries": list(self.earth.boundaries),
+                                 "backend": self.earth.backend,
+                                 "state": self.earth.checkpoint_state(),
+                                 "fields": self.earth.save_fields(directory, sync=sync)}
+        manifest_path = directory / self.MANIFEST_NAME
+        temporary_path = manifest_path.with_suffix(".tmp")
+        with open(temporary_path, "w") as file:
+            json.dump(manifest, file, indent=2)
+            if sync:
+                file.flush()
+                os.fsync(file.fileno())
+        os.replace(temporary_path, manifest_path)
+        return manifest_path
+
+    def restore(self, directory: str, zero_copy: bool = True):
+        """
+        Restores a checkpoint in the models of this universe, that must have been built like the ones saved (same Earth
+        shape, halo and boundaries). This replaces the initial conditions (`fill_with_water`, etc ...)
+        :param directory: the directory of the checkpoint
+        :param zero_copy: if True, the fields are memory-mapped from the checkpoint when the backend allows it
+        :return:
+        """
+        directory = Path(directory)
+        with open(directory / self.MANIFEST_NAME) as file:
+            manifest = json.load(file)
+        if manifest["version"] != self.CHECKPOINT_VERSION:
+            raise ValueError(f"Checkpoint version {manifest['version']} is not supported, expected {self.CHECKPOINT_VERSION}")
+        for name in ("earth", "sun"):
+            if (name in manifest) != (getattr(self, name) is not None):
+                raise ValueError(f"The checkpoint and the universe do not both have a {name}")
+
+        if self.earth is not None:
+            earth = manifest["earth"]
+            if tuple(earth["shape"]) != tuple(self.earth.shape) or earth["halo"] != self.earth.halo \
+                    or tuple(earth["boundaries"]) != self.earth.boundaries:
+                raise ValueError(f"The checkpoint Earth has the shape {earth['shape']}, halo {earth['halo']} and "
+                                 f"boundaries {earth['boundaries']}, which do not match this Earth")
+            self.earth.load_fields(directory, earth["fields"], zero_copy=zero_copy)
+            self.earth.restore_state(earth.get("state", {}))
+            if earth["time"] is not None:
+                self.earth._t = earth["time"]
+        if self.sun is not None:
+            self.sun.restore_state(manifest["sun"]["state"])
+            if manifest["sun"]["time"] is not None:
+                self.sun._t = manifest["sun"]["time"]
+        if manifest["time"] is not None:
+            self._t = manifest["time"]
+        rng = manifest["rng_state"]
+        np.random.set_state((rng["name"], np.array(rng["keys"], dtype=np.uint32), rng["position"], rng["has_gauss"],
+                             rng["cached_gaussian"]))
@@ -0,0 +1,108 @@
+from contextlib import contextmanager
+from typing import Optional
+
+import numpy as np
+import gt4py.storage as gt_storage
+
+
+class Workspace:
+    """
+    Pool of scratch fields for the temporary results of the stencils.
+    Fields are allocated once with the backend of the model (so they are correctly aligned for it) and handed out again
+    on the next request of the same shape and dtype instead of allocating a new storage at every tick.
+
+    A scratch field lives from `acquire` to `release`, or for the duration of a `with workspace.scratch()` block.
+    """
+
+    def __init__(self, shape: tuple, dtype=float, backend: str = "numpy"):
+        self.shape = shape
+        self.dtype = dtype
+        self.backend = backend
+        self._free = dict()
+        self._in_use = dict()
+        self.allocations = 0
+        self.reuses = 0
+        self.allocated_bytes = 0
+        self.current_bytes = 0
+        self.peak_bytes = 0
+
+    def _key(self, shape: Optional[tuple], dtype) -> tuple:
+        return tuple(shape or self.shape), np.dtype(dtype or self.dtype)
+
+    def acquire(self, shape: Optional[tuple] = None, dtype=None, fill_value: Optional[float] = None):
+        """
+        Hands out a scratch field, reusing a released one when possible
+        :param shape: shape of the field, the shape of the workspace by default
+        :param dtype: dtype of the field, the dtype of the workspace by default
+        :param fill_value: if given, the field is filled with that value, else its content is undefined
+        :return: the scratch storage, that must be given back with `release`
+        """
+        key = self._key(shape, dtype)
+        free_fields = self._free.setdefault(key, [])
+        if free_fields:
+            field = free_fields.pop()
+            self.reuses += 1
+        else:
+            field = gt_storage.empty(key[0], dtype=key[1], backend=self.backend)
+            self.allocations += 1
+            self.allocated_bytes += field.nbytes
+        if fill_value is not None:
+            field[...] = fill_value
+        self._in_use[id(field)] = key
+        self.current_bytes += field.nbytes
+        self.peak_bytes = max(self.peak_bytes, self.current_bytes)
+        return field
+
+    def release(self, *fields):
+        """
+        Gives back scratch fields to the pool, their content must not be used afterwards
+        :param fields: the fields returned by `acquire`
+        :return:
+        """
+        for field in fields:
+            key = self._in_use.pop(id(field), None)
+            if key is None:
+                raise ValueError("This field does not belong to the workspace or has already been released")
+            self.current_bytes -= field.nbytes
+            self._free[key].append(field)
+
+    def adopt(self, field):
+        """
+        Adds a field allocated outside of the pool (e.g. in shared memory) to the free fields, it is handed out by the
+        next requests of its shape and dtype
+        :param field: the storage, owned by the pool from now on
+        :return:
+        """
+        self._free.setdefault(self._key(field.shape, field.dtype), []).append(field)
+        self.allocated_bytes += field.nbytes
+
+    @contextmanager
+    def scratch(self, count: int = 1, shape: Optional[tuple] = None, dtype=None, fill_value: Optional[float] = None):
+        """
+        Context manager version of acquire/release
+        :param count: number of scratch fields wanted
+        :return: one field if count is 1, else a list of fields
+        """
+        fields = [self.acquire(shape, dtype, fill_value) for _ in range(count)]
+        try:
+            yield fields[0] if count == 1 else fields
+        finally:
+            self.release(*fields)
+
+    def clear(self):
+        """
+        Frees every field that is not currently in use
+        :return:
+        """
+        for free_fields in self._free.values():
+            for field in free_fields:
+                self.allocated_bytes -= field.nbytes
+            free_fields.clear()
+
+    def report(self) -> str:
+        res = f"Workspace : \n" \
+              f"- {self.allocations} allocations, {self.reuses} reuses\n" \
+              f"- Scratch memory in use: {self.current_bytes / 2 ** 20:.2f} MiB\n" \
+              f"- Peak scratch memory in use: {self.peak_bytes / 2 ** 20:.2f} MiB\n" \
+              f"- Scratch memory owned by the pool: {self.allocated_bytes / 2 ** 20:.2f} MiB"
+        return res
@@ -0,0 +1,136 @@
+"""
+Initial conditions of the Earth generated in parallel, or loaded from .npy files.
+
+The random fields are drawn tile by tile, a tile being one I plane of the grid. Every tile has its own counter-based
+Philox stream whose key is made of the seed, the stream of the field and the index of the tile, so the values only
+depend on the seed and the shape : the result is the same bit for bit whatever the number of threads, and any tile
+can be generated without the ones before it. numpy releases the GIL while it fills the arrays, so the threads of the
+pool run the tiles concurrently.
+"""
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Optional
+
+import numpy as np
+
+
+# Stream of every random field, part of the Philox key so that two fields never share random numbers
+STREAMS = {"water_temperature": 0}
+
+
+def tile_generator(seed: int, stream: int, tile: int) -> np.random.Generator:
+    """
+    The random generator of one tile : Philox keyed with the seed in the high 64 bits, the stream and the tile in the low
+    64 bits
+    """
+    return np.random.Generator(np.random.Philox(key=(seed << 64) | (stream << 32) | tile))
+
+
+def default_workers() -> int:
+    return len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count() or 1
+
+
+def for_each_tile(function: Callable[[int], None], nb_tiles: int, workers: Optional[int] = None):
+    """
+    Calls function(tile) for every tile on a pool of `workers` threads (all the CPUs by default), or in the calling
+    thread if there is only one worker
+    """
+    workers = workers or default_workers()
+    if workers == 1:
+        for tile in range(nb_tiles):
+            function(tile)
+        return
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for _ in pool.map(function, range(nb_tiles)):  # Raises the exception of a failed tile
+            pass
+
+
+def uniform_field(out: np.ndarray, low: float, high: float, seed: int, stream: int, workers: Optional[int] = None):
+    """
+    Fills `out` with values drawn uniformly in [low, high), one Philox stream per I plane
+    :param out: the array to fill, e.g. the interior of a storage, it does not need to be contiguous
+    :param stream: the stream of the field (see STREAMS)
+    :param workers: the number of threads, all the CPUs by default. Does not change the values
+    :return:
+    """
+
+    def fill(tile: int):
+        values = tile_generator(seed, stream, tile).random(out[tile].shape)
+        np.multiply(values, high - low, out=values)
+        np.add(values, low, out=out[tile])
+
+    for_each_tile(fill, out.shape[0], workers)
+
+
+def fill_with_water(earth, seed: int, low: float = 290, high: float = 310, workers: Optional[int] = None):
+    """
+    Earth.fill_with_water generated in parallel tiles : every chunk holds 1000 of water at a temperature drawn uniformly
+    in [low, high). The temperatures are drawn in the storage of the energy and turned into energies in place, so
+    neither a scratch field nor a stencil launch is needed
+    :param earth: the Earth to fill
+    :param seed: the seed of the random streams
+    :param workers: the number of threads, all the CPUs by default. Does not change the values
+    :return:
+    """
+    water_mass, water_energy = earth.interior(earth.water_mass), earth.interior(earth.water_energy)
+    capacity = earth.externals["WATER_HEAT_CAPACITY"]
+    uniform_field(water_energy, low, high, seed, STREAMS["water_temperature"], workers)
+
+    def to_energy(tile: int):
+        water_mass[tile] = 1000
+        # Same operations as temperature_to_energy
+        np.multiply(water_energy[tile], water_mass[tile], out=water_energy[tile])
+        np.multiply(water_energy[tile], capacity, out=water_energy[tile])
+
+    for_each_tile(to_energy, earth.shape[0], workers)
+    earth.exchange_halos("water_mass", "water_energy")
+    earth.touch("water_mass", "water_energy")
+    earth.refresh_derived_fields()
+
+
+def save_initial_fields(earth, directory: Path, names: tuple = ("water_energy", "water_mass", "air_energy", "air_mass",
+                                                                 "land_energy", "land_mass")):
+    """
+    Writes the grid chunks of fields of the Earth (without the halo) as .npy files named after the fields, that
+    `load_initial_fields` can read back into an Earth of the same shape
+    :param directory: created if needed
+    :return:
+    """
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    for name in names:
+        np.save(directory / f"{name}.npy", np.asarray(earth.interior(getattr(earth, name))))
+
+
+def load_initial_fields(earth, directory: Path, workers: Optional[int] = None) -> list[str]:
+    """
+    Reads the .npy files of `directory` named after prognostic fields of the Earth into its storages. The files are
+    memory-mapped and copied plane by plane straight into the interior of the storages by a pool of threads : there is
+    no intermediate host array, and the dtype is converted on the fly if the Earth has another precision.
+    The halos are then filled by the boundary conditions and the derived fields recomputed
+    :param directory: the directory of the files, of the shape of the grid (without the halo)
+    :param workers: the number of threads, all the CPUs by default
+    :return: the names of the fields loaded
+    """
+    loaded = []
+    for name in earth.PROGNOSTIC_FIELDS:
+        path = Path(directory) / f"{name}.npy"
+        if not path.exists() or name not in earth.stored_fields:
+            continue
+        mapped = np.load(path, mmap_mode="r")
+        if mapped.shape != tuple(earth.shape):
+            raise ValueError(f"{path} has the shape {mapped.shape}, expected the grid shape {tuple(earth.shape)}")
+        storage = earth.interior(getattr(earth, name))
+
+        def copy(tile: int, storage=storage, mapped=mapped):
+            storage[tile] = mapped[tile]
+
+        for_each_tile(copy, earth.shape[0], workers)
+        loaded.append(name)
+    if not loaded:
+        raise FileNotFoundError(f"No .npy file of a prognostic field in {directory}")
+    earth.exchange_halos(*loaded)
+    earth.touch(*loaded)
+    earth.refresh_derived_fields()
+    return loaded
@@ -0,0 +1,153 @@
+import functools
+import itertools
+import multiprocessing
+import os
+import time
+import traceback
+from typing import Iterator, Optional
+
+import numpy as np
+
+from models.physical_class.earth import EARTH_CONSTANTS
+from models.physical_class.universe import Universe
+from models.ticking_class.ticking_earth import TickingEarth
+from models.ticking_class.ticking_sun import TickingSun
+
+
+UNIVERSE_PARAMETERS = {"TIME_DELTA": "time_delta", "EVAPORATION_RATE": "evaporation_rate"}
+EARTH_PARAMETERS = ("albedo",)
+SWEEP_PARAMETERS = tuple(UNIVERSE_PARAMETERS) + EARTH_PARAMETERS + EARTH_CONSTANTS
+# Parameters given to the stencils as externals : every distinct set of values needs its own stencils
+STENCIL_PARAMETERS = ("EVAPORATION_RATE",) + EARTH_CONSTANTS
+
+
+def parameter_grid(**values: list) -> list[dict]:
+    """
+    Every combination of the values of the parameters, e.g. parameter_grid(albedo=[0.2, 0.3], TIME_DELTA=[0.01, 0.02])
+    :param values: parameter name -> values to try, names from SWEEP_PARAMETERS
+    :return: the parameter points
+    """
+    names = list(values)
+    return [dict(zip(names, combination)) for combination in itertools.product(*(values[name] for name in names))]
+
+
+def check_point(point: dict):
+    unknown = set(point) - set(SWEEP_PARAMETERS)
+    if unknown:
+        raise ValueError(f"Unknown sweep parameters {sorted(unknown)}, expected names from {SWEEP_PARAMETERS}")
+
+
+def build_universe(point: dict, shape: tuple, backend: str = "numpy", diffusion_mode: str = "staged",
+                   enabled_ticks: tuple = ()) -> Universe:
+    """
+    Builds an independent universe with a Sun and an Earth set with the parameters of a point
+    :param point: parameter name -> value, the parameters not given keep their default value
+    :param enabled_ticks: names of on_tick methods of the Earth disabled by default to enable (e.g. water_evaporation)
+    :return: the universe
+    """
+    check_point(point)
+    universe = Universe(**{argument: point[name] for name, argument in UNIVERSE_PARAMETERS.items() if name in point})
+    universe.sun = TickingSun(universe=universe)
+    universe.earth = TickingEarth(shape, backend=backend, diffusion_mode=diffusion_mode, universe=universe,
+                                  constants={name: point[name] for name in EARTH_CONSTANTS if name in point})
+    for name in EARTH_PARAMETERS:
+        if name in point:
+            setattr(universe.earth, name, point[name])
+    for name in enabled_ticks:
+        universe.earth.enable_tick(name)
+    return universe
+
+
+def run_point(point: dict, shape: tuple, nb_steps: int, backend: str = "numpy", diffusion_mode: str = "staged",
+              enabled_ticks: tuple = (), seed: int = 0, sample_every: int = 1) -> dict:
+    """
+    Runs the simulation of one parameter point from the initial conditions given by the seed
+    :param nb_steps: number of updates of the universe
+    :param seed: seed of the numpy random generator used by fill_with_water, the same for every point by default so
+    that the points only differ by their parameters
+    :param sample_every: the global diagnostics of the Earth are recorded every `sample_every` steps
+    :return: the point, the diagnostics sampled, the wall time of the run, or the error if the run failed
+    """
+    start = time.perf_counter()
+    try:
+        universe = build_universe(point, shape, backend, diffusion_mode, enabled_ticks)
+        np.random.seed(seed)
+        universe.earth.fill_with_water()
+        samples = []
+        for step in range(1, nb_steps + 1):
+            universe.update_all()
+            if step % sample_every == 0 or step == nb_steps:
+                diagnostics = universe.earth.global_diagnostics()
+                samples.append(dict({name: value for name, value in diagnostics.items() if name != "composition"},
+                                    tick=universe.get_time()))
+        return {"point": point, "diagnostics": samples, "elapsed_s": time.perf_counter() - start, "pid": os.getpid()}
+    except Exception:
+        return {"point": point, "error": traceback.format_exc(), "elapsed_s": time.perf_counter() - start,
+                "pid": os.getpid()}
+
+
+class ParameterSweep:
+    """
+    Runs independent simulations over parameter points on a pool of processes, and gives back the result of every run
+    as soon as it is over.
+
+    Every run has its own universe (see Universe), so a worker process can run any number of points one after the other.
+    Before the pool is started, the stencils of every distinct set of STENCIL_PARAMETERS are built once in this process :
+    the workers are forked from it and inherit the warm stencil registry, instead of all compiling the same stencils at
+    the same time.
+    """
+
+    def __init__(self, shape: tuple, nb_steps: int, backend: str = "numpy", diffusion_mode: str = "staged",
+                 processes: Optional[int] = None, enabled_ticks: tuple = (), seed: int = 0, sample_every: int = 1):
+        """
+        :param shape: the grid shape of the Earth of every run
+        :param nb_steps: number of updates of every run
+        :param processes: number of worker processes, the number of CPU cores by default
+        :param enabled_ticks: names of on_tick methods of the Earth disabled by default to enable in every run
+        :param seed: seed of the initial conditions of every run
+        :param sample_every: the diagnostics are recorded every `sample_every` steps
+        """
+        self.shape = tuple(shape)
+        self.nb_steps = nb_steps
+        self.backend = backend
+        self.diffusion_mode = diffusion_mode
+        self.processes = processes or os.cpu_count()
+        self.enabled_ticks = tuple(enabled_ticks)
+        self.seed = seed
+        self.sample_every = sample_every
+        self.warm_up_time = 0.0
+
+    def warm_up(self, points: list[dict]):
+        """
+        Builds the stencils needed by the points in this process, on an Earth one column wide with the K extent of the
+        runs (the implicit_k mode needs at least 2 levels) and the same on_tick methods enabled
+        :return:
+        """
+        start = time.perf_counter()
+        seen = set()
+        for point in points:
+            externals = tuple((name, point[name]) for name in STENCIL_PARAMETERS if name in point)
+            if externals not in seen:
+                seen.add(externals)
+                earth = build_universe(dict(externals), (1, 1, self.shape[2]), self.backend, self.diffusion_mode,
+                                       self.enabled_ticks).earth
+                earth.warm_up_stencils(names=list(earth.stencil_handles), workers=self.processes)
+        self.warm_up_time += time.perf_counter() - start
+
+    def run(self, points: list[dict]) -> Iterator[dict]:
+        """
+        Runs every point, in any order
+        :param points: the parameter points, see parameter_grid
+        :return: the results of run_point, in the order the runs finish
+        """
+        for point in points:
+            check_point(point)
+        if not points:
+            return
+        self.warm_up(points)
+        run = functools.partial(run_point, shape=self.shape, nb_steps=self.nb_steps, backend=self.backend,
+                                diffusion_mode=self.diffusion_mode, enabled_ticks=self.enabled_ticks, seed=self.seed,
+                                sample_every=self.sample_every)
+        context = multiprocessing.get_context("fork")  # The workers inherit the warm stencil registry
+        with context.Pool(min(self.processes, len(points))) as pool:
+            yield from pool.imap_unordered(run, points)
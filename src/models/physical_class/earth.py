@@ -1,15 +1,244 @@
 from models.ABC.celestial_body import CelestialBody
-from models.base_class.earth_base import EarthBase
+from models.base_class.component_mask import ALL_COMPONENTS, ComponentStencil, component_externals, component_names
+from models.base_class.earth_base import EarthBase, cached_diagnostic
+from models.base_class.reductions import ReductionEngine
+from models import initial_conditions
+from models.profiler import ProfiledStencil
+from models.stencil_autotune import StencilAutotuner
+from models.stencil_registry import STENCIL_REGISTRY, LazyStencil, compile_stencils, get_stencil
 import constants
 
 
 import numpy as np
 from gt4py.cartesian import gtscript
-from gt4py.cartesian.gtscript import PARALLEL, BACKWARD, computation, interval, IJ, IJK, Field
-import gt4py.storage as gt_storage
+from gt4py.cartesian.gtscript import PARALLEL, computation, interval, IJ, IJK, Field, __INLINED
+import functools
+import os
+import time
 import typing
+from typing import Callable
 
-Field3D = gtscript.Field[np.float64]
+# The fields of the stencils are typed with the "dtype" placeholder, resolved when the stencil is built with the dtype of
+# the Earth (see EarthBase.DTYPES). The scalar arguments stay Python floats
+Field3D = gtscript.Field["dtype"]
+
+
+EARTH_CONSTANTS = ("WATER_HEAT_CAPACITY", "AIR_HEAT_CAPACITY", "LAND_HEAT_CAPACITY",
+                   "WATER_HEAT_TRANSFER_COEFFICIENT", "AIR_HEAT_TRANSFER_COEFFICIENT", "LAND_HEAT_TRANSFER_COEFFICIENT")
+
+
+def earth_externals(overrides: typing.Optional[dict] = None) -> dict:
+    """
+    Values of the constants module used by the Earth stencils, passed to GT4Py as externals.
+    Read at construction time so that a changed constant gives a different stencil in the registry
+    :param overrides: values replacing the ones of the constants module for one Earth, names from EARTH_CONSTANTS
+    :return:
+    """
+    overrides = overrides or dict()
+    unknown = set(overrides) - set(EARTH_CONSTANTS)
+    if unknown:
+        raise ValueError(f"Unknown Earth constants {sorted(unknown)}, expected names from {EARTH_CONSTANTS}")
+    return {name: overrides.get(name, getattr(constants, name)) for name in EARTH_CONSTANTS}
+
+
+def slab_chunk_mass(get: Callable) -> np.ndarray:
+    return get("water_mass") + get("air_mass") + get("land_mass")
+
+
+def slab_chunk_energy(get: Callable) -> np.ndarray:
+    return get("water_energy") + get("air_energy") + get("land_energy")
+
+
+def slab_water_ratio(get: Callable) -> np.ndarray:
+    return get("water_mass") / get("chunk_mass")
+
+
+def slab_air_ratio(get: Callable) -> np.ndarray:
+    return get("air_mass") / get("chunk_mass")
+
+
+def slab_land_ratio(get: Callable) -> np.ndarray:
+    return get("land_mass") / get("chunk_mass")
+
+
+# Quantities derived from the Earth fields by the reduction engine
+EARTH_QUANTITIES = {
+    "chunk_mass": slab_chunk_mass,
+    "chunk_energy": slab_chunk_energy,
+    "water_ratio": slab_water_ratio,
+    "air_ratio": slab_air_ratio,
+    "land_ratio": slab_land_ratio,
+}
+
+# All the global diagnostics of the Earth, computed together in one sweep
+EARTH_DIAGNOSTICS = {
+    "total_mass": ("sum", "chunk_mass"),
+    "total_energy": ("sum", "chunk_energy"),
+    "average_temperature": ("mean", "chunk_temp"),
+    "min_temperature": ("min", "chunk_temp"),
+    "max_temperature": ("max", "chunk_temp"),
+    "mass_weighted_temperature": ("weighted_mean", "chunk_temp", "chunk_mass"),
+    "water_composition": ("mean", "water_ratio"),
+    "air_composition": ("mean", "air_ratio"),
+    "land_composition": ("mean", "land_ratio"),
+}
+
+
+@gtscript.function
+def mixture_properties(water_mass: Field3D, air_mass: Field3D, land_mass: Field3D):
+    """
+    The chunk mass and the mass weighted heat transfer coefficient and specific heat capacity of a chunk
+    :return: chunk mass, heat transfer coefficient, specific heat capacity
+    """
+    from __externals__ import WATER_HEAT_TRANSFER_COEFFICIENT, AIR_HEAT_TRANSFER_COEFFICIENT, LAND_HEAT_TRANSFER_COEFFICIENT
+    from __externals__ import WATER_HEAT_CAPACITY, AIR_HEAT_CAPACITY, LAND_HEAT_CAPACITY
+    chunk_mass = water_mass[0, 0, 0] + air_mass[0, 0, 0] + land_mass[0, 0, 0]
+    water_ratio = water_mass[0, 0, 0] / chunk_mass
+    air_ratio = air_mass[0, 0, 0] / chunk_mass
+    land_ratio = land_mass[0, 0, 0] / chunk_mass
+    heat_transfer_coefficient = water_ratio * WATER_HEAT_TRANSFER_COEFFICIENT + air_ratio * AIR_HEAT_TRANSFER_COEFFICIENT + \
+        land_ratio * LAND_HEAT_TRANSFER_COEFFICIENT
+    specific_heat_capacity = water_ratio * WATER_HEAT_CAPACITY + air_ratio * AIR_HEAT_CAPACITY + \
+        land_ratio * LAND_HEAT_CAPACITY
+    return chunk_mass, heat_transfer_coefficient, specific_heat_capacity
+
+
+def compute_derived_properties(water_mass: Field3D,
+                               air_mass: Field3D,
+                               land_mass: Field3D,
+                               chunk_mass: Field3D,
+                               heat_transfer_coefficient: Field3D,
+                               specific_heat_capacity: Field3D):
+    """
+    The chunk mass, heat transfer coefficient and specific heat capacity of every chunk, in one pass
+    """
+    with computation(PARALLEL), interval(...):
+        chunk_mass, heat_transfer_coefficient, specific_heat_capacity = mixture_properties(water_mass, air_mass, land_mass)
+
+
+@gtscript.function
+def temperature_to_energy(temperature: Field3D, mass: Field3D) -> float:
+    """
+    Set the temperature of the component by computing the energy from the mass and the temperature
+    Water specific is our case (as it is only used to generate a full of water earth)
+    :param temperature:
+    :return:
+    """
+    from __externals__ import WATER_HEAT_CAPACITY
+    return temperature[0, 0, 0] * mass[0, 0, 0] * WATER_HEAT_CAPACITY
+
+
+def temperature_to_energy_field(temperature: Field3D, mass: Field3D, energy: Field3D):
+    with computation(PARALLEL), interval(...):
+        energy = temperature_to_energy(temperature=temperature, mass=mass)
+
+
+@gtscript.function
+def chunk_temperature(water_energy: Field3D, 
+    water_mass: Field3D,
+    air_energy: Field3D, 
+    air_mass: Field3D, 
+    land_energy: Field3D, 
+    land_mass: Field3D) -> float:
+    from __externals__ import WATER_HEAT_CAPACITY, AIR_HEAT_CAPACITY, LAND_HEAT_CAPACITY, HAS_WATER, HAS_AIR, HAS_LAND
+    temp = 0.0
+    nb_components = 0
+    if __INLINED(HAS_WATER):
+        if water_mass[0, 0, 0] != 0:
+            temp += water_energy[0, 0, 0] / (WATER_HEAT_CAPACITY * water_mass[0, 0, 0])
+            nb_components += 1
+    if __INLINED(HAS_AIR):
+        if air_mass[0, 0, 0] != 0:
+            temp += air_energy[0, 0, 0] / (AIR_HEAT_CAPACITY * air_mass[0, 0, 0])
+            nb_components += 1
+    if __INLINED(HAS_LAND):
+        if land_mass[0, 0, 0] != 0:
+            temp += land_energy[0, 0, 0] / (LAND_HEAT_CAPACITY * land_mass[0, 0, 0])
+            nb_components += 1
+    return temp / nb_components
+
+
+def compute_chunk_temperature(water_energy: Field3D, 
+                                water_mass: Field3D, 
+                                air_energy: Field3D, 
+                                air_mass: Field3D, 
+                                land_energy: Field3D, 
+                                land_mass: Field3D,
+                                temperature: Field3D) -> float:
+    with computation(PARALLEL), interval(...):
+        temperature = chunk_temperature(water_energy=water_energy, water_mass=water_mass, air_energy=air_energy, air_mass=air_mass, land_energy=land_energy, land_mass=land_mass)
+
+
+@gtscript.function
+def component_mass_sum(water_mass: Field3D, air_mass: Field3D, land_mass: Field3D):
+    """
+    The chunk mass, reading only the masses of the components the stencil variant is built for (see ComponentStencil).
+    The sum keeps the order water + air + land so that every variant gives the same result.
+    The first component present starts the sum, a 0.0 literal would turn the sum into float64 in float32 mode
+    """
+    from __externals__ import HAS_WATER, HAS_AIR, HAS_LAND
+    if __INLINED(HAS_WATER):
+        chunk_mass = water_mass[0, 0, 0]
+        if __INLINED(HAS_AIR):
+            chunk_mass = chunk_mass + air_mass[0, 0, 0]
+    elif __INLINED(HAS_AIR):
+        chunk_mass = air_mass[0, 0, 0]
+    if __INLINED(HAS_LAND):
+        if __INLINED(HAS_WATER or HAS_AIR):
+            chunk_mass = chunk_mass + land_mass[0, 0, 0]
+        else:
+            chunk_mass = land_mass[0, 0, 0]
+    elif __INLINED(not (HAS_WATER or HAS_AIR)):
+        chunk_mass = 0.0  # No component in this part of the grid, nothing is added
+    return chunk_mass
+
+
+def add_energy(input_energy: Field3D,
+               water_energy: Field3D, 
+               water_mass: Field3D, 
+               air_energy: Field3D, 
+               air_mass: Field3D, 
+               land_energy: Field3D, 
+               land_mass: Field3D):
+    """
+    Distribute a same amount of energy on all the chunk of the earth
+    """
+    from __externals__ import HAS_WATER, HAS_AIR, HAS_LAND
+    with computation(PARALLEL), interval(...):
+        chunk_mass = component_mass_sum(water_mass, air_mass, land_mass)
+        if __INLINED(HAS_WATER):
+            if water_mass[0, 0, 0] != 0:
+                water_energy[0, 0, 0] += input_energy * (water_mass[0, 0, 0]/chunk_mass)
+        if __INLINED(HAS_AIR):
+            if air_mass[0, 0, 0] != 0:
+                air_energy[0, 0, 0] += input_energy * (air_mass[0, 0, 0]/chunk_mass)
+        if __INLINED(HAS_LAND):
+            if land_mass[0, 0, 0] != 0:
+                land_energy[0, 0, 0] += input_energy * (land_mass[0, 0, 0]/chunk_mass)
+
+
+def add_uniform_energy(water_energy: Field3D,
+                       water_mass: Field3D,
+                       air_energy: Field3D,
+                       air_mass: Field3D,
+                       land_energy: Field3D,
+                       land_mass: Field3D,
+                       input_energy: float):
+    """
+    add_energy with the same energy for every chunk given as a scalar, without a field to hold it
+    """
+    from __externals__ import HAS_WATER, HAS_AIR, HAS_LAND
+    with computation(PARALLEL), interval(...):
+        chunk_mass = component_mass_sum(water_mass, air_mass, land_mass)
+        if __INLINED(HAS_WATER):
+            if water_mass[0, 0, 0] != 0:
+                water_energy[0, 0, 0] += input_energy * (water_mass[0, 0, 0]/chunk_mass)
+        if __INLINED(HAS_AIR):
+            if air_mass[0, 0, 0] != 0:
+                air_energy[0, 0, 0] += input_energy * (air_mass[0, 0, 0]/chunk_mass)
+        if __INLINED(HAS_LAND):
+            if land_mass[0, 0, 0] != 0:
+                land_energy[0, 0, 0] += input_energy * (land_mass[0, 0, 0]/chunk_mass)
 
 
 class Earth(EarthBase, CelestialBody):
@@ -17,209 +246,259 @@ class Earth(EarthBase, CelestialBody):
     Second layer of the Earth model.
     In this layer are all the physical properties and functions of the Earth implemented. It is here that we will add
     new model variables
+
+    The chunk mass, heat transfer coefficient and specific heat capacity are derived from the masses of the components
+    (DERIVED_FIELDS), call `refresh_derived_fields` before reading them. In the lean memory mode they are not stored,
+    the stencils compute them from the masses with `mixture_properties`
     """
     albedo: float = 0.3
     CARBON_EMISSIONS_PER_TIME_DELTA: float = 1_000_000  # ppm
     backend: str
-
-    def __init__(self, shape: tuple, radius: float = 6.3781e6, *, parent=None, backend="numpy"):
-        EarthBase.__init__(self, shape, parent=parent, backend=backend)
+    CHECKPOINT_ATTRIBUTES = ("absorbed_energy",)
+    DERIVED_FIELDS = {"chunk_mass": ("water_mass", "air_mass", "land_mass"),
+                      "heat_transfer_coefficient": ("water_mass", "air_mass", "land_mass"),
+                      "specific_heat_capacity": ("water_mass", "air_mass", "land_mass")}
+
+    def __init__(self, shape: tuple, radius: float = 6.3781e6, *, parent=None, backend="numpy", halo: int = 1,
+                 boundaries: tuple = ("periodic", "closed", "closed"), autotune: bool = False, universe=None,
+                 constants: typing.Optional[dict] = None, dtype=np.float64, memory_mode: str = "full",
+                 component_masks: bool = False, warm_up: bool = False, warm_up_workers: typing.Optional[int] = None):
+        """
+        :param universe: the universe the Earth belongs to, the default universe if None
+        :param constants: values replacing the ones of the constants module for this Earth (see EARTH_CONSTANTS)
+        :param dtype: the precision of the fields and of the stencils, np.float64 or np.float32
+        :param memory_mode: "full" or "lean", see EarthBase
+        :param component_masks: if True, the stencils branching on the components of the chunks are launched per K
+        slab with a variant reading only the components present in the slab (see ComponentStencil)
+        :param warm_up: the stencils are built at their first launch. If True, the ones the run needs (see
+        `required_stencils`) are compiled at construction in a pool of `warm_up_workers` processes (all the CPUs by
+        default) instead. With component masks, the variants depend on the components in the grid, which is not filled
+        yet : they are compiled by the next call to `warm_up_stencils` (done by the first update of a TickingEarth)
+        """
+        EarthBase.__init__(self, shape, parent=parent, backend=backend, halo=halo, boundaries=boundaries, dtype=dtype,
+                           memory_mode=memory_mode)
         CelestialBody.__init__(self,
-                               radius)  # The default radius of the earth was found here https://arxiv.org/abs/1510.07674
+                               radius, universe)  # The default radius of the earth was found here https://arxiv.org/abs/1510.07674
         self.get_universe().earth = self
         self.get_universe().discover_everything()
         self.backend = backend
-        self.origin = (1, 1, 1)
-
-        
-
-        @gtscript.function
-        def component_ratio(component_mass: gtscript.Field[float], chunk_mass: gtscript.Field[float]) -> float:
-            return component_mass[0, 0, 0] / chunk_mass[0, 0, 0]
-        
-        def compute_heat_transfer_coefficient(water_mass: gtscript.Field[float], 
-                                              air_mass: gtscript.Field[float], 
-                                              land_mass: gtscript.Field[float], 
-                                              chunk_mass: gtscript.Field[float],
-                                              heat_transfer_coefficient: gtscript.Field[float]):
-            with computation(PARALLEL), interval(...):
-                heat_transfer_coefficient = component_ratio(water_mass, chunk_mass) * constants.WATER_HEAT_TRANSFER_COEFFICIENT + \
-                                             component_ratio(air_mass, chunk_mass) * constants.AIR_HEAT_TRANSFER_COEFFICIENT + \
-                                                component_ratio(land_mass, chunk_mass) * constants.LAND_HEAT_TRANSFER_COEFFICIENT
-        
-        def compute_specific_heat_capacity(water_mass: gtscript.Field[float], 
-                                              air_mass: gtscript.Field[float], 
-                                              land_mass: gtscript.Field[float], 
-                                              chunk_mass: gtscript.Field[float],
-                                              specific_heat_capacity: gtscript.Field[float]):
-            with computation(PARALLEL), interval(...):
-                specific_heat_capacity = component_ratio(water_mass, chunk_mass) * constants.WATER_HEAT_CAPACITY + \
-                                             component_ratio(air_mass, chunk_mass) * constants.AIR_HEAT_CAPACITY + \
-                                                component_ratio(land_mass, chunk_mass) * constants.LAND_HEAT_CAPACITY
-                
-        def compute_chunk_composition(water_mass: gtscript.Field[float], 
-                                      air_mass: gtscript.Field[float], 
-                                      land_mass: gtscript.Field[float], 
-                                      chunk_mass: gtscript.Field[float],
-                                      water_composition: gtscript.Field[float],
-                                      air_composition: gtscript.Field[float],
-                                      land_composition: gtscript.Field[float]):
-            with computation(PARALLEL), interval(...):
-                water_composition = component_ratio(water_mass, chunk_mass)
-                air_composition = component_ratio(air_mass, chunk_mass)
-                land_composition = component_ratio(land_mass, chunk_mass)
-
-        @gtscript.function
-        def temperature_to_energy(temperature: gtscript.Field[float], mass: gtscript.Field[float]) -> float:
-            """
-            Set the temperature of the component by computing the energy from the mass and the temperature
-            Water specific is our case (as it is only used to generate a full of water earth)
-            :param temperature:
-            :return:
-            """
-            return temperature[0, 0, 0] * mass[0, 0, 0] * constants.WATER_HEAT_CAPACITY
-        
-        def temperature_to_energy_field(temperature: gtscript.Field[float], mass: gtscript.Field[float], energy: gtscript.Field[float]):
-            with computation(PARALLEL), interval(...):
-                energy = temperature_to_energy(temperature=temperature, mass=mass)
-            
-
-        @gtscript.function
-        def chunk_temperature(water_energy: gtscript.Field[float], 
-            water_mass: gtscript.Field[float],
-            air_energy: gtscript.Field[float], 
-            air_mass: gtscript.Field[float], 
-            land_energy: gtscript.Field[float], 
-            land_mass: gtscript.Field[float]) -> float:
-            temp = 0.0
-            nb_components = 0
-            if water_mass[0, 0, 0] != 0:
-                temp += water_energy[0, 0, 0] / (constants.WATER_HEAT_CAPACITY * water_mass[0, 0, 0])
-                nb_components += 1
-            if air_mass[0, 0, 0] != 0:
-                temp += air_energy[0, 0, 0] / (constants.AIR_HEAT_CAPACITY * air_mass[0, 0, 0])
-                nb_components += 1
-            if land_mass[0, 0, 0] != 0:
-                temp += land_energy[0, 0, 0] / (constants.LAND_HEAT_CAPACITY * land_mass[0, 0, 0])
-                nb_components += 1
-            return temp / nb_components
-
-        def compute_chunk_temperature(water_energy: gtscript.Field[float], 
-                                        water_mass: gtscript.Field[float], 
-                                        air_energy: gtscript.Field[float], 
-                                        air_mass: gtscript.Field[float], 
-                                        land_energy: gtscript.Field[float], 
-                                        land_mass: gtscript.Field[float],
-                                        temperature: gtscript.Field[float]) -> float:
-            with computation(PARALLEL), interval(...):
-                temperature = chunk_temperature(water_energy=water_energy, water_mass=water_mass, air_energy=air_energy, air_mass=air_mass, land_energy=land_energy, land_mass=land_mass)
-
-        def compute_chunk_mass(water_mass: gtscript.Field[float],
-                                air_mass: gtscript.Field[float], 
-                                land_mass: gtscript.Field[float],
-                                chunk_mass: gtscript.Field[float]) -> float:
-            with computation(PARALLEL), interval(...):
-                chunk_mass = water_mass[0, 0, 0] + air_mass[0, 0, 0] + land_mass[0, 0, 0]
-
-
-        def sum_vertical_values(in_field: gtscript.Field[float],
-                           out_field: gtscript.Field[float]):
-            """
-            Sum all the values of the input field on K dimensions and put the result in the output field at [I, J, 0]
-            :param in_field:
-            :param out_field:
-            :return:
-            """
-            with computation(PARALLEL), interval(...):
-                out_field = in_field[0, 0, 0] # First copy the field
-            with computation(BACKWARD), interval(0, -1):
-                out_field += out_field[0, 0, 1] # Then add the next element to the previous one
-        
-
-        def add_energy(input_energy: gtscript.Field[float],
-                       water_energy: gtscript.Field[float], 
-                       water_mass: gtscript.Field[float], 
-                       air_energy: gtscript.Field[float], 
-                       air_mass: gtscript.Field[float], 
-                       land_energy: gtscript.Field[float], 
-                       land_mass: gtscript.Field[float]):
-            """
-            Distribute a same amount of energy on all the chunk of the earth
-            """
-            with computation(PARALLEL), interval(...):
-                chunk_mass = (water_mass[0, 0, 0] + air_mass[0, 0, 0] + land_mass[0, 0, 0])
-                if water_mass[0, 0, 0] != 0:
-                    water_energy[0, 0, 0] += input_energy * (water_mass[0, 0, 0]/chunk_mass)
-                if air_mass[0, 0, 0] != 0:
-                    air_energy[0, 0, 0] += input_energy * (air_mass[0, 0, 0]/chunk_mass)
-                if land_mass[0, 0, 0] != 0:
-                    land_energy[0, 0, 0] += input_energy * (land_mass[0, 0, 0]/chunk_mass)
-
-        self._add_energy = gtscript.stencil(definition=add_energy, backend=self.backend)
-        self._compute_chunk_mass = gtscript.stencil(definition=compute_chunk_mass, backend=self.backend)
-        self._compute_chunk_temperature = gtscript.stencil(definition=compute_chunk_temperature, backend=self.backend)
-        self._sum_vertical_values = gtscript.stencil(definition=sum_vertical_values, backend=self.backend)
-        self._temperature_to_energy_field = gtscript.stencil(definition=temperature_to_energy_field, backend=self.backend)
-        self._compute_heat_transfer_coefficient = gtscript.stencil(definition=compute_heat_transfer_coefficient, backend=self.backend)
-        self._compute_chunk_composition = gtscript.stencil(definition=compute_chunk_composition, backend=self.backend)
-        self._compute_specific_heat_capacity = gtscript.stencil(definition=compute_specific_heat_capacity, backend=self.backend)
-
-
-
-    def sum_horizontal_values(self, field: gtscript.Field[float]):
-        """
-        Sum all the values of the input field on K = 0 level
-        :param in_field:
-        :param out_field:
+        # When autotuning, every stencil may run with another backend sharing the storage layout of `backend`
+        self.autotuner = StencilAutotuner(self.shape, self.backend, dtype=self.dtype) if autotune else None
+
+        self.absorbed_energy = 0.0  # Radiation absorbed since the start, the energy budget of EnergyDriftAlarm
+        self.component_masks = component_masks
+        self.stencil_handles: dict[str, LazyStencil] = dict()
+        self.component_stencils: dict[str, ComponentStencil] = dict()
+        self.warm_up_compile_times: dict[str, float] = dict()
+        self.warm_up_workers = warm_up_workers
+        self.variants_warm_up_pending = False
+        self.externals = dict(earth_externals(constants), **component_externals(ALL_COMPONENTS))
+        self._add_energy = self.get_component_stencil(add_energy)
+        self._add_uniform_energy = self.get_component_stencil(add_uniform_energy)
+        self._compute_chunk_temperature = self.get_component_stencil(compute_chunk_temperature)
+        self._temperature_to_energy_field = self.get_stencil(temperature_to_energy_field)
+        self._compute_derived_properties = self.get_stencil(compute_derived_properties)
+        self.reduction_engine = ReductionEngine(EARTH_QUANTITIES)
+        if warm_up:
+            self.warm_up_at_construction()
+
+    def get_stencil(self, definition, externals: typing.Optional[dict] = None, name: typing.Optional[str] = None):
+        """
+        Handle on the stencil of a definition with the externals and the dtype of the Earth, using the backend chosen by
+        the autotuner if autotuning is enabled. The stencil is built at its first launch
+        :param definition: the gtscript definition function
+        :param externals: the externals to use instead of the ones of the Earth
+        :param name: the name of the stencil in the profiler, the name of the definition by default
+        :return: a handle on the stencil, recording its launches when the profiler is enabled
+        """
+        externals = self.externals if externals is None else externals
+        name = name or definition.__name__
+        if self.autotuner is not None:
+            handle = LazyStencil(name, functools.partial(self.autotuner.stencil, definition, externals))
+        else:
+            spec = (definition, self.backend, externals, self.dtype)
+            handle = LazyStencil(name, functools.partial(get_stencil, *spec), spec)
+        self.stencil_handles[name] = handle
+        return ProfiledStencil(name, handle)
+
+    def get_component_stencil(self, definition):
+        """
+        get_stencil for a definition using the HAS_WATER, HAS_AIR and HAS_LAND externals : with component masks, a
+        ComponentStencil building one variant per combination of components met in the grid, else the variant for all
+        the components
+        :param definition: the gtscript definition function
+        :return: a callable with the interface of the stencil
+        """
+        if not self.component_masks:
+            return self.get_stencil(definition)
+        externals = dict(self.externals)
+
+        def build(bits: int):
+            return self.get_stencil(definition, dict(externals, **component_externals(bits)),
+                                    f"{definition.__name__}[{component_names(bits)}]")
+
+        stencil = self.component_stencils[definition.__name__] = ComponentStencil(definition.__name__, build,
+                                                                                   self.component_tiles, self.halo)
+        return stencil
+
+    def required_definitions(self) -> set[str]:
+        """
+        The definitions of the stencils the Earth launches with its current settings, the other ones are only built if
+        they are used
+        :return: the names of the definitions
+        """
+        names = {"compute_chunk_temperature", "temperature_to_energy_field", "add_uniform_energy"}
+        if not self.lean:
+            names.add("compute_derived_properties")
+        return names
+
+    def required_stencils(self) -> set[str]:
+        """
+        The stencils the Earth launches with its current settings and the components currently in the grid : a
+        component stencil is launched with the variants of the components of its tiles (see ComponentStencil)
+        :return: the names of the handles in `stencil_handles`
+        """
+        names = set()
+        for name in self.required_definitions():
+            stencil = self.component_stencils.get(name)
+            names.update((name,) if stencil is None else stencil.variant_names())
+        return names
+
+    def warm_up_at_construction(self):
+        """
+        Warm-up asked at construction : the grid is not filled yet, so with component masks only the stencils without
+        variants are built, the variants are left to the next `warm_up_stencils`
+        :return:
+        """
+        names = self.required_definitions()
+        if self.component_masks:
+            names -= set(self.component_stencils)
+            self.variants_warm_up_pending = True
+        self.warm_up_stencils(names, workers=self.warm_up_workers)
+
+    def warm_up_stencils(self, names: typing.Optional[typing.Iterable[str]] = None,
+                         workers: typing.Optional[int] = None) -> float:
+        """
+        Builds stencils ahead of their first launch. The ones that are not in the stencil registry yet are compiled
+        concurrently in a pool of processes, then every stencil is loaded in this process
+        :param names: names of stencils of the Earth, `required_stencils()` by default
+        :param workers: the number of processes, all the CPUs by default. With 1, the stencils are built one after the
+        other in this process
+        :return: the time spent
+        """
+        start = time.perf_counter()
+        if names is None:
+            names = self.required_stencils()
+            self.variants_warm_up_pending = False
+        handles = [self.stencil_handles[name] for name in sorted(names)
+                   if name in self.stencil_handles and not self.stencil_handles[name].built]
+        to_compile = dict()
+        for handle in handles:
+            if handle.spec is not None and not STENCIL_REGISTRY.is_built(*handle.spec):
+                to_compile.setdefault(STENCIL_REGISTRY.make_key(*handle.spec), handle)
+        workers = workers or os.cpu_count()
+        if workers > 1 and len(to_compile) > 1:
+            compiled = list(to_compile.values())
+            for handle, elapsed in zip(compiled, compile_stencils([handle.spec for handle in compiled], workers)):
+                self.warm_up_compile_times[handle.name] = elapsed
+        for handle in handles:
+            handle.resolve()
+        return time.perf_counter() - start
+
+    def startup_report(self) -> str:
+        """
+        Human readable summary of the stencils built by this Earth : the time spent building (or loading) each one in
+        this process, and compiling it in the warm-up pool
+        :return:
+        """
+        lines = []
+        for name, handle in sorted(self.stencil_handles.items()):
+            if handle.built:
+                build = f"built in {handle.build_time:7.3f} s"
+            else:
+                build = "not built (never launched)"
+            if name in self.warm_up_compile_times:
+                build += f", compiled in {self.warm_up_compile_times[name]:.3f} s by the warm-up pool"
+            lines.append(f"- {name}: {build}")
+        built = [handle.build_time for handle in self.stencil_handles.values() if handle.built]
+        res = f"Stencils of the Earth : {len(built)} built out of {len(self.stencil_handles)}, " \
+              f"{sum(built):.3f} s building in this process\n" + "\n".join(lines)
+        return res
+
+    def compute_derived_fields(self, names: list[str]) -> list[str]:
+        """
+        The three derived fields have the same inputs, so they are always computed together in one pass
+        """
+        self._compute_derived_properties(self.water_mass, self.air_mass, self.land_mass, self.chunk_mass,
+                                         self.heat_transfer_coefficient, self.specific_heat_capacity,
+                                         origin=self.origin, domain=self.domain)
+        return list(self.DERIVED_FIELDS)
+
+    @cached_diagnostic("water_energy", "water_mass", "air_energy", "air_mass", "land_energy", "land_mass")
+    def global_diagnostics(self) -> dict:
+        """
+        Computes every global diagnostic of the Earth (see EARTH_DIAGNOSTICS) in a single sweep over the fields
+        The individual diagnostics read afterwards are cache hits until the fields are modified
+        :return: diagnostic name -> value, with the composition also given as a dict like the composition property
+        """
+        diagnostics = self.finalize_diagnostics(self.partial_diagnostics())
+        self.store_diagnostics(diagnostics)
+        return diagnostics
+
+    def finalize_diagnostics(self, partials: dict) -> dict:
+        """
+        Turns the partial results of EARTH_DIAGNOSTICS into their values, with the composition also given as a dict
+        :param partials: partial results of one or several sweeps, combined
+        :return:
+        """
+        diagnostics = self.reduction_engine.finalize(partials)
+        diagnostics["composition"] = {"WATER": diagnostics["water_composition"],
+                                      "AIR": diagnostics["air_composition"],
+                                      "LAND": diagnostics["land_composition"]}
+        return diagnostics
+
+    def partial_diagnostics(self) -> dict:
+        """
+        Sweeps over the compute domain and returns the partial results of EARTH_DIAGNOSTICS, that can be combined with
+        the ones of other parts of the grid before being finalized by the reduction engine
         :return:
-        """    
-        return np.sum(field[:, :, 0])
+        """
+        self._compute_chunk_temperature(self.water_energy, self.water_mass, self.air_energy, self.air_mass, self.land_energy, self.land_mass, self.chunk_temp,
+                                        origin=self.origin, domain=self.domain)
+        fields = {name: getattr(self, name)[self.compute_slices] for name in ("water_energy", "water_mass", "air_energy", "air_mass", "land_energy", "land_mass", "chunk_temp")}
+        return self.reduction_engine.partial(fields, EARTH_DIAGNOSTICS)
 
     @property
+    @cached_diagnostic("water_energy", "water_mass", "air_energy", "air_mass", "land_energy", "land_mass")
     def average_temperature(self) -> float:
-        print("Computing average temperature")
-        self._compute_chunk_temperature(self.water_energy, self.water_mass, self.air_energy, self.air_mass, self.land_energy, self.land_mass, self.chunk_temp)
-        temp_total_temperature = gt_storage.empty(self.shape, dtype=float, backend=self.backend)
-        self._sum_vertical_values(self.chunk_temp, temp_total_temperature)
-        self._average_temperature = self.sum_horizontal_values(temp_total_temperature) / len(self)
-        
+        self._average_temperature = self.global_diagnostics()["average_temperature"]
         return self._average_temperature
 
-        
-
     @property
+    @cached_diagnostic("water_mass", "air_mass", "land_mass")
     def total_mass(self) -> float:
-        self._compute_chunk_mass(self.water_mass, self.air_mass, self.land_mass, self.chunk_mass)
-        temp_total_mass = gt_storage.empty(self.shape, dtype=float, backend=self.backend)
-        self._sum_vertical_values(self.chunk_mass, temp_total_mass)
-        self._total_mass = self.sum_horizontal_values(temp_total_mass)
-        print("Computing total mass")
+        self._total_mass = self.global_diagnostics()["total_mass"]
         return self._total_mass
     
     @property
+    @cached_diagnostic("water_energy", "air_energy", "land_energy")
     def total_energy(self) -> float:
-        temp_total_energy = gt_storage.empty(self.shape, dtype=float, backend=self.backend)
-        self._compute_chunk_mass(self.water_energy, self.air_energy, self.land_energy, temp_total_energy)
-        temp_sum_energy = gt_storage.empty(self.shape, dtype=float, backend=self.backend)
-        self._sum_vertical_values(temp_total_energy, temp_sum_energy)
-        return self.sum_horizontal_values(temp_sum_energy)
-
+        return self.global_diagnostics()["total_energy"]
 
     @property
+    @cached_diagnostic("water_mass", "air_mass", "land_mass")
     def composition(self):
-        composition_mass_dict = dict()
-        self._compute_chunk_mass(self.water_mass, self.air_mass, self.land_mass, self.chunk_mass) # If not already computed
-        water_composition = gt_storage.empty(self.shape, dtype=float, backend=self.backend)
-        air_composition = gt_storage.empty(self.shape, dtype=float, backend=self.backend)
-        land_composition = gt_storage.empty(self.shape, dtype=float, backend=self.backend)
-        self._compute_chunk_composition(self.water_mass, self.air_mass, self.land_mass, self.chunk_mass, water_composition, air_composition, land_composition)
-        self._sum_vertical_values(water_composition, water_composition)
-        self._sum_vertical_values(air_composition, air_composition)
-        self._sum_vertical_values(land_composition, land_composition)
-        composition_mass_dict["WATER"] = self.sum_horizontal_values(water_composition)/len(self)
-        composition_mass_dict["AIR"] = self.sum_horizontal_values(air_composition)/len(self)
-        composition_mass_dict["LAND"] = self.sum_horizontal_values(land_composition)/len(self)
-        return composition_mass_dict
+        return self.global_diagnostics()["composition"]
+
+    @property
+    def carbon_concentration(self) -> float:
+        """
+        The carbon concentration, the same in every chunk
+        :return:
+        """
+        if self.lean:
+            return float(self.carbon_ppm)
+        return float(self.carbon_ppm[self.origin])
     
 
     @property
@@ -266,29 +545,29 @@ class Earth(EarthBase, CelestialBody):
 
     def receive_radiation(self, energy: float):
         energy = energy * (1 - self.albedo)
+        self.absorbed_energy += energy
         input_energy = energy/len(self)
-        input_energy_field = gt_storage.full(self.shape, input_energy, backend=self.backend)
-        self._add_energy(input_energy=input_energy_field, 
-                          water_energy=self.water_energy,
-                          water_mass=self.water_mass, 
-                          air_energy=self.air_energy,
-                          air_mass=self.air_mass,
-                          land_energy=self.land_energy, 
-                          land_mass=self.land_mass)
+        self._add_uniform_energy(self.water_energy, self.water_mass, self.air_energy, self.air_mass,
+                                 self.land_energy, self.land_mass, input_energy, origin=self.origin, domain=self.domain)
+        self.touch("water_energy", "air_energy", "land_energy")
 
-    def fill_with_water(self):
+    def fill_with_water(self, seed: typing.Optional[int] = None, workers: typing.Optional[int] = None):
         """
         Fill the earth with water
+        :param seed: if given, the temperatures are drawn in parallel tiles from counter-based streams of that seed (see
+        models.initial_conditions), the same whatever the number of threads. Else from the global numpy random state
+        :param workers: the number of threads used with a seed, all the CPUs by default
         :return:
         """
-        self.water_mass = gt_storage.from_array(np.full(shape=self.shape, fill_value=1000), backend=self.backend)
-        water_temp = gt_storage.from_array(np.random.uniform(290, 310, self.shape), backend=self.backend)
-        self._temperature_to_energy_field(water_temp, self.water_mass, self.water_energy)
-
-        self._compute_chunk_mass(self.water_mass, self.air_mass, self.land_mass, self.chunk_mass)
-        self._compute_heat_transfer_coefficient(self.water_mass, self.air_mass, self.land_mass, self.chunk_mass, self.heat_transfer_coefficient)
-        self._compute_specific_heat_capacity(self.water_mass, self.air_mass, self.land_mass, self.chunk_mass, self.specific_heat_capacity)
-    
-
-
-    
+        if seed is not None:
+            initial_conditions.fill_with_water(self, seed, workers=workers)
+            return
+        self.interior(self.water_mass)[...] = 1000
+        with self.workspace.scratch() as water_temp:
+            self.interior(water_temp)[...] = np.random.uniform(290, 310, self.shape)
+            self._temperature_to_energy_field(water_temp, self.water_mass, self.water_energy, origin=self.origin, domain=self.domain)
+        if self.lean:
+            self.workspace.clear()  # Do not keep a field for the initial conditions only
+        self.exchange_halos("water_mass", "water_energy")
+        self.touch("water_mass", "water_energy")
+        self.refresh_derived_fields()
@@ -18,10 +18,10 @@ class Sun(SunBase, CelestialBody):
         return
 
     def __init__(self, total_energy: float = math.inf, energy_radiated_per_second: float = 3.8e26,
-                 radius: float = 6.957e8):
+                 radius: float = 6.957e8, *, universe=None):
         self.total_energy = total_energy
         self.energy_radiated_per_second = energy_radiated_per_second
-        CelestialBody.__init__(self, radius)
+        CelestialBody.__init__(self, radius, universe)
         self.get_universe().sun = self
         self.get_universe().discover_everything()
 
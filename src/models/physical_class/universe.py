@@ -1,7 +1,9 @@
 import math
-from typing import TYPE_CHECKING
+import time
+from typing import TYPE_CHECKING, Callable, Optional
 
 from models.ABC.ticking_model import TickingModel
+from models.profiler import PROFILER
 from models.physical_class.sun import Sun
 
 if TYPE_CHECKING:
@@ -18,12 +20,36 @@ class Universe(UniverseBase, TickingModel):
     Contains the update method that will update all the components of the universe as well as itself right after.
 
     The universe does not contain itself.
+
+    The bodies built without an explicit universe belong to the default one (see CelestialBody.default_universe).
+    Other universes are independent simulations : build their bodies with `universe=`, they may also have their own
+    TIME_DELTA and EVAPORATION_RATE
     """
     TIME_DELTA: float = 0.01
     EVAPORATION_RATE: float = 0.0001
 
-    def __init__(self):
-        super().__init__()
+    def __init__(self, time_delta: Optional[float] = None, evaporation_rate: Optional[float] = None):
+        """
+        :param time_delta: the time step of this universe, TIME_DELTA if None
+        :param evaporation_rate: the evaporation rate of this universe, EVAPORATION_RATE if None
+        """
+        if time_delta is not None:
+            self.TIME_DELTA = time_delta
+        if evaporation_rate is not None:
+            self.EVAPORATION_RATE = evaporation_rate
+        super().__init__(self.TIME_DELTA)
+        self.observers = []
+
+    def add_observer(self, observer: Callable[["Universe"], None]):
+        """
+        Registers a function called with the universe after every update_all (output, diagnostics, etc ...)
+        :param observer:
+        :return:
+        """
+        self.observers.append(observer)
+
+    def remove_observer(self, observer: Callable[["Universe"], None]):
+        self.observers.remove(observer)
 
     def __str__(self):
         res = ""
@@ -61,10 +87,15 @@ class Universe(UniverseBase, TickingModel):
             return 1.496e11
 
     def update_all(self):
+        start = time.perf_counter() if PROFILER.enabled else None
         for elem in self:
             if isinstance(elem, TickingModel):
                 elem.update()
         self.update()
+        for observer in self.observers:
+            observer(self)
+        if start is not None:
+            PROFILER.end_tick(start, time.perf_counter() - start)
 
     def __update_loop(self):
         while True:
@@ -0,0 +1,203 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable
+
+import numpy as np
+
+
+class Profiler:
+    """
+    Records the wall time and the number of calls of the on_tick methods, of the stencil launches and of the diagnostics.
+
+    The hooks check `enabled` before doing anything else, so a disabled profiler costs one attribute lookup per hooked
+    call and can stay in production runs. When enabled, every call is accumulated per name and per tick, for the
+    summary table and the per-tick histograms, and kept as an event for the Chrome trace (up to `max_events` events).
+
+    Only the process the profiler lives in is recorded : the workers of a DecomposedEarth have their own copy.
+    """
+    CATEGORIES = ("tick", "on_tick", "stencil", "diagnostic")
+
+    def __init__(self, max_events: int = 1_000_000):
+        """
+        :param max_events: maximum number of events kept for the trace, the statistics go on being recorded afterwards
+        """
+        self.enabled = False
+        self.generation = 0
+        self.max_events = max_events
+        self.reset()
+
+    def reset(self):
+        """
+        Forgets everything recorded
+        :return:
+        """
+        self.totals = dict()  # (category, name) -> [calls, total time, min, max]
+        self.per_tick = dict()  # (category, name) -> list of the time spent in each tick
+        self._current_tick = dict()
+        self.ticks = 0
+        self.events = []
+        self.dropped_events = 0
+        self._origin = time.perf_counter()
+
+    def enable(self):
+        self.enabled = True
+        self.generation += 1
+
+    def disable(self):
+        self.enabled = False
+        self.generation += 1
+
+    @contextmanager
+    def profiling(self):
+        """
+        Enables the profiler for the duration of a with block
+        """
+        self.enable()
+        try:
+            yield self
+        finally:
+            self.disable()
+
+    def record(self, category: str, name: str, start: float, duration: float):
+        """
+        Records one call
+        :param category: one of CATEGORIES
+        :param name: the name of what was called
+        :param start: time.perf_counter() at the start of the call
+        :param duration: the duration of the call in seconds
+        :return:
+        """
+        key = (category, name)
+        total = self.totals.get(key)
+        if total is None:
+            self.totals[key] = [1, duration, duration, duration]
+        else:
+            total[0] += 1
+            total[1] += duration
+            if duration < total[2]:
+                total[2] = duration
+            if duration > total[3]:
+                total[3] = duration
+        self._current_tick[key] = self._current_tick.get(key, 0.0) + duration
+        if len(self.events) < self.max_events:
+            self.events.append((category, name, start, duration, threading.get_ident()))
+        else:
+            self.dropped_events += 1
+
+    def end_tick(self, start: float, duration: float):
+        """
+        Closes the current tick, called by the Universe after every update_all
+        :return:
+        """
+        self.record("tick", "update_all", start, duration)
+        for key in set(self.per_tick) | set(self._current_tick):
+            self.per_tick.setdefault(key, [0.0] * self.ticks).append(self._current_tick.get(key, 0.0))
+        self._current_tick = dict()
+        self.ticks += 1
+
+    def wrap(self, category: str, name: str, function: Callable) -> Callable:
+        """
+        :return: a function recording the calls of `function` under that name
+        """
+        def profiled(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                self.record(category, name, start, time.perf_counter() - start)
+        return profiled
+
+    def histograms(self, bins: int = 10) -> dict:
+        """
+        Histogram of the time spent per tick by everything recorded, with logarithmic bins
+        :return: "category:name" -> {"edges": bin edges in seconds, "counts": number of ticks per bin}
+        """
+        res = dict()
+        for (category, name), values in self.per_tick.items():
+            values = np.asarray(values)
+            values = values[values > 0]
+            if values.size == 0:
+                continue
+            low, high = values.min(), values.max()
+            edges = np.geomspace(low, high, bins + 1) if high > low else np.array([low, high])
+            counts, edges = np.histogram(values, bins=edges)
+            res[f"{category}:{name}"] = {"edges": edges.tolist(), "counts": counts.tolist()}
+        return res
+
+    def summary(self) -> list[dict]:
+        """
+        The statistics of everything recorded, the most expensive first
+        :return:
+        """
+        tick_time = self.totals.get(("tick", "update_all"), [0, 0.0])[1]
+        res = []
+        for (category, name), (calls, total, minimum, maximum) in self.totals.items():
+            per_tick = np.asarray(self.per_tick.get((category, name), [0.0]))
+            res.append({"category": category, "name": name, "calls": calls, "total_s": total,
+                        "mean_s": total / calls, "min_s": minimum, "max_s": maximum,
+                        "tick_share": total / tick_time if tick_time else None,
+                        "per_tick_p50_s": float(np.percentile(per_tick, 50)),
+                        "per_tick_p95_s": float(np.percentile(per_tick, 95))})
+        return sorted(res, key=lambda row: row["total_s"], reverse=True)
+
+    def report(self) -> str:
+        res = f"Profiler : {self.ticks} ticks\n"
+        res += f"{'category':>10s} {'name':>36s} | {'calls':>7s} | {'total (ms)':>10s} | {'mean (us)':>10s} | " \
+               f"{'% tick':>6s} | {'p50/tick (us)':>13s} | {'p95/tick (us)':>13s}\n"
+        for row in self.summary():
+            share = f"{100 * row['tick_share']:6.1f}" if row["tick_share"] is not None else f"{'-':>6s}"
+            res += f"{row['category']:>10s} {row['name']:>36s} | {row['calls']:7d} | {1e3 * row['total_s']:10.2f} | " \
+                   f"{1e6 * row['mean_s']:10.1f} | {share} | {1e6 * row['per_tick_p50_s']:13.1f} | " \
+                   f"{1e6 * row['per_tick_p95_s']:13.1f}\n"
+        return res
+
+    def to_json(self, path: str):
+        """
+        Writes the summary, the time per tick of everything recorded and the histograms in a JSON file
+        """
+        with open(path, "w") as file:
+            json.dump({"ticks": self.ticks,
+                       "summary": self.summary(),
+                       "per_tick_s": {f"{category}:{name}": values for (category, name), values in self.per_tick.items()},
+                       "histograms": self.histograms(),
+                       "dropped_events": self.dropped_events}, file, indent=2)
+
+    def to_chrome_trace(self, path: str):
+        """
+        Writes the events in the Chrome trace format, to open with chrome://tracing or https://ui.perfetto.dev
+        """
+        pid = os.getpid()
+        events = [{"name": name, "cat": category, "ph": "X", "pid": pid, "tid": thread,
+                   "ts": 1e6 * (start - self._origin), "dur": 1e6 * duration}
+                  for category, name, start, duration, thread in self.events]
+        with open(path, "w") as file:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, file)
+
+
+PROFILER = Profiler()
+
+
+class ProfiledStencil:
+    """
+    Handle on a compiled stencil recording its launches in the profiler when it is enabled, and calling it directly
+    otherwise. The other attributes are the ones of the stencil
+    """
+
+    def __init__(self, name: str, stencil: Callable):
+        self.name = name
+        self.stencil = stencil
+
+    def __call__(self, *args, **kwargs):
+        if not PROFILER.enabled:
+            return self.stencil(*args, **kwargs)
+        start = time.perf_counter()
+        try:
+            return self.stencil(*args, **kwargs)
+        finally:
+            PROFILER.record("stencil", self.name, start, time.perf_counter() - start)
+
+    def __getattr__(self, name: str):
+        return getattr(self.stencil, name)
@@ -0,0 +1,186 @@
+import hashlib
+import json
+import os
+import platform
+import statistics
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Optional
+
+import numpy as np
+import gt4py.storage as gt_storage
+from gt4py.cartesian import backend as gt_backend
+
+from models.stencil_registry import get_stencil
+
+
+CPU_BACKENDS = ("numpy", "gt:cpu_kfirst", "gt:cpu_ifirst", "dace:cpu")
+AUTOTUNE_CACHE_PATH = ".stencil_autotune.json"
+
+
+def compatible_backends(backend: str, candidates: tuple = CPU_BACKENDS) -> list[str]:
+    """
+    The candidate backends able to run on the storages allocated by `backend` without copying them, i.e. the ones for
+    which that memory layout is optimal
+    :param backend: the backend the fields of the model are allocated with
+    :param candidates: the backends to consider
+    :return: the compatible backends, `backend` itself first
+    """
+    storage = gt_storage.empty((2, 2, 2), backend=backend)
+    res = [backend]
+    for candidate in candidates:
+        if candidate == backend:
+            continue
+        try:
+            storage_info = gt_backend.from_name(candidate).storage_info
+        except Exception:  # Backend not installed or unknown
+            continue
+        if storage_info["device"] == "cpu" and storage_info["is_optimal_layout"](storage, ("I", "J", "K")):
+            res.append(candidate)
+    return res
+
+
+class StencilAutotuner:
+    """
+    Picks, for every stencil, the fastest backend among the ones sharing the storage layout of the model backend.
+
+    The first call of a stencil is trial-run on copies of its actual arguments with every candidate backend, the fastest
+    one is used from then on. Decisions are saved in a JSON file keyed by host, grid shape, model backend and dtype, then
+    by stencil (definition and externals, see `decision_key`), so later runs on the same machine, grid and dtype reuse
+    them without measuring again.
+    """
+
+    def __init__(self, shape: tuple, backend: str, candidates: tuple = CPU_BACKENDS,
+                 cache_path: str = AUTOTUNE_CACHE_PATH, nb_calls: int = 5, dtype=np.float64):
+        """
+        :param shape: the grid shape of the model
+        :param backend: the backend the fields of the model are allocated with
+        :param candidates: the backends to try
+        :param cache_path: the file the decisions are saved to
+        :param nb_calls: number of timed calls per candidate
+        :param dtype: the dtype of the fields of the model
+        """
+        self.shape = tuple(shape)
+        self.backend = backend
+        self.dtype = np.dtype(dtype)
+        self.candidates = compatible_backends(backend, candidates)
+        self.cache_path = Path(cache_path)
+        self.nb_calls = nb_calls
+        self.key = f"{platform.node()}|{'x'.join(map(str, self.shape))}|{backend}|{self.dtype.name}"
+        self.rejected_backends: dict[str, str] = dict()  # Candidate that failed to build -> why, it is no longer tried
+        self.decisions = self._load().get(self.key, dict())
+
+    def _load(self) -> dict:
+        try:
+            with open(self.cache_path) as file:
+                return json.load(file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return dict()
+
+    def _save(self, name: str, decision: dict):
+        """
+        Adds a decision to the cache file, re-reading it first so that concurrent runs do not erase each other's results
+        """
+        cache = self._load()
+        cache.setdefault(self.key, dict())[name] = decision
+        self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+        descriptor, temporary_path = tempfile.mkstemp(dir=self.cache_path.parent, suffix=".tmp")
+        with os.fdopen(descriptor, "w") as file:
+            json.dump(cache, file, indent=2)
+        os.replace(temporary_path, self.cache_path)
+
+    @staticmethod
+    def decision_key(definition: Callable, externals: Optional[dict] = None) -> str:
+        """
+        The key of the decision of a stencil in the cache file : like StencilRegistry.make_key, two stencils of the same
+        definition built with other externals (e.g. the component variants) are tuned separately. The dtype is part of
+        the key of the autotuner
+        :return: the qualified name of the definition and a digest of its externals
+        """
+        items = repr(sorted((externals or {}).items())).encode()
+        return f"{definition.__module__}.{definition.__qualname__}|{hashlib.sha1(items).hexdigest()[:12]}"
+
+    def backend_for(self, definition: Callable, externals: Optional[dict] = None) -> Optional[str]:
+        """
+        :return: the backend chosen for that stencil, None if it has not been tuned yet
+        """
+        decision = self.decisions.get(self.decision_key(definition, externals))
+        return decision["backend"] if decision is not None else None
+
+    def stencil(self, definition: Callable, externals: Optional[dict] = None):
+        """
+        Returns the stencil built with the backend chosen for it, or a stencil that tunes itself at its first call
+        :param definition: the gtscript definition function
+        :param externals: the externals given to gtscript.stencil
+        :return: a callable with the interface of a GT4Py stencil
+        """
+        backend = self.backend_for(definition, externals)
+        if backend is not None:
+            return get_stencil(definition, backend, externals, self.dtype)
+        return AutotunedStencil(self, definition, externals)
+
+    def tune(self, definition: Callable, externals: Optional[dict], args: tuple, kwargs: dict) -> str:
+        """
+        Trial-runs the stencil on copies of its arguments with every candidate backend and records the fastest
+        :return: the chosen backend
+        """
+        timings = dict()
+        for backend in list(self.candidates):
+            try:
+                stencil = get_stencil(definition, backend, externals, self.dtype)
+            except Exception as e:
+                if backend == self.backend:
+                    raise
+                self.rejected_backends[backend] = f"{definition.__name__} cannot be built ({type(e).__name__})"
+                self.candidates.remove(backend)
+                continue
+            trial_args = [self._copy(arg) for arg in args]
+            trial_kwargs = {name: self._copy(arg) for name, arg in kwargs.items()}
+            stencil(*trial_args, **trial_kwargs)  # Warm up (loading, argument checks caches, etc ...)
+            calls = []
+            for _ in range(self.nb_calls):
+                start = time.perf_counter()
+                stencil(*trial_args, **trial_kwargs)
+                calls.append(time.perf_counter() - start)
+            timings[backend] = statistics.median(calls)
+        best = min(timings, key=timings.get)
+        decision = {"stencil": definition.__name__, "backend": best, "timings": timings}
+        key = self.decision_key(definition, externals)
+        self.decisions[key] = decision
+        self._save(key, decision)
+        return best
+
+    def _copy(self, arg):
+        if isinstance(arg, np.ndarray):
+            return gt_storage.from_array(arg, backend=self.backend)
+        return arg
+
+    def report(self) -> str:
+        res = f"Stencil autotuner ({self.key}) : \n"
+        res += "\n".join(f"- {decision.get('stencil', key)} ({key.rsplit('|', 1)[-1]}): {decision['backend']} "
+                         f"({', '.join(f'{backend} {1000 * elapsed:.3f} ms' for backend, elapsed in decision['timings'].items())})"
+                         for key, decision in self.decisions.items())
+        for backend, reason in self.rejected_backends.items():
+            res += f"\n- {backend} no longer tried: {reason}"
+        return res
+
+
+class AutotunedStencil:
+    """
+    Stands for a stencil whose backend has not been chosen yet, the choice is made at the first call
+    """
+
+    def __init__(self, autotuner: StencilAutotuner, definition: Callable, externals: Optional[dict]):
+        self.autotuner = autotuner
+        self.definition = definition
+        self.externals = externals
+        self._stencil = None
+
+    def __call__(self, *args, **kwargs):
+        if self._stencil is None:
+            backend = self.autotuner.backend_for(self.definition, self.externals)
+            if backend is None:
+                backend = self.autotuner.tune(self.definition, self.externals, args, kwargs)
+            self._stencil = get_stencil(self.definition, backend, self.externals, self.autotuner.dtype)
+        return self._stencil(*args, **kwargs)
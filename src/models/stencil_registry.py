@@ -0,0 +1,178 @@
+import multiprocessing
+import time
+from typing import Callable, Optional
+
+import numpy as np
+from gt4py.cartesian import gtscript
+
+
+class StencilRegistry:
+    """
+    Process-wide cache of compiled GT4Py stencils.
+    Stencils are keyed by their definition function, the backend, the externals and the dtype used to build them, so that building
+    a second Earth (restart, ensemble member, test, etc ...) is a dictionary lookup instead of parsing, hashing and
+    possibly compiling every definition again.
+    """
+
+    def __init__(self):
+        self._stencils = dict()
+        self._build_times = dict()
+        self.hits = 0
+        self.misses = 0
+        self.build_time = 0.0
+        self.saved_time = 0.0
+
+    @staticmethod
+    def make_key(definition: Callable, backend: str, externals: Optional[dict] = None, dtype=np.float64) -> tuple:
+        """
+        Build the key under which a stencil is stored
+        :param definition: the gtscript definition function
+        :param backend: the GT4Py backend name
+        :param externals: the externals given to gtscript.stencil, their values must be hashable
+        :param dtype: the dtype of the fields typed with the "dtype" placeholder
+        :return: a hashable key
+        """
+        return definition, backend, tuple(sorted((externals or {}).items())), np.dtype(dtype).name
+
+    def get(self, definition: Callable, backend: str, externals: Optional[dict] = None, dtype=np.float64):
+        """
+        Returns the compiled stencil for that definition, building it only the first time it is requested
+        :param definition: the gtscript definition function
+        :param backend: the GT4Py backend name
+        :param externals: the externals given to gtscript.stencil
+        :param dtype: the dtype of the fields typed with the "dtype" placeholder
+        :return: the compiled stencil object
+        """
+        key = self.make_key(definition, backend, externals, dtype)
+        stencil = self._stencils.get(key)
+        if stencil is not None:
+            self.hits += 1
+            self.saved_time += self._build_times[key]
+            return stencil
+
+        self.misses += 1
+        start = time.perf_counter()
+        stencil = gtscript.stencil(definition=definition, backend=backend, externals=dict(externals or {}),
+                                   dtypes={"dtype": np.dtype(dtype).type})
+        elapsed = time.perf_counter() - start
+        self.build_time += elapsed
+        self._build_times[key] = elapsed
+        self._stencils[key] = stencil
+        return stencil
+
+    def is_built(self, definition: Callable, backend: str, externals: Optional[dict] = None, dtype=np.float64) -> bool:
+        """
+        :return: True if the stencil is in the registry, i.e. `get` will not build it
+        """
+        return self.make_key(definition, backend, externals, dtype) in self._stencils
+
+    def build_times(self) -> dict[str, float]:
+        """
+        Time spent building each stencil, including loading it from the GT4Py cache on disk
+        :return: "definition name @ backend" -> seconds, summed over the different externals and dtypes
+        """
+        res = dict()
+        for (definition, backend, _, _), elapsed in self._build_times.items():
+            name = f"{definition.__name__}@{backend}"
+            res[name] = res.get(name, 0.0) + elapsed
+        return res
+
+    def clear(self):
+        """
+        Forget every compiled stencil and reset the statistics
+        :return:
+        """
+        self.__init__()
+
+    def __len__(self):
+        return len(self._stencils)
+
+    def report(self) -> str:
+        """
+        Human readable summary of the cache hits and misses and of the startup time they saved
+        :return:
+        """
+        lookups = self.hits + self.misses
+        hit_rate = 100 * self.hits / lookups if lookups else 0.0
+        res = f"Stencil registry : {len(self)} stencils\n" \
+              f"- {self.hits} hits, {self.misses} misses ({hit_rate:.1f}% hit rate)\n" \
+              f"- Time spent building stencils: {self.build_time:.3f} s\n" \
+              f"- Time saved by cache hits: {self.saved_time:.3f} s"
+        return res
+
+
+STENCIL_REGISTRY = StencilRegistry()
+
+
+def get_stencil(definition: Callable, backend: str, externals: Optional[dict] = None, dtype=np.float64):
+    """
+    Shortcut to fetch a stencil from the process-wide registry
+    :param definition: the gtscript definition function
+    :param backend: the GT4Py backend name
+    :param externals: the externals given to gtscript.stencil
+    :param dtype: the dtype of the fields typed with the "dtype" placeholder
+    :return: the compiled stencil object
+    """
+    return STENCIL_REGISTRY.get(definition, backend, externals, dtype)
+
+
+class LazyStencil:
+    """
+    Handle on a stencil that is only built at its first call (or at the first access to one of its attributes), so that
+    the stencils a run never launches are never compiled
+    """
+
+    def __init__(self, name: str, build: Callable[[], Callable], spec: Optional[tuple] = None):
+        """
+        :param name: name of the stencil
+        :param build: returns the compiled stencil
+        :param spec: (definition, backend, externals, dtype) of the stencil when it comes from the registry, so that it
+        can be compiled ahead in another process (see compile_stencils)
+        """
+        self.name = name
+        self.spec = spec
+        self.build_time = None
+        self._build = build
+        self._stencil = None
+
+    @property
+    def built(self) -> bool:
+        return self._stencil is not None
+
+    def resolve(self) -> Callable:
+        """
+        Builds the stencil if it has not been built yet
+        :return: the compiled stencil
+        """
+        if self._stencil is None:
+            start = time.perf_counter()
+            self._stencil = self._build()
+            self.build_time = time.perf_counter() - start
+        return self._stencil
+
+    def __call__(self, *args, **kwargs):
+        return self.resolve()(*args, **kwargs)
+
+    def __getattr__(self, name: str):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return getattr(self.resolve(), name)
+
+
+def _compile_stencil(spec: tuple) -> float:
+    start = time.perf_counter()
+    get_stencil(*spec)
+    return time.perf_counter() - start
+
+
+def compile_stencils(specs: list[tuple], workers: int) -> list[float]:
+    """
+    Compiles stencils concurrently in a pool of forked processes. The compiled stencils end up in the GT4Py cache on
+    disk, from where the registry of this process then loads them in a fraction of the compilation time
+    :param specs: (definition, backend, externals, dtype) of every stencil, all different
+    :param workers: the number of processes
+    :return: the time spent compiling every stencil, in its process
+    """
+    context = multiprocessing.get_context("fork")
+    with context.Pool(min(workers, len(specs))) as pool:
+        return pool.map(_compile_stencil, specs, chunksize=1)
@@ -0,0 +1,244 @@
+import multiprocessing
+import traceback
+import weakref
+from typing import Optional
+from multiprocessing import shared_memory
+
+import numpy as np
+import gt4py.storage as gt_storage
+
+from models.base_class.earth_base import cached_diagnostic
+from models.ticking_class.ticking_earth import TickingEarth
+
+
+SHARED_FIELDS = TickingEarth.STORAGE_FIELDS
+SHARED_SCRATCH_FIELDS = 1  # Scratch fields used at the same time by a tick of the staged diffusion
+
+
+def split_tiles(shape: tuple, workers: int) -> list[tuple[tuple, tuple]]:
+    """
+    Splits the I/J plane of the grid in `workers` tiles, as square as possible
+    :param shape: the shape of the compute domain
+    :param workers: the number of tiles
+    :return: the (offset, size) in I and J of every tile
+    """
+    tiles_i = min((d for d in range(1, workers + 1) if workers % d == 0),
+                  key=lambda d: abs(shape[0] / d - shape[1] / (workers // d)))
+    tiles_j = workers // tiles_i
+
+    def split(n, parts):
+        bounds = [n * p // parts for p in range(parts + 1)]
+        return [(bounds[p], bounds[p + 1] - bounds[p]) for p in range(parts)]
+
+    return [((i_offset, j_offset), (i_size, j_size)) for i_offset, i_size in split(shape[0], tiles_i)
+            for j_offset, j_size in split(shape[1], tiles_j)]
+
+
+def tree_reduce(values: list, combine) -> object:
+    """
+    Combines the values pairwise, level by level, like the reduction tree of a parallel reduction
+    :param values: the partial results
+    :param combine: function merging two partial results
+    :return: the combination of all the values
+    """
+    while len(values) > 1:
+        values = [combine(values[i], values[i + 1]) if i + 1 < len(values) else values[i] for i in range(0, len(values), 2)]
+    return values[0]
+
+
+def _tile_worker(earth: "DecomposedEarth", rank: int, tile: tuple, barrier, connection):
+    """
+    Main loop of a worker process. The worker owns a copy of the Earth (inherited through fork) whose fields are the
+    shared memory storages, restricted to the tile of the worker by its origin and domain
+    """
+    (i_offset, j_offset), (i_size, j_size) = tile
+    earth.origin = (earth.halo + i_offset, earth.halo + j_offset, earth.halo)
+    earth.domain = (i_size, j_size, earth.shape[2])
+    earth._rank = rank
+    earth._barrier = barrier
+    earth._workers = []
+    while True:
+        command = connection.recv()
+        if command is None:
+            break
+        name, args = command
+        versions = dict(earth.field_versions)
+        try:
+            result = getattr(earth, name)(*args)
+            touched = [field for field, version in earth.field_versions.items() if version != versions[field]]
+            connection.send(("ok", result, touched))
+        except Exception:
+            barrier.abort()
+            connection.send(("error", traceback.format_exc(), []))
+    connection.close()
+
+
+def _shutdown(workers: list, connections: list, shared_blocks: list):
+    for connection in connections:
+        try:
+            connection.send(None)
+        except (BrokenPipeError, OSError):
+            pass
+    for worker in workers:
+        worker.join(timeout=5)
+        if worker.is_alive():
+            worker.terminate()
+    for block in shared_blocks:
+        try:
+            block.close()
+        except BufferError:  # Some arrays still use the block, the memory is freed with them
+            pass
+        block.unlink()
+
+
+class DecomposedEarth(TickingEarth):
+    """
+    TickingEarth whose grid is split in tiles of the I/J plane, each one updated by a worker process.
+
+    The fields live in shared memory, so a worker reads the cells of its neighbors directly: the halo exchange is a
+    barrier between the workers (plus the boundary conditions of the global halo) after a field read with an offset
+    has been written. The scratch fields of the workspace are in shared memory too, each worker only writing its tile,
+    so there is one scratch field for all the workers instead of one of the full grid per worker. The global diagnostics are computed by every worker on its tile and combined with a tree
+    reduction. From the Universe it behaves like a normal TickingEarth.
+
+    Only the staged diffusion is supported, since the fused one swaps the energy storages at every tick.
+    Workers are forked, so this needs a platform with the fork start method (Linux)
+    """
+
+    def __init__(self, shape: tuple, radius: float = 6.3781e6, *, parent=None, backend="numpy", workers: int = 2,
+                 halo: int = 1, boundaries: tuple = ("periodic", "closed", "closed"), autotune: bool = False,
+                 universe=None, constants: Optional[dict] = None, dtype=np.float64):
+        TickingEarth.__init__(self, shape, radius, parent=parent, backend=backend, diffusion_mode="staged",
+                              halo=halo, boundaries=boundaries, autotune=autotune, universe=universe, constants=constants,
+                              dtype=dtype)
+        self._rank = None
+        self._barrier = None
+        self._workers = []
+        self._connections = []
+        self._shared_blocks = []
+        for name in SHARED_FIELDS:
+            setattr(self, name, self._to_shared_memory(getattr(self, name)))
+        self.workspace.clear()
+        for _ in range(SHARED_SCRATCH_FIELDS):
+            self.workspace.adopt(self._to_shared_memory(gt_storage.zeros(self.storage_shape, dtype=self.dtype,
+                                                                         backend=self.backend)))
+        # Every stencil is built before forking, so that the workers never compile the same stencil at the same time
+        self.warm_up_stencils(names=list(self.stencil_handles))
+        self.tiles = split_tiles(self.shape, workers)
+        self._start_workers()
+
+    def _to_shared_memory(self, field: np.ndarray) -> np.ndarray:
+        """
+        Copies a storage in a shared memory block with the same strides, so that it keeps the layout of the backend
+        """
+        nbytes = sum((n - 1) * stride for n, stride in zip(field.shape, field.strides)) + field.itemsize
+        block = shared_memory.SharedMemory(create=True, size=nbytes)
+        self._shared_blocks.append(block)
+        shared = np.ndarray(field.shape, dtype=field.dtype, buffer=block.buf, strides=field.strides)
+        shared[...] = field
+        return shared
+
+    def _start_workers(self):
+        context = multiprocessing.get_context("fork")
+        barrier = context.Barrier(len(self.tiles))
+        for rank, tile in enumerate(self.tiles):
+            parent_connection, child_connection = context.Pipe()
+            worker = context.Process(target=_tile_worker, args=(self, rank, tile, barrier, child_connection), daemon=True)
+            worker.start()
+            child_connection.close()
+            self._workers.append(worker)
+            self._connections.append(parent_connection)
+        self._finalizer = weakref.finalize(self, _shutdown, self._workers, self._connections, self._shared_blocks)
+
+    def close(self):
+        """
+        Stops the worker processes and frees the shared memory, the Earth keeps working in a single process afterwards
+        :return:
+        """
+        for name in SHARED_FIELDS:
+            setattr(self, name, gt_storage.from_array(getattr(self, name), backend=self.backend))
+        self.workspace.clear()  # The scratch fields in shared memory
+        self._finalizer()
+        self._workers = []
+        self._connections = []
+
+    def _broadcast(self, name: str, *args) -> list:
+        """
+        Calls a method on every tile and waits for all of them
+        :return: the results of every worker, in rank order
+        """
+        for connection in self._connections:
+            connection.send((name, args))
+        results, touched, errors = [], set(), []
+        for connection in self._connections:
+            status, result, fields = connection.recv()
+            if status == "error":
+                errors.append(result)
+            results.append(result)
+            touched.update(fields)
+        if errors:
+            raise RuntimeError(f"A worker of the decomposed Earth failed:\n{errors[0]}")
+        self.touch(*sorted(touched))
+        return results
+
+    @property
+    def is_worker(self) -> bool:
+        return self._rank is not None
+
+    def exchange_halos(self, *field_names: str):
+        """
+        In a worker, waits for every tile to have written the fields and applies the boundary conditions on the global
+        halo once, then waits again so that no tile reads a halo being written
+        :param field_names: names of the fields
+        :return:
+        """
+        if not self.is_worker:
+            return super().exchange_halos(*field_names)
+        self._barrier.wait()
+        if self._rank == 0:
+            super().exchange_halos(*field_names)
+        self._barrier.wait()
+
+    def update(self):
+        if self.is_worker or not self._workers:
+            return super().update()
+        self._broadcast("_update_at", self._t)
+        self._t += 1
+
+    def configure_tick(self, name: str, **settings):
+        super().configure_tick(name, **settings)
+        if not self.is_worker and self._workers:
+            self._broadcast("_configure_tick", name, settings)
+
+    def _configure_tick(self, name: str, settings: dict):
+        """
+        Worker side of configure_tick, the workers have their own copy of the tick methods since they were forked
+        """
+        self.configure_tick(name, **settings)
+
+    def _update_at(self, t: int):
+        """
+        Worker side of update, the tick is the one of the main process so that the cadence of the methods is the same
+        on every tile, even after a restore
+        """
+        self._t = t
+        self.update()
+
+    def receive_radiation(self, energy: float):
+        if self.is_worker or not self._workers:
+            return super().receive_radiation(energy)
+        self.absorbed_energy += energy * (1 - self.albedo)  # The workers keep their own count
+        self._broadcast("receive_radiation", energy)
+
+    def load_fields(self, directory, fields: dict, zero_copy: bool = True):
+        # The workers only see the shared memory storages, so a checkpoint is always copied into them
+        super().load_fields(directory, fields, zero_copy=zero_copy and not self._workers)
+
+    @cached_diagnostic("water_energy", "water_mass", "air_energy", "air_mass", "land_energy", "land_mass")
+    def global_diagnostics(self) -> dict:
+        if self.is_worker or not self._workers:
+            return super().global_diagnostics()
+        partials = self._broadcast("partial_diagnostics")
+        diagnostics = self.finalize_diagnostics(tree_reduce(partials, self.reduction_engine.combine))
+        self.store_diagnostics(diagnostics)
+        return diagnostics
@@ -0,0 +1,120 @@
+import functools
+from typing import Optional
+
+import numpy as np
+
+from models.base_class.earth_base import cached_diagnostic
+from models.physical_class.earth import EARTH_DIAGNOSTICS
+from models.ticking_class.ticking_earth import TickingEarth
+
+
+class EnsembleEarth(TickingEarth):
+    """
+    `members` Earths of the same shape advanced together, e.g. the members of an ensemble forecast with perturbed initial
+    conditions.
+
+    The members are laid side by side along I, each with its own halo : member m owns the I cells
+    [m * (shape[0] + 2 * halo), (m + 1) * (shape[0] + 2 * halo)) of the storages. Seen from the stencils this is a single
+    grid of shape (members * (shape[0] + 2 * halo) - 2 * halo, shape[1], shape[2]) with the usual halo around it, so
+    one launch of every stencil of TickingEarth advances all the members at once. The halos between two members are
+    computed too, but they are overwritten by the boundary conditions of each member before anything reads them, so
+    the members never see each other.
+
+    `len` is the number of grid chunks of one member, so that every member receives the full radiation of the Sun.
+    The global diagnostics are the ones of the whole ensemble, `member_diagnostics` gives them per member, both from the
+    same sweep.
+    """
+
+    def __init__(self, shape: tuple, members: int, radius: float = 6.3781e6, *, parent=None, backend="numpy",
+                 diffusion_mode="staged", halo: int = 1, boundaries: tuple = ("periodic", "closed", "closed"),
+                 autotune: bool = False, universe=None, constants: Optional[dict] = None, dtype=np.float64,
+                 memory_mode: str = "full", component_masks: bool = False, warm_up: bool = False,
+                 warm_up_workers: Optional[int] = None):
+        """
+        :param shape: the number of grid chunks of one member in I, J and K, without the halo
+        :param members: the number of members
+        """
+        if members < 1:
+            raise ValueError(f"An ensemble needs at least one member, got {members}")
+        self.members = members
+        self.member_shape = tuple(shape)
+        self.member_width = shape[0] + 2 * halo  # Number of I cells of a member, halo included
+        ensemble_shape = (members * self.member_width - 2 * halo, shape[1], shape[2])
+        TickingEarth.__init__(self, ensemble_shape, radius, parent=parent, backend=backend, diffusion_mode=diffusion_mode,
+                              halo=halo, boundaries=boundaries, autotune=autotune, universe=universe, constants=constants,
+                              dtype=dtype, memory_mode=memory_mode,
+                              component_masks=component_masks, warm_up=warm_up, warm_up_workers=warm_up_workers)
+
+    def member_slices(self, member: int) -> tuple:
+        """
+        :return: the slices of the storages covering the grid chunks of a member, without its halo
+        """
+        if not 0 <= member < self.members:
+            raise IndexError(f"Member {member} out of range for an ensemble of {self.members} members")
+        start = member * self.member_width + self.halo
+        return (slice(start, start + self.member_shape[0]),) + \
+            tuple(slice(self.halo, self.halo + n) for n in self.member_shape[1:])
+
+    def member(self, field: np.ndarray, member: int) -> np.ndarray:
+        """
+        View on the grid chunks of a member of a field, without its halo
+        :param field: a field of the storage shape
+        :param member: the index of the member
+        :return: a view of the field of shape `member_shape`
+        """
+        return field[self.member_slices(member)]
+
+    def apply_boundaries(self, *fields: np.ndarray):
+        """
+        Fills the halo of every member according to the boundary conditions, as if it were alone
+        :param fields: fields of the storage shape
+        :return:
+        """
+        for field in fields:
+            for member in range(self.members):
+                self._apply_boundaries(field[member * self.member_width:(member + 1) * self.member_width],
+                                       self.member_shape)
+
+    def member_partial_diagnostics(self) -> list[dict]:
+        """
+        Computes the chunk temperature of all the members in one launch and returns the partial results of
+        EARTH_DIAGNOSTICS of every member
+        :return:
+        """
+        self._compute_chunk_temperature(self.water_energy, self.water_mass, self.air_energy, self.air_mass, self.land_energy, self.land_mass, self.chunk_temp,
+                                        origin=self.origin, domain=self.domain)
+        return [self.reduction_engine.partial({name: getattr(self, name)[self.member_slices(member)]
+                                               for name in ("water_energy", "water_mass", "air_energy", "air_mass",
+                                                            "land_energy", "land_mass", "chunk_temp")},
+                                              EARTH_DIAGNOSTICS)
+                for member in range(self.members)]
+
+    def partial_diagnostics(self) -> dict:
+        """
+        The partial results of the whole ensemble, leaving out the halos between the members
+        :return:
+        """
+        return functools.reduce(self.reduction_engine.combine, self.member_partial_diagnostics())
+
+    @cached_diagnostic("water_energy", "water_mass", "air_energy", "air_mass", "land_energy", "land_mass")
+    def member_diagnostics(self) -> list[dict]:
+        """
+        Computes the global diagnostics of every member, and the ones of the ensemble as a side product
+        :return: the diagnostics of every member, like Earth.global_diagnostics
+        """
+        partials = self.member_partial_diagnostics()
+        ensemble = self.finalize_diagnostics(functools.reduce(self.reduction_engine.combine, partials))
+        self.store_diagnostics(dict(ensemble, global_diagnostics=ensemble))
+        return [self.finalize_diagnostics(partial) for partial in partials]
+
+    def receive_radiation(self, energy: float):
+        super().receive_radiation(energy)
+        # Every member receives the whole radiation, and the diagnostics sum the energy of all the members
+        self.absorbed_energy += (self.members - 1) * energy * (1 - self.albedo)
+
+    def __len__(self):
+        """
+        The number of grid chunks of one member
+        :return:
+        """
+        return int(np.prod(self.member_shape))
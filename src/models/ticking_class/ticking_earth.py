@@ -1,11 +1,253 @@
 import math
+from typing import Optional
 
 from gt4py.cartesian import gtscript
-from gt4py.cartesian.gtscript import PARALLEL, BACKWARD, computation, interval, horizontal, region, I, J, K, IJ, IJK, Field
+from gt4py.cartesian.gtscript import PARALLEL, FORWARD, BACKWARD, computation, interval, horizontal, region, I, J, K, IJ, IJK, Field
 import gt4py.storage as gt_storage
+import numpy as np
 
 from models.ABC.ticking_model import TickingModel
-from models.physical_class.earth import Earth
+from models.physical_class.earth import Earth, Field3D, chunk_temperature, mixture_properties
+
+
+@gtscript.function
+def temp_coefficient(heat_transfer_coefficient: Field3D,
+                     specific_heat_capacity: Field3D,
+                     dt: float):
+    return heat_transfer_coefficient[0,0,0] * specific_heat_capacity[0,0,0] * dt
+
+
+@gtscript.function
+def inline_temp_coefficient(water_mass: Field3D,
+                            air_mass: Field3D,
+                            land_mass: Field3D,
+                            dt: float):
+    """
+    temp_coefficient computed from the masses instead of the stored derived fields. The same operations as
+    mixture_properties, written as one expression : the numpy backend allocates a field for every named intermediate
+    value, which would cost more memory per tick than the lean mode saves
+    """
+    from __externals__ import WATER_HEAT_TRANSFER_COEFFICIENT, AIR_HEAT_TRANSFER_COEFFICIENT, LAND_HEAT_TRANSFER_COEFFICIENT
+    from __externals__ import WATER_HEAT_CAPACITY, AIR_HEAT_CAPACITY, LAND_HEAT_CAPACITY
+    chunk_mass = water_mass[0, 0, 0] + air_mass[0, 0, 0] + land_mass[0, 0, 0]
+    return (water_mass[0, 0, 0] / chunk_mass * WATER_HEAT_TRANSFER_COEFFICIENT
+            + air_mass[0, 0, 0] / chunk_mass * AIR_HEAT_TRANSFER_COEFFICIENT
+            + land_mass[0, 0, 0] / chunk_mass * LAND_HEAT_TRANSFER_COEFFICIENT) * \
+        (water_mass[0, 0, 0] / chunk_mass * WATER_HEAT_CAPACITY
+         + air_mass[0, 0, 0] / chunk_mass * AIR_HEAT_CAPACITY
+         + land_mass[0, 0, 0] / chunk_mass * LAND_HEAT_CAPACITY) * dt
+
+
+def compute_energy_transfer(in_field: Field3D, energy: Field3D, heat_transfer_coefficient: Field3D, specific_heat_capacity: Field3D,
+                            dt: float):
+    """
+    compute the energy transfer between the grid chunk and its neighbors
+    :param grid_chunk:
+    :return:
+    """
+    with computation(PARALLEL), interval(...):
+        coeff = temp_coefficient(heat_transfer_coefficient, specific_heat_capacity, dt)
+        energy += (in_field[1, 0, 0] - in_field[0, 0, 0]) * coeff
+        energy += (in_field[-1, 0, 0] - in_field[0, 0, 0]) * coeff
+        energy += (in_field[0, 1, 0] - in_field[0, 0, 0]) * coeff
+        energy += (in_field[0, -1, 0] - in_field[0, 0, 0]) * coeff
+        energy += (in_field[0, 0, 1] - in_field[0, 0, 0]) * coeff
+        energy += (in_field[0, 0, -1] - in_field[0, 0, 0]) * coeff
+
+
+def fused_heat_diffusion(water_energy: Field3D,
+                         water_mass: Field3D,
+                         air_energy: Field3D,
+                         air_mass: Field3D,
+                         land_energy: Field3D,
+                         land_mass: Field3D,
+                         heat_transfer_coefficient: Field3D,
+                         specific_heat_capacity: Field3D,
+                         chunk_temp: Field3D,
+                         water_energy_out: Field3D,
+                         air_energy_out: Field3D,
+                         land_energy_out: Field3D,
+                         dt: float):
+    """
+    Single pass version of compute_chunk_temperature, compute_energy_transfer and add_energy.
+    The temperature of the chunk and of its neighbors is computed on the fly and the exchanged energy is directly spread
+    over the components. GT4Py forbids reading with an offset a field written by the same stencil, so the new energies
+    are written in a second set of fields
+    Must be called on the full K range of the storages, the K halo levels are only copied
+    :return:
+    """
+    from __externals__ import K_HALO
+    with computation(PARALLEL), interval(...):
+        temperature = chunk_temperature(water_energy=water_energy, water_mass=water_mass, air_energy=air_energy, air_mass=air_mass, land_energy=land_energy, land_mass=land_mass)
+        chunk_temp = temperature
+    with computation(PARALLEL):
+        with interval(0, K_HALO):
+            water_energy_out = water_energy
+            air_energy_out = air_energy
+            land_energy_out = land_energy
+        with interval(K_HALO, -K_HALO):
+            coeff = temp_coefficient(heat_transfer_coefficient, specific_heat_capacity, dt)
+            energy = (temperature[1, 0, 0] - temperature[0, 0, 0]) * coeff
+            energy += (temperature[-1, 0, 0] - temperature[0, 0, 0]) * coeff
+            energy += (temperature[0, 1, 0] - temperature[0, 0, 0]) * coeff
+            energy += (temperature[0, -1, 0] - temperature[0, 0, 0]) * coeff
+            energy += (temperature[0, 0, 1] - temperature[0, 0, 0]) * coeff
+            energy += (temperature[0, 0, -1] - temperature[0, 0, 0]) * coeff
+            chunk_mass = (water_mass[0, 0, 0] + air_mass[0, 0, 0] + land_mass[0, 0, 0])
+            water_energy_out = water_energy
+            air_energy_out = air_energy
+            land_energy_out = land_energy
+            if water_mass[0, 0, 0] != 0:
+                water_energy_out = water_energy + energy * (water_mass[0, 0, 0]/chunk_mass)
+            if air_mass[0, 0, 0] != 0:
+                air_energy_out = air_energy + energy * (air_mass[0, 0, 0]/chunk_mass)
+            if land_mass[0, 0, 0] != 0:
+                land_energy_out = land_energy + energy * (land_mass[0, 0, 0]/chunk_mass)
+        with interval(-K_HALO, None):
+            water_energy_out = water_energy
+            air_energy_out = air_energy
+            land_energy_out = land_energy
+
+
+def lean_heat_diffusion(chunk_temp: Field3D,
+                        water_energy: Field3D,
+                        water_mass: Field3D,
+                        air_energy: Field3D,
+                        air_mass: Field3D,
+                        land_energy: Field3D,
+                        land_mass: Field3D,
+                        dt: float):
+    """
+    compute_energy_transfer and add_energy in one pass for the lean memory mode : the exchange coefficient is computed
+    from the masses and the exchanged energy is spread over the components without going through a scratch field.
+    Only the chunk temperature is read with an offset, so the energies can be updated in place
+    :return:
+    """
+    with computation(PARALLEL), interval(...):
+        coeff = inline_temp_coefficient(water_mass, air_mass, land_mass, dt)
+        energy = (chunk_temp[1, 0, 0] - chunk_temp[0, 0, 0]) * coeff
+        energy += (chunk_temp[-1, 0, 0] - chunk_temp[0, 0, 0]) * coeff
+        energy += (chunk_temp[0, 1, 0] - chunk_temp[0, 0, 0]) * coeff
+        energy += (chunk_temp[0, -1, 0] - chunk_temp[0, 0, 0]) * coeff
+        energy += (chunk_temp[0, 0, 1] - chunk_temp[0, 0, 0]) * coeff
+        energy += (chunk_temp[0, 0, -1] - chunk_temp[0, 0, 0]) * coeff
+        chunk_mass = (water_mass[0, 0, 0] + air_mass[0, 0, 0] + land_mass[0, 0, 0])
+        if water_mass[0, 0, 0] != 0:
+            water_energy += energy * (water_mass[0, 0, 0] / chunk_mass)
+        if air_mass[0, 0, 0] != 0:
+            air_energy += energy * (air_mass[0, 0, 0] / chunk_mass)
+        if land_mass[0, 0, 0] != 0:
+            land_energy += energy * (land_mass[0, 0, 0] / chunk_mass)
+
+
+@gtscript.function
+def effective_heat_capacity(water_mass: Field3D,
+                            air_mass: Field3D,
+                            land_mass: Field3D):
+    """
+    Energy needed to raise the chunk temperature by one degree, when the energy is spread over the components in
+    proportion of their mass like add_energy does. The chunk temperature being the mean of the temperature of the
+    components present, it is linear in the energy added : dT = dE * sum(1 / C) / (n * chunk mass)
+    """
+    from __externals__ import WATER_HEAT_CAPACITY, AIR_HEAT_CAPACITY, LAND_HEAT_CAPACITY
+    nb_components = 0
+    inverse_capacity = 0.0
+    if water_mass[0, 0, 0] != 0:
+        inverse_capacity += 1.0 / WATER_HEAT_CAPACITY
+        nb_components += 1
+    if air_mass[0, 0, 0] != 0:
+        inverse_capacity += 1.0 / AIR_HEAT_CAPACITY
+        nb_components += 1
+    if land_mass[0, 0, 0] != 0:
+        inverse_capacity += 1.0 / LAND_HEAT_CAPACITY
+        nb_components += 1
+    return nb_components * (water_mass[0, 0, 0] + air_mass[0, 0, 0] + land_mass[0, 0, 0]) / inverse_capacity
+
+
+def implicit_k_heat_diffusion(water_energy: Field3D,
+                              water_mass: Field3D,
+                              air_energy: Field3D,
+                              air_mass: Field3D,
+                              land_energy: Field3D,
+                              land_mass: Field3D,
+                              chunk_temp: Field3D,
+                              dt: float):
+    """
+    Heat diffusion treating the exchanges along K implicitly (backward Euler) and the ones along I and J explicitly
+    like compute_energy_transfer. Every column solves the tridiagonal system
+        -a T'[k-1] + (1 + 2a) T'[k] - a T'[k+1] = T[k] + a * (exchanges with the I/J neighbors at T)
+    with the Thomas algorithm (forward elimination, back substitution), a being the exchange coefficient divided by the
+    effective heat capacity of the chunk. The K boundaries are closed : nothing is exchanged through the first and the
+    last levels. The energy matching T' - T is then spread over the components like add_energy.
+    The exchange coefficient is computed from the masses, so the stencil is the same in both memory modes.
+    The chunk temperature must be up to date, with its I/J halo. Needs at least 2 levels
+    :return:
+    """
+    with computation(PARALLEL), interval(...):
+        capacity = effective_heat_capacity(water_mass, air_mass, land_mass)
+        a = inline_temp_coefficient(water_mass, air_mass, land_mass, dt) / capacity
+        rhs = chunk_temp + a * (chunk_temp[1, 0, 0] + chunk_temp[-1, 0, 0] + chunk_temp[0, 1, 0] + chunk_temp[0, -1, 0]
+                                - 4.0 * chunk_temp[0, 0, 0])
+    with computation(FORWARD):
+        with interval(0, 1):
+            c_prime = -a / (1.0 + a)
+            d_prime = rhs / (1.0 + a)
+        with interval(1, -1):
+            denominator = 1.0 + 2.0 * a + a * c_prime[0, 0, -1]
+            c_prime = -a / denominator
+            d_prime = (rhs + a * d_prime[0, 0, -1]) / denominator
+        with interval(-1, None):
+            d_prime = (rhs + a * d_prime[0, 0, -1]) / (1.0 + a + a * c_prime[0, 0, -1])
+    with computation(BACKWARD):
+        with interval(-1, None):
+            new_temp = d_prime
+        with interval(0, -1):
+            new_temp = d_prime - c_prime * new_temp[0, 0, 1]
+    with computation(PARALLEL), interval(...):
+        energy = capacity * (new_temp - chunk_temp)
+        chunk_mass = (water_mass[0, 0, 0] + air_mass[0, 0, 0] + land_mass[0, 0, 0])
+        if water_mass[0, 0, 0] != 0:
+            water_energy += energy * (water_mass[0, 0, 0] / chunk_mass)
+        if air_mass[0, 0, 0] != 0:
+            air_energy += energy * (air_mass[0, 0, 0] / chunk_mass)
+        if land_mass[0, 0, 0] != 0:
+            land_energy += energy * (land_mass[0, 0, 0] / chunk_mass)
+
+
+def water_evaporation(water_mass: Field3D, air_mass: Field3D, land_mass: Field3D, chunk_mass: Field3D,
+                      heat_transfer_coefficient: Field3D, specific_heat_capacity: Field3D, dt: float):
+    """
+    Evaporate water from the water component of the grid chunk
+    The derived fields of the chunks are recomputed from the new masses in the same pass
+    :param grid_chunk:
+    :return:
+    """
+    from __externals__ import EVAPORATION_RATE
+    with computation(PARALLEL), interval(...):
+        evaporated_mass = EVAPORATION_RATE * dt * water_mass
+        water_mass -= evaporated_mass
+        air_mass += evaporated_mass
+        chunk_mass, heat_transfer_coefficient, specific_heat_capacity = mixture_properties(water_mass, air_mass, land_mass)
+
+
+def lean_water_evaporation(water_mass: Field3D, air_mass: Field3D, dt: float):
+    """
+    water_evaporation for the lean memory mode, where there are no derived fields to update
+    """
+    from __externals__ import EVAPORATION_RATE
+    with computation(PARALLEL), interval(...):
+        evaporated_mass = EVAPORATION_RATE * dt * water_mass
+        water_mass -= evaporated_mass
+        air_mass += evaporated_mass
+
+
+def carbon_cycle(carbon_ppm: Field3D, carbon_per_chunk: float):
+    """
+    Globally computes carbon flow to be applied to each grid chunk
+    :return:
+    """
+    with computation(PARALLEL), interval(...):
+        carbon_ppm += carbon_per_chunk
 
 
 class TickingEarth(Earth, TickingModel):
@@ -14,58 +256,57 @@ class TickingEarth(Earth, TickingModel):
     Contains only and all the rules for the model update.
 
     /!\ Those methods for update must be marked with @TickingModel.on_tick(enabled=True)
+
+    The heat diffusion of update_temperature can run in three modes :
+        - "staged" : chunk temperature, energy transfer and energy distribution as three stencils
+        - "fused" : a single stencil doing the three steps in one pass, writing the energies in a second set of fields.
+          It has not been measured faster than staged, see benchmarks/diffusion_modes.py
+        - "implicit_k" : the exchanges along K are implicit (a tridiagonal solve per column), the ones along I and J
+          stay explicit. It only applies to grids with closed K boundaries (the solve does not wrap around the column)
+          and at least 2 levels, the constructor raises a ValueError otherwise
+
+    The explicit modes are stable as long as every chunk exchanges less than its own temperature difference in a step,
+    see `stable_time_delta`. The implicit_k mode is only limited by the 4 I/J neighbors instead of the 6 neighbors.
+
+    In the lean memory mode (see EarthBase) the staged diffusion exchanges the energy with `lean_heat_diffusion`, whose
+    only scratch storage is the chunk temperature, and the carbon concentration is a single value. The fused mode keeps
+    a second set of energy fields, so it is not available in lean mode.
     """
-    def __init__(self, shape: tuple, radius: float = 6.3781e6, *, parent=None, backend="numpy"):
-        Earth.__init__(self, shape, radius, parent=parent, backend=backend)
-        TickingModel.__init__(self)
-        self.time_delta = self.get_universe().TIME_DELTA
+    DIFFUSION_MODES = ("staged", "fused", "implicit_k")
+
+    def __init__(self, shape: tuple, radius: float = 6.3781e6, *, parent=None, backend="numpy", diffusion_mode="staged",
+                 halo: int = 1, boundaries: tuple = ("periodic", "closed", "closed"), autotune: bool = False,
+                 universe=None, constants: Optional[dict] = None, dtype=np.float64, memory_mode: str = "full",
+                 component_masks: bool = False, warm_up: bool = False, warm_up_workers: Optional[int] = None):
+        # The stencils of this layer are not created yet when Earth.__init__ returns, the warm-up is done at the end
+        Earth.__init__(self, shape, radius, parent=parent, backend=backend, halo=halo, boundaries=boundaries,
+                       autotune=autotune, universe=universe, constants=constants, dtype=dtype, memory_mode=memory_mode,
+                       component_masks=component_masks)
+        TickingModel.__init__(self, self.get_universe().TIME_DELTA)
         self.evaporation_rate = self.get_universe().EVAPORATION_RATE
+        if diffusion_mode not in self.DIFFUSION_MODES:
+            raise ValueError(f"Unknown diffusion mode {diffusion_mode}, expected one of {self.DIFFUSION_MODES}")
+        if diffusion_mode == "implicit_k" and (self.boundaries[2] != "closed" or self.shape[2] < 2):
+            raise ValueError("The implicit_k diffusion mode needs closed K boundaries and at least 2 levels")
+        if diffusion_mode == "fused" and self.lean:
+            raise ValueError("The fused diffusion mode double buffers the energies, it cannot be used in lean memory mode")
+        self.diffusion_mode = diffusion_mode
+        self._next_energies = None
 
-        @gtscript.function
-        def temp_coefficient(heat_transfer_coefficient: gtscript.Field[float],
-                             specific_heat_capacity: gtscript.Field[float]):
-            return heat_transfer_coefficient[0,0,0] * specific_heat_capacity[0,0,0] * self.time_delta
-        
+        self.externals = dict(self.externals, EVAPORATION_RATE=self.evaporation_rate, K_HALO=self.halo)
 
-        def compute_energy_transfer(in_field: gtscript.Field[float], energy: gtscript.Field[float], heat_transfer_coefficient: gtscript.Field[float], specific_heat_capacity: gtscript.Field[float]):
-            """
-            compute the energy transfer between the grid chunk and its neighbors
-            :param grid_chunk:
-            :return:
-            """
-            with computation(PARALLEL), interval(...):
-                coeff = temp_coefficient(heat_transfer_coefficient, specific_heat_capacity)
-                energy += (in_field[1, 0, 0] - in_field[0, 0, 0]) * coeff
-                energy += (in_field[-1, 0, 0] - in_field[0, 0, 0]) * coeff
-                energy += (in_field[0, 1, 0] - in_field[0, 0, 0]) * coeff
-                energy += (in_field[0, -1, 0] - in_field[0, 0, 0]) * coeff
-                energy += (in_field[0, 0, 1] - in_field[0, 0, 0]) * coeff
-                energy += (in_field[0, 0, -1] - in_field[0, 0, 0]) * coeff
-
-
-        def water_evaporation(water_mass: gtscript.Field[float], air_mass: gtscript.Field[float]):
-            """
-            Evaporate water from the water component of the grid chunk
-            :param grid_chunk:
-            :return:
-            """
-            with computation(PARALLEL), interval(...):
-                evaporated_mass = self.evaporation_rate * self.time_delta * water_mass
-                water_mass -= evaporated_mass
-                air_mass += evaporated_mass
-
-        def carbon_cycle(carbon_ppm: gtscript.Field[float], carbon_per_chunk: float):
-            """
-            Globally computes carbon flow to be applied to each grid chunk
-            :return:
-            """
-            with computation(PARALLEL), interval(...):
-                carbon_ppm += carbon_per_chunk
-
-
-        self._water_evaporation = gtscript.stencil(definition=water_evaporation, backend=self.backend)
-        self._compute_energy_transfer = gtscript.stencil(definition=compute_energy_transfer, backend=self.backend)
-        self._carbon_cycle = gtscript.stencil(definition=carbon_cycle, backend=self.backend)
+        if self.lean:
+            self._lean_water_evaporation = self.get_stencil(lean_water_evaporation)
+            self._lean_heat_diffusion = self.get_stencil(lean_heat_diffusion)
+        else:
+            self._water_evaporation = self.get_stencil(water_evaporation)
+            self._compute_energy_transfer = self.get_stencil(compute_energy_transfer)
+            self._fused_heat_diffusion = self.get_stencil(fused_heat_diffusion)
+            self._carbon_cycle = self.get_stencil(carbon_cycle)
+        self._implicit_k_heat_diffusion = self.get_stencil(implicit_k_heat_diffusion)
+        self.warm_up_workers = warm_up_workers
+        if warm_up:
+            self.warm_up_at_construction()
 
     def update(self):
         """
@@ -74,6 +315,8 @@ class TickingEarth(Earth, TickingModel):
         -------
 
         """
+        if self.variants_warm_up_pending:
+            self.warm_up_stencils(workers=self.warm_up_workers)
         super().update()
 
     @TickingModel.on_tick(enabled=True)
@@ -82,19 +325,117 @@ class TickingEarth(Earth, TickingModel):
         Update the temperature of each grid chunk
         :return:
         """
-        self._compute_chunk_temperature(self.water_energy, self.water_mass, self.air_energy, self.air_mass, self.land_energy, self.land_mass, self.chunk_temp)
-        temp_energy = gt_storage.zeros(self.shape, dtype=float, backend=self.backend)
-        self._compute_energy_transfer(self.chunk_temp, temp_energy, self.heat_transfer_coefficient, self.specific_heat_capacity, origin=self.origin)
-        self._add_energy(temp_energy, self.water_energy, self.water_mass, self.air_energy, self.air_mass, self.land_energy, self.land_mass)
+        self.refresh_derived_fields("heat_transfer_coefficient", "specific_heat_capacity")
+        if self.diffusion_mode == "fused":
+            self._fused_update_temperature()
+            return
+        self._compute_chunk_temperature(self.water_energy, self.water_mass, self.air_energy, self.air_mass, self.land_energy, self.land_mass, self.chunk_temp,
+                                        origin=self.origin, domain=self.domain)
+        self.exchange_halos("chunk_temp")
+        if self.diffusion_mode == "implicit_k":
+            self._implicit_k_heat_diffusion(self.water_energy, self.water_mass, self.air_energy, self.air_mass, self.land_energy, self.land_mass,
+                                            self.chunk_temp, self.dt, origin=self.origin, domain=self.domain)
+            self.touch("water_energy", "air_energy", "land_energy")
+            return
+        if self.lean:
+            self._lean_heat_diffusion(self.chunk_temp, self.water_energy, self.water_mass, self.air_energy, self.air_mass,
+                                      self.land_energy, self.land_mass, self.dt, origin=self.origin, domain=self.domain)
+            self.touch("water_energy", "air_energy", "land_energy")
+            return
+        with self.workspace.scratch() as temp_energy:
+            temp_energy[self.compute_slices] = 0  # Only the compute domain is read, a DecomposedEarth shares the field
+            self._compute_energy_transfer(self.chunk_temp, temp_energy, self.heat_transfer_coefficient, self.specific_heat_capacity, self.dt,
+                                          origin=self.origin, domain=self.domain)
+            self._add_energy(temp_energy, self.water_energy, self.water_mass, self.air_energy, self.air_mass, self.land_energy, self.land_mass,
+                             origin=self.origin, domain=self.domain)
+        self.touch("water_energy", "air_energy", "land_energy")
 
 
+    def required_definitions(self) -> set[str]:
+        """
+        The definitions of Earth plus the ones of the enabled tick methods, for the current diffusion and memory modes
+        """
+        names = super().required_definitions()
+        enabled = {name for name, method in self.tick_methods.items() if method.enabled}
+        if "update_temperature" in enabled:
+            if self.diffusion_mode == "fused":
+                names.add("fused_heat_diffusion")
+            elif self.diffusion_mode == "implicit_k":
+                names.add("implicit_k_heat_diffusion")
+            elif self.lean:
+                names.add("lean_heat_diffusion")
+            else:
+                names.update(("compute_energy_transfer", "add_energy"))
+        if "water_evaporation" in enabled:
+            names.add("lean_water_evaporation" if self.lean else "water_evaporation")
+        if "carbon_cycle" in enabled and not self.lean:
+            names.add("carbon_cycle")
+        return names
+
+    def stable_time_delta(self, safety: float = 1.0) -> float:
+        """
+        Largest time step for which the heat diffusion of the current diffusion mode stays stable and monotonic : in a
+        step, the explicit exchanges of a chunk must not exceed its temperature difference with its neighbors, i.e.
+        dt * heat_transfer_coefficient * specific_heat_capacity / effective heat capacity <= 1 / (explicit neighbors),
+        with 6 neighbors for the explicit modes and 4 for implicit_k.
+        Depends on the composition of the chunks, to estimate again when the masses change a lot
+        :param safety: factor applied to the limit, below 1 to keep a margin
+        :return: the time step, to give to the Universe (Universe(time_delta=...))
+        """
+        masses = [self.interior(getattr(self, name)) for name in ("water_mass", "air_mass", "land_mass")]
+        capacities = [self.externals[name] for name in ("WATER_HEAT_CAPACITY", "AIR_HEAT_CAPACITY", "LAND_HEAT_CAPACITY")]
+        nb_components = sum((mass != 0).astype(float) for mass in masses)
+        inverse_capacity = sum((mass != 0) / capacity for mass, capacity in zip(masses, capacities))
+        capacity = nb_components * sum(masses) / inverse_capacity
+        if self.lean:
+            ratios = [mass / sum(masses) for mass in masses]
+            coefficients = [self.externals[name] for name in ("WATER_HEAT_TRANSFER_COEFFICIENT", "AIR_HEAT_TRANSFER_COEFFICIENT",
+                                                              "LAND_HEAT_TRANSFER_COEFFICIENT")]
+            heat_transfer_coefficient = sum(ratio * coefficient for ratio, coefficient in zip(ratios, coefficients))
+            specific_heat_capacity = sum(ratio * heat_capacity for ratio, heat_capacity in zip(ratios, capacities))
+        else:
+            heat_transfer_coefficient = self.interior(self.heat_transfer_coefficient)
+            specific_heat_capacity = self.interior(self.specific_heat_capacity)
+        rate = heat_transfer_coefficient * specific_heat_capacity / capacity
+        neighbors = 4 if self.diffusion_mode == "implicit_k" else 6
+        return safety / (neighbors * float(np.max(rate)))
+
+    def extra_storages(self) -> list:
+        return list(self._next_energies or ())
+
+    def _fused_update_temperature(self):
+        """
+        One stencil launch version of update_temperature, then swap the current and next energy fields
+        :return:
+        """
+        if self._next_energies is None:
+            self._next_energies = tuple(gt_storage.zeros(self.storage_shape, dtype=self.dtype, backend=self.backend) for _ in range(3))
+        water_energy_out, air_energy_out, land_energy_out = self._next_energies
+        # The temperature of the neighbors is computed from the energies in the halo
+        self.exchange_halos("water_energy", "air_energy", "land_energy")
+        self._fused_heat_diffusion(self.water_energy, self.water_mass, self.air_energy, self.air_mass, self.land_energy, self.land_mass,
+                                   self.heat_transfer_coefficient, self.specific_heat_capacity, self.chunk_temp,
+                                   water_energy_out, air_energy_out, land_energy_out, self.dt,
+                                   origin=(self.origin[0], self.origin[1], 0),
+                                   domain=(self.domain[0], self.domain[1], self.storage_shape[2]))
+        self._next_energies = (self.water_energy, self.air_energy, self.land_energy)
+        self.water_energy, self.air_energy, self.land_energy = water_energy_out, air_energy_out, land_energy_out
+        self.touch("water_energy", "air_energy", "land_energy")
+
     @TickingModel.on_tick(enabled=False)
     def water_evaporation(self):
         """
         Evaporate water from the water component of the grid chunk
         :return:
         """
-        self._water_evaporation(self.water_mass, self.air_mass)
+        if self.lean:
+            self._lean_water_evaporation(self.water_mass, self.air_mass, self.dt, origin=self.origin, domain=self.domain)
+        else:
+            self._water_evaporation(self.water_mass, self.air_mass, self.land_mass, self.chunk_mass, self.heat_transfer_coefficient,
+                                    self.specific_heat_capacity, self.dt, origin=self.origin, domain=self.domain)
+        self.exchange_halos("water_mass", "air_mass")
+        self.touch("water_mass", "air_mass")
+        self.mark_derived_fields(*self.DERIVED_FIELDS)
 
         
 
@@ -105,4 +446,9 @@ class TickingEarth(Earth, TickingModel):
         :return:
         """
         carbon_per_chunk = (self.CARBON_EMISSIONS_PER_TIME_DELTA - self.carbon_flux_to_ocean + self.land_carbon_decay - self.biosphere_carbon_absorption) / len(self)
-        self._carbon_cycle(self.carbon_ppm, carbon_per_chunk)
+        carbon_per_chunk *= self.dt / self.time_delta  # The flows are given per TIME_DELTA
+        if self.lean:
+            self.carbon_ppm += carbon_per_chunk  # The same in every chunk, held as a single value
+        else:
+            self._carbon_cycle(self.carbon_ppm, carbon_per_chunk, origin=self.origin, domain=self.domain)
+        self.touch("carbon_ppm")
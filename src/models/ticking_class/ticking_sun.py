@@ -9,9 +9,9 @@ class TickingSun(Sun, TickingModel):
 
     /!\ Those methods for update must be marked with @TickingModel.on_tick(enabled=True)
     """
-    def __init__(self):
-        Sun.__init__(self)
-        TickingModel.__init__(self)
+    def __init__(self, *, universe=None):
+        Sun.__init__(self, universe=universe)
+        TickingModel.__init__(self, self.get_universe().TIME_DELTA)
 
     @TickingModel.on_tick(enabled=True)
     def radiate_energy_outwards(self):
@@ -23,5 +23,5 @@ class TickingSun(Sun, TickingModel):
             Radiate that energy outward in the universe
         :return:
         """
-        energy_per_time_delta = self.energy_radiated_per_second * self.get_universe().TIME_DELTA
+        energy_per_time_delta = self.energy_radiated_per_second * self.dt
         self.get_universe().radiate_inside(energy_per_time_delta, source=self)
@@ -0,0 +1,190 @@
+import json
+import time
+import warnings
+from pathlib import Path
+from typing import Callable, Optional
+
+import numpy as np
+
+
+# Scalar global diagnostics of the Earth (see EARTH_DIAGNOSTICS) plus the carbon concentration and the radiation absorbed
+SERIES = ("average_temperature", "min_temperature", "max_temperature", "mass_weighted_temperature", "total_energy",
+          "total_mass", "water_composition", "air_composition", "land_composition", "carbon_ppm", "absorbed_energy")
+DEFAULT_SERIES = ("average_temperature", "total_energy", "total_mass", "water_composition", "air_composition",
+                  "land_composition", "carbon_ppm", "absorbed_energy")
+
+
+def read_series(path: str) -> dict[str, np.ndarray]:
+    """
+    Reads back the series written by a DiagnosticsRecorder
+    :param path: the .bin file of the recorder, its column index is the .json file next to it
+    :return: "tick" and every series name -> the values of every sample
+    """
+    path = Path(path)
+    with open(path.with_suffix(".json")) as file:
+        columns = json.load(file)["columns"]
+    rows = np.fromfile(path, dtype=np.float64).reshape(-1, len(columns))
+    return {name: rows[:, index] for index, name in enumerate(columns)}
+
+
+class DiagnosticsRecorder:
+    """
+    Records time series of global diagnostics of the Earth while the simulation runs.
+
+    Attached to the Universe, it samples the series every `every` ticks into a preallocated ring buffer of `capacity`
+    samples : one row per sample, the tick followed by the value of every series, in float64. All the series of a
+    sample come from a single `global_diagnostics` sweep (which is a cache hit if something else already asked for it
+    at that tick), so a sample costs one fused reduction whatever the number of series.
+
+    Without a path, the buffer keeps the last `capacity` samples. With a path, the samples are appended to a raw
+    float64 file in bulk whenever the buffer is full (and by `flush`), so nothing is lost and the disk is only touched
+    once every `capacity` samples. `read_series` reads the file back.
+
+    Checks (e.g. EnergyDriftAlarm) are called with every sample.
+    """
+
+    def __init__(self, series: tuple = DEFAULT_SERIES, every: int = 1, capacity: int = 1024, path: Optional[str] = None):
+        """
+        :param series: the names of the series to record, from SERIES
+        :param every: a sample is taken every `every` ticks
+        :param capacity: the number of samples the ring buffer holds
+        :param path: the .bin file the samples are flushed to, None to only keep them in the ring buffer
+        """
+        unknown = set(series) - set(SERIES)
+        if unknown:
+            raise ValueError(f"Unknown series {sorted(unknown)}, expected names from {SERIES}")
+        if every < 1:
+            raise ValueError(f"The cadence of the recorder must be at least 1 tick, got {every}")
+        if capacity < 1:
+            raise ValueError(f"The recorder needs room for at least one sample, got {capacity}")
+        self.series = tuple(series)
+        self.columns = ("tick",) + self.series
+        self.every = every
+        self.capacity = capacity
+        self.path = Path(path) if path is not None else None
+        self.buffer = np.full((capacity, len(self.columns)), np.nan)
+        self.checks = []
+        self.samples = 0  # Samples taken since the start
+        self._flushed = 0  # Samples written to the file
+        self.sample_time = 0.0
+        self.flush_time = 0.0
+        if self.path is not None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self.path.write_bytes(b"")
+            with open(self.path.with_suffix(".json"), "w") as file:
+                json.dump({"columns": list(self.columns), "every": every}, file, indent=2)
+
+    def add_check(self, check: Callable[[int, dict], None]):
+        """
+        Adds a function called with the tick and the values of every sample
+        :param check: e.g. an EnergyDriftAlarm, its REQUIRED_SERIES must be recorded
+        :return:
+        """
+        missing = set(getattr(check, "REQUIRED_SERIES", ())) - set(self.series)
+        if missing:
+            raise ValueError(f"The check needs the series {sorted(missing)}, which are not recorded")
+        self.checks.append(check)
+
+    def attach(self, universe):
+        universe.add_observer(self)
+
+    def detach(self, universe):
+        universe.remove_observer(self)
+        self.flush()
+
+    def __call__(self, universe):
+        tick = universe.get_time()
+        if tick % self.every == 0:
+            self.sample(universe.earth, tick)
+
+    def sample(self, earth, tick: int) -> dict:
+        """
+        Records the series of the Earth at that tick
+        :param earth: the Earth the diagnostics are computed on
+        :param tick: the current tick
+        :return: series name -> value
+        """
+        start = time.perf_counter()
+        diagnostics = earth.global_diagnostics()
+        values = {name: diagnostics.get(name) for name in self.series}
+        if "carbon_ppm" in values:
+            values["carbon_ppm"] = earth.carbon_concentration
+        if "absorbed_energy" in values:
+            values["absorbed_energy"] = earth.absorbed_energy
+        if self.path is not None and self.samples - self._flushed == self.capacity:
+            self.flush()
+        row = self.buffer[self.samples % self.capacity]
+        row[0] = tick
+        row[1:] = [values[name] for name in self.series]
+        self.samples += 1
+        self.sample_time += time.perf_counter() - start
+        for check in self.checks:
+            check(tick, values)
+        return values
+
+    def to_dict(self) -> dict[str, np.ndarray]:
+        """
+        The samples still in the ring buffer, oldest first
+        :return: "tick" and every series name -> values
+        """
+        count = min(self.samples, self.capacity)
+        order = np.arange(self.samples - count, self.samples) % self.capacity
+        rows = self.buffer[order]
+        return {name: rows[:, index] for index, name in enumerate(self.columns)}
+
+    def flush(self):
+        """
+        Appends the samples not written yet to the file, in one write
+        :return:
+        """
+        if self.path is None or self._flushed == self.samples:
+            return
+        start = time.perf_counter()
+        order = np.arange(self._flushed, self.samples) % self.capacity
+        with open(self.path, "ab") as file:
+            self.buffer[order].tofile(file)
+        self._flushed = self.samples
+        self.flush_time += time.perf_counter() - start
+
+    def report(self) -> str:
+        res = f"Diagnostics recorder : \n" \
+              f"- {self.samples} samples of {len(self.series)} series, every {self.every} ticks\n" \
+              f"- Time spent sampling: {self.sample_time:.3f} s, flushing: {self.flush_time:.3f} s"
+        return res
+
+
+class EnergyDriftAlarm:
+    """
+    Energy conservation check of a DiagnosticsRecorder. The only source of energy of the Earth is the radiation it
+    absorbs (the exchanges between the chunks move energy without creating any), so the total energy minus the absorbed
+    radiation must stay at its value of the first sample. The relative drift of that budget is checked at every sample
+    """
+    REQUIRED_SERIES = ("total_energy", "absorbed_energy")
+
+    def __init__(self, tolerance: float = 1e-6, action: str = "warn"):
+        """
+        :param tolerance: the largest relative drift allowed
+        :param action: "warn" to emit a RuntimeWarning, "raise" to raise a RuntimeError when the drift is too large
+        """
+        if action not in ("warn", "raise"):
+            raise ValueError(f"Unknown action {action}, expected 'warn' or 'raise'")
+        self.tolerance = tolerance
+        self.action = action
+        self.reference = None
+        self.drift = 0.0
+        self.max_drift = 0.0
+        self.alarms = 0
+
+    def __call__(self, tick: int, values: dict):
+        budget = values["total_energy"] - values["absorbed_energy"]
+        if self.reference is None:
+            self.reference = budget
+            return
+        self.drift = (budget - self.reference) / abs(self.reference)
+        self.max_drift = max(self.max_drift, abs(self.drift))
+        if abs(self.drift) > self.tolerance:
+            self.alarms += 1
+            message = f"Energy drift of {self.drift:.3e} at tick {tick}, above the tolerance of {self.tolerance:.1e}"
+            if self.action == "raise":
+                raise RuntimeError(message)
+            warnings.warn(message, RuntimeWarning)
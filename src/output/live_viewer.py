@@ -0,0 +1,210 @@
+import multiprocessing
+from multiprocessing import shared_memory
+from typing import Optional
+
+import numpy as np
+
+
+class FrameRing:
+    """
+    Ring buffer of 2D frames in shared memory, written by one process and read by others without any lock.
+
+    Every slot is protected by a sequence number (a seqlock) : the writer makes it odd before copying a frame in the
+    slot and even again afterwards. A reader copies the latest slot and keeps the copy only if the sequence number was
+    even and did not change meanwhile, else the frame was being overwritten and the reader simply tries the newest one
+    again. The writer never waits for the readers, a reader that is too slow only misses frames.
+    """
+    HEADER = 3  # Number of frames published, closed flag, number of slots
+    ALIGNMENT = 64
+
+    def __init__(self, shape: tuple, slots: int = 4, dtype=np.float64, name: Optional[str] = None):
+        """
+        :param shape: shape of a frame
+        :param slots: number of frames kept
+        :param dtype: dtype of the frames
+        :param name: name of an existing ring to attach to, a new one is created if None
+        """
+        self.shape = tuple(shape)
+        self.slots = slots
+        self.dtype = np.dtype(dtype)
+        header_bytes = 8 * (self.HEADER + 2 * slots)
+        self._frames_offset = -(-header_bytes // self.ALIGNMENT) * self.ALIGNMENT
+        frame_bytes = int(np.prod(self.shape)) * self.dtype.itemsize
+        self._frame_stride = -(-frame_bytes // self.ALIGNMENT) * self.ALIGNMENT
+        self.owner = name is None
+        if self.owner:
+            self.block = shared_memory.SharedMemory(create=True, size=self._frames_offset + slots * self._frame_stride)
+        else:
+            self.block = shared_memory.SharedMemory(name=name)
+        self.name = self.block.name
+        self._header = np.ndarray(self.HEADER + 2 * slots, dtype=np.int64, buffer=self.block.buf)
+        self._sequences = self._header[self.HEADER:self.HEADER + slots]
+        self._ticks = self._header[self.HEADER + slots:]
+        self._frames = [np.ndarray(self.shape, dtype=self.dtype, buffer=self.block.buf,
+                                   offset=self._frames_offset + slot * self._frame_stride) for slot in range(slots)]
+        if self.owner:
+            self._header[...] = 0
+            self._header[2] = slots
+
+    @property
+    def published(self) -> int:
+        return int(self._header[0])
+
+    @property
+    def closed(self) -> bool:
+        return bool(self._header[1])
+
+    def publish(self, frame: np.ndarray, tick: int):
+        """
+        Copies a frame in the oldest slot, never blocks
+        :param frame: array of the frame shape
+        :param tick: the tick of the frame
+        :return:
+        """
+        slot = self.published % self.slots
+        self._sequences[slot] += 1  # Odd : being written
+        np.copyto(self._frames[slot], frame)
+        self._ticks[slot] = tick
+        self._sequences[slot] += 1  # Even : consistent
+        self._header[0] += 1
+
+    def latest(self, out: np.ndarray, retries: int = 3) -> Optional[int]:
+        """
+        Copies the newest consistent frame in `out`
+        :param out: array of the frame shape
+        :param retries: number of times the newest frame is tried again when it was overwritten while being read
+        :return: the tick of the frame, None if there is no frame yet or none could be read
+        """
+        for _ in range(retries):
+            published = self.published
+            if published == 0:
+                return None
+            slot = (published - 1) % self.slots
+            sequence = int(self._sequences[slot])
+            if sequence % 2:
+                continue
+            np.copyto(out, self._frames[slot])
+            tick = int(self._ticks[slot])
+            if int(self._sequences[slot]) == sequence:
+                return tick
+        return None
+
+    def close(self):
+        """
+        Marks the ring as closed for the readers (by its owner) and detaches from the shared memory
+        :return:
+        """
+        if self.owner:
+            self._header[1] = 1
+        self._header = self._sequences = self._ticks = None  # Views on the block must be gone before closing it
+        self._frames = []
+        self.block.close()
+        if self.owner:
+            self.block.unlink()
+
+
+def _viewer_main(ring_name: str, shape: tuple, slots: int, title: str, frame_rate: float, keep_open: bool):
+    """
+    Main loop of the viewer process : redraws the newest frame of the ring at most `frame_rate` times per second until
+    the simulation closes the ring or the window is closed
+    """
+    import matplotlib.pyplot as plt
+    from matplotlib.colors import Normalize
+
+    try:
+        ring = FrameRing(shape, slots, name=ring_name)
+    except FileNotFoundError:  # The simulation was already over
+        return
+    frame = np.zeros(shape)
+    fig, ax = plt.subplots()
+    cax = ax.matshow(frame, cmap='coolwarm')
+    fig.colorbar(cax)
+    plt.ion()
+    plt.show()
+    last_tick = None
+    while plt.fignum_exists(fig.number):
+        closed = ring.closed
+        tick = ring.latest(frame)
+        if tick is not None and tick != last_tick:
+            last_tick = tick
+            cax.set_norm(Normalize(vmin=np.min(frame), vmax=np.max(frame)))
+            cax.set_array(frame)
+            ax.set_title(f"{title} - tick {tick}")
+            fig.canvas.draw_idle()
+        if closed:  # The last frame has been drawn
+            break
+        plt.pause(1 / frame_rate)
+    ring.close()
+    if keep_open and plt.fignum_exists(fig.number):
+        plt.ioff()
+        plt.show()
+    plt.close(fig)
+
+
+class LiveViewer:
+    """
+    Shows a 2D slice of an Earth field in a separate process while the simulation runs.
+
+    Attached to the Universe, it publishes the slice in a shared memory ring buffer (see FrameRing) after every
+    `every` update : the simulation only pays for one copy of the slice. The viewer process redraws the newest frame
+    at its own frame rate and skips the frames it had no time to draw, so it never slows the simulation down.
+    """
+
+    def __init__(self, earth, field: str = "chunk_temp", slices: tuple = (slice(None), slice(None), 20), every: int = 1,
+                 frame_rate: float = 10.0, slots: int = 4, keep_open: bool = False):
+        """
+        :param earth: the Earth the field belongs to
+        :param field: name of the field of the Earth
+        :param slices: the 2D slice to show, indexing the grid without its halo
+        :param every: a frame is published every `every` ticks
+        :param frame_rate: maximum number of redraws per second of the viewer
+        :param slots: number of frames of the ring buffer
+        :param keep_open: if True, the window stays open on the last frame after the simulation, until it is closed
+        """
+        self.field = field
+        self.slices = slices
+        self.every = every
+        self.frame_rate = frame_rate
+        self.keep_open = keep_open
+        shape = earth.interior(getattr(earth, field))[slices].shape
+        if len(shape) != 2:
+            raise ValueError(f"The live viewer shows 2D slices, the slice of {field} has the shape {shape}")
+        self.ring = FrameRing(shape, slots)
+        self._process = None
+
+    def start(self):
+        if self._process is None:
+            context = multiprocessing.get_context("spawn")  # A fresh interpreter for the GUI
+            self._process = context.Process(target=_viewer_main, daemon=True,
+                                            args=(self.ring.name, self.ring.shape, self.ring.slots, self.field, self.frame_rate,
+                                                  self.keep_open))
+            self._process.start()
+
+    def attach(self, universe):
+        """
+        Starts the viewer process and publishes a frame after every `every` updates of the universe
+        :param universe:
+        :return:
+        """
+        self.start()
+        universe.add_observer(self)
+        self.publish(universe.earth, universe.get_time())
+
+    def detach(self, universe):
+        """
+        Stops publishing frames and closes the viewer, or waits for its window to be closed if it is kept open
+        :param universe:
+        :return:
+        """
+        universe.remove_observer(self)
+        self.ring.close()
+        if self._process is not None:
+            self._process.join(timeout=None if self.keep_open else 5)
+            self._process = None
+
+    def __call__(self, universe):
+        if universe.get_time() % self.every == 0:
+            self.publish(universe.earth, universe.get_time())
+
+    def publish(self, earth, tick: int):
+        self.ring.publish(earth.interior(getattr(earth, self.field))[self.slices], tick)
@@ -0,0 +1,212 @@
+import json
+import queue
+import threading
+import time
+import zipfile
+from pathlib import Path
+
+import numpy as np
+
+
+def write_chunked_npz(path: Path, array: np.ndarray, chunk_cells: int, compression_level: int):
+    """
+    Writes an array in a compressed .npz file, split along its first axis in chunks of about `chunk_cells` values so
+    that a part of it can be read without decompressing everything
+    :param path: the file to write
+    :param array: the array
+    :param chunk_cells: approximate number of values per chunk
+    :param compression_level: the zlib level, from 1 (fastest) to 9 (smallest)
+    :return:
+    """
+    rows = max(1, chunk_cells // max(1, int(np.prod(array.shape[1:]))))
+    temporary_path = path.with_suffix(".tmp")
+    with zipfile.ZipFile(temporary_path, "w", compression=zipfile.ZIP_DEFLATED, compresslevel=compression_level) as archive:
+        for index, start in enumerate(range(0, max(1, array.shape[0]), rows)):
+            with archive.open(f"chunk_{index:04d}.npy", "w", force_zip64=True) as member:
+                np.lib.format.write_array(member, np.ascontiguousarray(array[start:start + rows]))
+    temporary_path.replace(path)
+
+
+def read_snapshot(path: str) -> np.ndarray:
+    """
+    Reads back a snapshot written by the SnapshotWriter
+    :param path: the .npz file
+    :return: the array
+    """
+    with np.load(path) as archive:
+        return np.concatenate([archive[name] for name in sorted(archive.files)])
+
+
+class SnapshotOutput:
+    """
+    A registered output : what to copy from the Earth, how often, and the two staging buffers it is copied in
+    """
+
+    def __init__(self, name: str, field: str, slices: tuple, every: int, shape: tuple, dtype):
+        self.name = name
+        self.field = field
+        self.slices = slices
+        self.every = every
+        self.free_buffers = queue.Queue()
+        for _ in range(2):
+            self.free_buffers.put(np.empty(shape, dtype=dtype))
+        self.ticks = []
+
+
+class SnapshotWriter:
+    """
+    Writes snapshots of Earth fields without stalling the simulation.
+
+    Outputs are registered with a field name, a slice of the grid (without the halo) and a cadence in ticks. When the
+    writer is attached to the Universe, it is called after every update_all and the outputs due at that tick are
+    copied into one of their two staging buffers. A background thread compresses and writes the buffer while the
+    simulation goes on with the next ticks, and gives it back afterwards. The simulation only waits when both buffers of
+    an output are still being written, i.e. when the disk or the compression cannot keep up with the cadence.
+
+    Every snapshot is a compressed .npz file `<directory>/<output name>/<output name>_t<tick>.npz`, chunked along its
+    first axis (see read_snapshot), and every output directory has an index.json describing the snapshots.
+    """
+
+    def __init__(self, directory: str, compression_level: int = 1, chunk_cells: int = 2 ** 18):
+        """
+        :param directory: where the snapshots are written
+        :param compression_level: the zlib level, from 1 (fastest) to 9 (smallest)
+        :param chunk_cells: approximate number of values per chunk of a snapshot
+        """
+        self.directory = Path(directory)
+        self.compression_level = compression_level
+        self.chunk_cells = chunk_cells
+        self.outputs = dict()
+        self._queue = queue.Queue()
+        self._error = None
+        self._thread = None
+        self.snapshots = 0
+        self.bytes_written = 0
+        self.copy_time = 0.0
+        self.stall_time = 0.0
+        self.write_time = 0.0
+
+    def register(self, name: str, earth, field: str, slices: tuple = (), every: int = 1) -> SnapshotOutput:
+        """
+        Registers an output
+        :param name: name of the output, used for its directory and files
+        :param earth: the Earth the field belongs to, used to know the shape of the output
+        :param field: name of the field of the Earth
+        :param slices: the part of the grid to write, indexing the grid without its halo. Everything by default
+        :param every: a snapshot is written every `every` ticks
+        :return: the output
+        """
+        if name in self.outputs:
+            raise ValueError(f"An output named {name} is already registered")
+        if every < 1:
+            raise ValueError(f"The cadence of an output must be at least 1 tick, got {every}")
+        sample = earth.interior(getattr(earth, field))[slices]
+        output = SnapshotOutput(name, field, slices, every, sample.shape, sample.dtype)
+        self.outputs[name] = output
+        (self.directory / name).mkdir(parents=True, exist_ok=True)
+        return output
+
+    def attach(self, universe):
+        """
+        Starts the writer thread and writes the due snapshots after every update of the universe
+        :param universe:
+        :return:
+        """
+        self.start()
+        universe.add_observer(self)
+
+    def detach(self, universe):
+        universe.remove_observer(self)
+        self.close()
+
+    def start(self):
+        """
+        Starts the writer thread if it is not running, done by `attach` and by the first `capture`
+        :return:
+        """
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._write_loop, name="snapshot-writer", daemon=True)
+            self._thread.start()
+
+    def __call__(self, universe):
+        self.capture(universe.earth, universe.get_time())
+
+    def capture(self, earth, tick: int):
+        """
+        Copies the outputs due at that tick into their staging buffers and queues them for writing, starting the writer
+        thread first if needed (without it, the buffers would never be given back)
+        :param earth: the Earth the fields are read from
+        :param tick: the current tick
+        :return:
+        """
+        self._raise_error()
+        self.start()
+        for output in self.outputs.values():
+            if tick % output.every != 0:
+                continue
+            start = time.perf_counter()
+            buffer = output.free_buffers.get()
+            copy_start = time.perf_counter()
+            self.stall_time += copy_start - start
+            np.copyto(buffer, earth.interior(getattr(earth, output.field))[output.slices])
+            self.copy_time += time.perf_counter() - copy_start
+            self._queue.put((output, tick, buffer))
+
+    def _write_loop(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                self._queue.task_done()
+                break
+            output, tick, buffer = item
+            try:
+                if self._error is None:
+                    start = time.perf_counter()
+                    path = self.directory / output.name / f"{output.name}_t{tick:08d}.npz"
+                    write_chunked_npz(path, buffer, self.chunk_cells, self.compression_level)
+                    output.ticks.append(tick)
+                    self.snapshots += 1
+                    self.bytes_written += path.stat().st_size
+                    self.write_time += time.perf_counter() - start
+            except Exception as e:
+                self._error = e
+            finally:
+                output.free_buffers.put(buffer)
+                self._queue.task_done()
+
+    def _raise_error(self):
+        if self._error is not None:
+            raise RuntimeError("The snapshot writer failed") from self._error
+
+    def flush(self):
+        """
+        Waits for every queued snapshot to be written and updates the index of every output
+        :return:
+        """
+        self._queue.join()
+        for output in self.outputs.values():
+            index = {"field": output.field,
+                     "slices": repr(output.slices),
+                     "every": output.every,
+                     "ticks": sorted(output.ticks)}
+            with open(self.directory / output.name / "index.json", "w") as file:
+                json.dump(index, file, indent=2)
+        self._raise_error()
+
+    def close(self):
+        """
+        Writes the remaining snapshots and stops the writer thread
+        :return:
+        """
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+    def report(self) -> str:
+        res = f"Snapshot writer : \n" \
+              f"- {self.snapshots} snapshots, {self.bytes_written / 2 ** 20:.2f} MiB written\n" \
+              f"- Time spent by the simulation copying: {self.copy_time:.3f} s, waiting for a buffer: {self.stall_time:.3f} s\n" \
+              f"- Time spent by the writer thread: {self.write_time:.3f} s"
+        return res
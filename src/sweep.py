@@ -0,0 +1,50 @@
+"""
+Parameter sweep over independent simulations, run on a pool of processes. Every run is written as one JSON line to the
+output file (and summarised on the standard output) as soon as it is over.
+
+Run with e.g. `python3.11 src/sweep.py --albedo 0.2 0.3 0.4 --TIME_DELTA 0.01 0.02 --steps 50 --output sweep.jsonl`
+Any parameter of SWEEP_PARAMETERS can be swept with `--<name> <values>`, the grid is every combination of the values.
+"""
+import argparse
+import json
+import time
+
+from models.parameter_sweep import ParameterSweep, SWEEP_PARAMETERS, parameter_grid
+from models.ticking_class.ticking_earth import TickingEarth
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    for name in SWEEP_PARAMETERS:
+        parser.add_argument(f"--{name}", type=float, nargs="+", metavar="VALUE")
+    parser.add_argument("--shape", type=int, nargs=3, default=[20, 20, 16])
+    parser.add_argument("--steps", type=int, default=50)
+    parser.add_argument("--backend", default="numpy")
+    parser.add_argument("--diffusion-mode", default="staged", choices=TickingEarth.DIFFUSION_MODES)
+    parser.add_argument("--enable", nargs="*", default=[], metavar="ON_TICK",
+                        help="on_tick methods of the Earth disabled by default to enable, e.g. water_evaporation")
+    parser.add_argument("--processes", type=int, default=None)
+    parser.add_argument("--sample-every", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="sweep.jsonl")
+    args = parser.parse_args()
+
+    points = parameter_grid(**{name: getattr(args, name) for name in SWEEP_PARAMETERS if getattr(args, name)})
+    sweep = ParameterSweep(tuple(args.shape), args.steps, args.backend, args.diffusion_mode, args.processes,
+                           tuple(args.enable), args.seed, args.sample_every)
+    print(f"{len(points)} runs of {args.steps} steps on {sweep.processes} processes")
+    start = time.perf_counter()
+    failures = 0
+    with open(args.output, "w") as file:
+        for done, result in enumerate(sweep.run(points), start=1):
+            file.write(json.dumps(result) + "\n")
+            file.flush()
+            if "error" in result:
+                failures += 1
+                print(f"[{done}/{len(points)}] {result['point']} failed:\n{result['error']}")
+            else:
+                print(f"[{done}/{len(points)}] {result['point']}: average temperature "
+                      f"{result['diagnostics'][-1]['average_temperature']:.3f} ({result['elapsed_s']:.2f} s)")
+    elapsed = time.perf_counter() - start
+    print(f"Done in {elapsed:.2f} s ({sweep.warm_up_time:.2f} s building the stencils), {failures} failed runs, "
+          f"results in {args.output}")
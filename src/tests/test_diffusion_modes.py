@@ -0,0 +1,33 @@
+"""
+The fused heat diffusion of TickingEarth must give the same energies and chunk temperatures as the staged one.
+
+Run with `python3.11 -m pytest src/tests`
+"""
+import sys
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from models.physical_class.universe import Universe
+from models.ticking_class.ticking_earth import TickingEarth
+
+
+def build_earth(diffusion_mode: str, grid_shape: tuple = (12, 10, 8), backend: str = "numpy") -> TickingEarth:
+    np.random.seed(0)
+    earth = TickingEarth(shape=grid_shape, backend=backend, diffusion_mode=diffusion_mode, universe=Universe())
+    earth.fill_with_water()
+    return earth
+
+
+def test_fused_matches_staged():
+    staged = build_earth("staged")
+    fused = build_earth("fused")
+    for _ in range(5):
+        staged.update_temperature()
+        fused.update_temperature()
+    for name in ("water_energy", "air_energy", "land_energy"):
+        np.testing.assert_allclose(fused.interior(getattr(fused, name)), staged.interior(getattr(staged, name)),
+                                   rtol=1e-12)
+    np.testing.assert_allclose(fused.interior(fused.chunk_temp), staged.interior(staged.chunk_temp), rtol=1e-12)
@@ -0,0 +1,35 @@
+"""
+A small parameter sweep runs in every diffusion mode, and its warm up builds the stencils the runs use.
+
+Run with `python3.11 -m pytest src/tests`
+"""
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from models.parameter_sweep import ParameterSweep, parameter_grid, run_point
+from models.stencil_registry import STENCIL_REGISTRY
+from models.ticking_class.ticking_earth import TickingEarth
+
+
+@pytest.mark.parametrize("diffusion_mode", TickingEarth.DIFFUSION_MODES)
+def test_sweep_runs_in_every_diffusion_mode(diffusion_mode):
+    sweep = ParameterSweep((6, 6, 4), 2, diffusion_mode=diffusion_mode, processes=1)
+    results = list(sweep.run(parameter_grid(albedo=[0.2, 0.3])))
+    assert len(results) == 2
+    for result in results:
+        assert "error" not in result, result["error"]
+
+
+def test_warm_up_builds_the_stencils_of_the_runs():
+    points = parameter_grid(EVAPORATION_RATE=[0.0002, 0.0003], WATER_HEAT_CAPACITY=[4000, 4184])
+    sweep = ParameterSweep((6, 6, 4), 2, processes=1, enabled_ticks=("water_evaporation",))
+    sweep.warm_up(points)
+    misses = STENCIL_REGISTRY.misses
+    for point in points:
+        result = run_point(point, (6, 6, 4), 2, enabled_ticks=sweep.enabled_ticks)
+        assert "error" not in result, result["error"]
+    assert STENCIL_REGISTRY.misses == misses
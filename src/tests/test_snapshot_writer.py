@@ -0,0 +1,29 @@
+"""
+A SnapshotWriter used without attaching it to a Universe must still write its snapshots instead of blocking once the
+staging buffers are used up.
+
+Run with `python3.11 -m pytest src/tests`
+"""
+import sys
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from models.physical_class.earth import Earth
+from models.physical_class.universe import Universe
+from output.snapshot_writer import SnapshotWriter, read_snapshot
+
+
+def test_capture_without_attach_writes_the_snapshots(tmp_path):
+    earth = Earth((4, 4, 3), universe=Universe())
+    earth.fill_with_water(seed=0)
+    writer = SnapshotWriter(str(tmp_path))
+    writer.register("water_energy", earth, "water_energy")
+    for tick in range(4):  # More snapshots than staging buffers
+        writer.capture(earth, tick)
+    writer.close()
+    assert writer.snapshots == 4
+    np.testing.assert_array_equal(read_snapshot(str(tmp_path / "water_energy" / "water_energy_t00000003.npz")),
+                                  earth.interior(earth.water_energy))
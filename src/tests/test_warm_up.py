@@ -0,0 +1,57 @@
+"""
+With component masks, the warm-up must build the variants of the component stencils that update() launches, so that
+the first step does not build any stencil.
+
+Run with `python3.11 -m pytest src/tests`
+"""
+import sys
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import constants
+from models.physical_class.universe import Universe
+from models.ticking_class.ticking_earth import TickingEarth
+
+
+def fill_layered(earth: TickingEarth):
+    """
+    Water in the lower half of the levels and air in the upper half, so that the component stencils have two variants
+    """
+    half = earth.shape[2] // 2
+    temperature = np.full(earth.shape, 300.0)
+    for component, capacity, levels in (("water", constants.WATER_HEAT_CAPACITY, slice(None, half)),
+                                        ("air", constants.AIR_HEAT_CAPACITY, slice(half, None))):
+        mass = np.zeros(earth.shape)
+        mass[:, :, levels] = 1000
+        earth.interior(getattr(earth, f"{component}_mass"))[...] = mass
+        earth.interior(getattr(earth, f"{component}_energy"))[...] = temperature * mass * capacity
+    names = ("water_mass", "water_energy", "air_mass", "air_energy")
+    earth.exchange_halos(*names)
+    earth.touch(*names)
+    earth.refresh_derived_fields()
+
+
+def built_handles(earth: TickingEarth) -> set[str]:
+    return {name for name, handle in earth.stencil_handles.items() if handle.built}
+
+
+def test_warm_up_builds_the_component_variants_update_launches():
+    earth = TickingEarth((4, 4, 4), universe=Universe(), component_masks=True, warm_up=True, warm_up_workers=1)
+    fill_layered(earth)
+    earth.warm_up_stencils(workers=1)
+    warmed_up = built_handles(earth)
+    assert {"add_energy[water]", "add_energy[air]"} <= warmed_up
+    earth.update()
+    assert built_handles(earth) == warmed_up
+
+
+def test_first_update_warms_up_the_variants_left_by_the_construction():
+    earth = TickingEarth((4, 4, 4), universe=Universe(), component_masks=True, warm_up=True, warm_up_workers=1)
+    assert not any("[" in name for name in built_handles(earth))
+    fill_layered(earth)
+    earth.update()
+    assert not earth.variants_warm_up_pending
+    assert {"compute_chunk_temperature[water]", "compute_chunk_temperature[air]"} <= built_handles(earth)